@@ -32,6 +32,58 @@ class Client(object):
         """
         raise NotImplementedError()
 
+    def trigger_dags(self, runs):
+        """Create many dag runs in one call.
+
+        :param runs: the arguments of trigger_dag for each dag run, as dicts
+        :return: for each dag run, in order, a dict with its dag_id and a
+            message if it was created, an error otherwise
+        """
+        raise NotImplementedError()
+
+    def get_task_instance_states(self, dag_id=None, task_ids=None, states=None,
+                                 execution_date_gte=None,
+                                 execution_date_lte=None, cursor=None,
+                                 limit=None):
+        """Get the states of the task instances matching the filters.
+
+        :param states: states to match, None for no state
+        :param cursor: cursor returned with the previous page
+        :param limit: maximum number of task instances returned
+        :return: task instances as dicts, cursor of the next page or None
+        """
+        raise NotImplementedError()
+
+    def get_dag_run_states(self, dag_id=None, states=None,
+                           execution_date_gte=None, execution_date_lte=None,
+                           cursor=None, limit=None):
+        """Get the states of the dag runs matching the filters.
+
+        :param cursor: cursor returned with the previous page
+        :param limit: maximum number of dag runs returned
+        :return: dag runs as dicts, cursor of the next page or None
+        """
+        raise NotImplementedError()
+
+    def get_state_changes(self, cursor=None, timeout=None, limit=None):
+        """Wait up to timeout seconds for task instances and dag runs written
+        since the cursor.
+
+        :param cursor: cursor returned by the previous call, None to start
+            following the changes
+        :return: dict with the task_instances and dag_runs changed, and the
+            cursor to pass next
+        """
+        raise NotImplementedError()
+
+    def stream_state_changes(self, cursor=None, limit=None):
+        """Follow the changes of task instances and dag runs.
+
+        :param cursor: cursor to resume from, None to start from now
+        :return: generator of dicts like get_state_changes, each with changes
+        """
+        raise NotImplementedError()
+
     def get_pool(self, name):
         """Get pool.
 
@@ -58,3 +110,25 @@ class Client(object):
         :param name: pool name
         """
         raise NotImplementedError()
+
+    def get_drain_status(self):
+        """Get the scheduler state and, per DAG, the number of running task
+        instances a redeploy waits for.
+
+        :return: state, {dag_id: count}
+        """
+        raise NotImplementedError()
+
+    def start_drain(self):
+        """Stop scheduling new task instances ahead of a redeploy.
+
+        :return: state, {dag_id: count}
+        """
+        raise NotImplementedError()
+
+    def stop_drain(self):
+        """Resume scheduling.
+
+        :return: state, {dag_id: count}
+        """
+        raise NotImplementedError()
@@ -12,24 +12,41 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from datetime import datetime
+import json as json_lib
+import time
+
 from future.moves.urllib.parse import urljoin
 import requests
 
+from airflow import configuration
 from airflow.api.client import api_client
 
 
+def _date(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%dT%H:%M:%S')
+    return value
+
+
 class Client(api_client.Client):
     """Json API client implementation."""
 
-    def _request(self, url, method='GET', json=None):
-        params = {
-            'url': url,
+    def __init__(self, api_base_url, auth):
+        super(Client, self).__init__(api_base_url, auth)
+        # keeps the connections to the webserver open between requests
+        self._session = requests.Session()
+
+    def _request(self, url, method='GET', json=None, params=None, stream=False):
+        kwargs = {
             'auth': self._auth,
+            'params': params,
+            'stream': stream,
         }
         if json is not None:
-            params['json'] = json
+            kwargs['json'] = json
 
-        resp = getattr(requests, method.lower())(**params)
+        resp = self._session.request(method, url, **kwargs)
         if not resp.ok:
             try:
                 data = resp.json()
@@ -37,7 +54,7 @@ class Client(api_client.Client):
                 data = {}
             raise IOError(data.get('error', 'Server error'))
 
-        return resp.json()
+        return resp if stream else resp.json()
 
     def trigger_dag(self, dag_id, run_id=None, conf=None, execution_date=None):
         endpoint = '/api/experimental/dags/{}/dag_runs'.format(dag_id)
@@ -50,6 +67,73 @@ class Client(api_client.Client):
                              })
         return data['message']
 
+    def trigger_dags(self, runs):
+        url = urljoin(self._api_base_url, '/api/experimental/dag_runs')
+        runs = [dict(run, execution_date=_date(run.get('execution_date')))
+                for run in runs]
+        data = self._request(url, method='POST', json={'dag_runs': runs})
+        return data['dag_runs']
+
+    def _state_params(self, dag_id, states, execution_date_gte,
+                      execution_date_lte, cursor, limit):
+        return {
+            'dag_id': dag_id,
+            'state': ['none' if state is None else state
+                      for state in states or []],
+            'execution_date_gte': _date(execution_date_gte),
+            'execution_date_lte': _date(execution_date_lte),
+            'cursor': cursor,
+            'limit': limit,
+        }
+
+    def get_task_instance_states(self, dag_id=None, task_ids=None, states=None,
+                                 execution_date_gte=None,
+                                 execution_date_lte=None, cursor=None,
+                                 limit=None):
+        url = urljoin(self._api_base_url, '/api/experimental/task_instances')
+        params = self._state_params(dag_id, states, execution_date_gte,
+                                    execution_date_lte, cursor, limit)
+        params['task_id'] = task_ids or []
+        data = self._request(url, params=params)
+        return data['task_instances'], data['cursor']
+
+    def get_dag_run_states(self, dag_id=None, states=None,
+                           execution_date_gte=None, execution_date_lte=None,
+                           cursor=None, limit=None):
+        url = urljoin(self._api_base_url, '/api/experimental/dag_runs')
+        data = self._request(url, params=self._state_params(
+            dag_id, states, execution_date_gte, execution_date_lte, cursor,
+            limit))
+        return data['dag_runs'], data['cursor']
+
+    def get_state_changes(self, cursor=None, timeout=None, limit=None):
+        url = urljoin(self._api_base_url, '/api/experimental/state_changes')
+        return self._request(url, params={
+            'cursor': cursor, 'timeout': timeout, 'limit': limit})
+
+    def stream_state_changes(self, cursor=None, limit=None):
+        url = urljoin(self._api_base_url,
+                      '/api/experimental/state_changes/stream')
+        while True:
+            # the server ends the stream after a while, resume from the
+            # last event id
+            resp = self._request(url, params={'cursor': cursor, 'limit': limit},
+                                 stream=True)
+            resumed = time.time()
+            data = None
+            for line in resp.iter_lines(decode_unicode=True):
+                if line.startswith('id: '):
+                    cursor = line[len('id: '):]
+                elif line.startswith('data: '):
+                    data = json_lib.loads(line[len('data: '):])
+                elif not line and data is not None:
+                    data['cursor'] = cursor
+                    yield data
+                    data = None
+            # streams of a single event with state_changes_max_wait = 0
+            time.sleep(max(0, resumed + configuration.getfloat(
+                'api', 'state_changes_poll_interval') - time.time()))
+
     def get_pool(self, name):
         endpoint = '/api/experimental/pools/{}'.format(name)
         url = urljoin(self._api_base_url, endpoint)
@@ -78,3 +162,17 @@ class Client(api_client.Client):
         url = urljoin(self._api_base_url, endpoint)
         pool = self._request(url, method='DELETE')
         return pool['pool'], pool['slots'], pool['description']
+
+    def _drain(self, method):
+        url = urljoin(self._api_base_url, '/api/experimental/drain')
+        status = self._request(url, method=method)
+        return status['state'], status['blocking']
+
+    def get_drain_status(self):
+        return self._drain('GET')
+
+    def start_drain(self):
+        return self._drain('POST')
+
+    def stop_drain(self):
+        return self._drain('DELETE')
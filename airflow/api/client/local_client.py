@@ -12,9 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import time
+
+from airflow import configuration
 from airflow.api.client import api_client
+from airflow.api.common.experimental import drain
 from airflow.api.common.experimental import pool
+from airflow.api.common.experimental import states as states_api
 from airflow.api.common.experimental import trigger_dag
+from airflow.exceptions import AirflowException
 
 
 class Client(api_client.Client):
@@ -27,6 +33,48 @@ class Client(api_client.Client):
                                      execution_date=execution_date)
         return "Created {}".format(dr)
 
+    def trigger_dags(self, runs):
+        results = []
+        for run, result in zip(runs, trigger_dag.trigger_dags(runs)):
+            if isinstance(result, AirflowException):
+                results.append({'dag_id': run['dag_id'],
+                                'error': "{}".format(result)})
+            else:
+                results.append({'dag_id': run['dag_id'],
+                                'message': "Created {}".format(result)})
+        return results
+
+    def get_task_instance_states(self, dag_id=None, task_ids=None, states=None,
+                                 execution_date_gte=None,
+                                 execution_date_lte=None, cursor=None,
+                                 limit=None):
+        return states_api.get_task_instance_states(
+            dag_id=dag_id, task_ids=task_ids, states=states,
+            execution_date_gte=execution_date_gte,
+            execution_date_lte=execution_date_lte, cursor=cursor, limit=limit)
+
+    def get_dag_run_states(self, dag_id=None, states=None,
+                           execution_date_gte=None, execution_date_lte=None,
+                           cursor=None, limit=None):
+        return states_api.get_dag_run_states(
+            dag_id=dag_id, states=states,
+            execution_date_gte=execution_date_gte,
+            execution_date_lte=execution_date_lte, cursor=cursor, limit=limit)
+
+    def get_state_changes(self, cursor=None, timeout=None, limit=None):
+        return states_api.wait_for_state_changes(
+            cursor=cursor, timeout=timeout, limit=limit)
+
+    def stream_state_changes(self, cursor=None, limit=None):
+        while True:
+            changes = states_api.wait_for_state_changes(cursor=cursor, limit=limit)
+            cursor = changes['cursor']
+            if changes['task_instances'] or changes['dag_runs']:
+                yield changes
+            else:
+                # no wait with state_changes_max_wait = 0
+                time.sleep(configuration.getfloat('api', 'state_changes_poll_interval'))
+
     def get_pool(self, name):
         p = pool.get_pool(name=name)
         return p.pool, p.slots, p.description
@@ -41,3 +89,15 @@ class Client(api_client.Client):
     def delete_pool(self, name):
         p = pool.delete_pool(name=name)
         return p.pool, p.slots, p.description
+
+    def get_drain_status(self):
+        status = drain.get_drain_status()
+        return status['state'], status['blocking']
+
+    def start_drain(self):
+        status = drain.start_drain()
+        return status['state'], status['blocking']
+
+    def stop_drain(self):
+        status = drain.stop_drain()
+        return status['state'], status['blocking']
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from sqlalchemy import func
+
+from airflow.models import (
+    SchedulerState, TaskInstance, get_resumable_operators)
+from airflow.utils.db import provide_session
+from airflow.utils.state import SchedulerStates
+
+
+@provide_session
+def get_drain_status(session=None):
+    """
+    Get the scheduler state and, per DAG, the number of running task
+    instances a redeploy still waits for. The scheduler moves from PAUSING
+    to IDLE once there are none left.
+
+    Resumable operators are the ones the scheduler recorded, which include
+    the operators of the DAGs it processed, and the ones of this process.
+    """
+    TI = TaskInstance
+    resumable_operators = (
+        SchedulerState.get_resumable_operators(session=session) |
+        get_resumable_operators())
+    blocking = SchedulerState.redeploy_blockers(
+        session, resumable_operators, TI.dag_id, func.count(TI.task_id)
+    ).group_by(TI.dag_id).all()
+    return {
+        'state': SchedulerState().get_state(session=session),
+        'blocking': dict(blocking),
+    }
+
+
+@provide_session
+def start_drain(session=None):
+    """
+    Stop scheduling new task instances so that Airflow can be redeployed
+    once the running ones are done.
+    """
+    state = SchedulerState().get_state(session=session)
+    if state == SchedulerStates.RUNNING:
+        SchedulerState().set_state(SchedulerStates.PAUSING, session=session)
+    return get_drain_status(session=session)
+
+
+@provide_session
+def stop_drain(session=None):
+    """Resume scheduling."""
+    SchedulerState().set_state(SchedulerStates.RUNNING, session=session)
+    return get_drain_status(session=session)
@@ -14,42 +14,86 @@
 
 import datetime
 
-from airflow.jobs import BackfillJob
-from airflow.models import DagRun, TaskInstance
-from airflow.operators.subdag_operator import SubDagOperator
+from sqlalchemy import or_
+
+from airflow.exceptions import AirflowException
+from airflow.jobs import BackfillJob, MarkTasksJob
+from airflow.models import DagRun, DagStat, TaskInstance
 from airflow.settings import Session
+from airflow.utils.db import provide_session
 from airflow.utils.state import State
 
-from sqlalchemy import or_
 
-def _create_dagruns(dag, execution_dates, state, run_id_template):
+def _chunks(items, batch_size):
+    items = list(items)
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
+
+
+@provide_session
+def _create_dagruns(dag, execution_dates, state, run_id_template,
+                    batch_size=1000, session=None):
     """
-    Infers from the dates which dag runs need to be created and does so.
+    Infers from the dates which dag runs need to be created and does so,
+    with one bulk insert. Their task instances are not created, see
+    _create_task_instances.
     :param dag: the dag to create dag runs for
     :param execution_dates: list of execution dates to evaluate
     :param state: the state to set the dag run to
     :param run_id_template:the template for run id to be with the execution date
+    :param batch_size: maximum number of values in a single IN clause
     :return: newly created and existing dag runs for the execution dates supplied
     """
-    # find out if we need to create any dag runs
-    drs = DagRun.find(dag_id=dag.dag_id, execution_date=execution_dates)
-    dates_to_create = list(set(execution_dates) - set([dr.execution_date for dr in drs]))
-
-    for date in dates_to_create:
-        dr = dag.create_dagrun(
-            run_id=run_id_template.format(date.isoformat()),
-            execution_date=date,
-            start_date=datetime.datetime.utcnow(),
-            external_trigger=False,
-            state=state,
-        )
-        drs.append(dr)
-
-    return drs
+    DR = DagRun
+    existing_dates = set()
+    for chunk in _chunks(execution_dates, batch_size):
+        existing_dates.update(date for date, in session.query(
+            DR.execution_date).filter(DR.dag_id == dag.dag_id,
+                                      DR.execution_date.in_(chunk)))
+
+    now = datetime.datetime.utcnow()
+    session.bulk_save_objects([
+        DagRun(dag_id=dag.dag_id,
+               run_id=run_id_template.format(date.isoformat()),
+               execution_date=date,
+               start_date=now,
+               external_trigger=False,
+               state=state)
+        for date in set(execution_dates) - existing_dates])
+    DagStat.set_dirty(dag_id=dag.dag_id, session=session)
+    session.commit()
+
+    return DagRun.find(dag_id=dag.dag_id, execution_date=list(execution_dates),
+                       session=session)
+
+
+def _create_task_instances(dag, execution_dates, session, batch_size=1000):
+    """
+    Adds the task instances missing from the dag runs of a dag, like
+    DagRun.verify_integrity but with one query and one bulk insert per chunk
+    of dates rather than per dag run. Task instances of removed tasks are
+    left to the scheduler to mark as removed.
+    :return: the number of task instances created
+    """
+    TI = TaskInstance
+    tasks = [task for task in dag.tasks if not task.adhoc]
+    created = 0
+    for chunk in _chunks(execution_dates, batch_size):
+        existing = set(
+            (task_id, date) for task_id, date in session.query(
+                TI.task_id, TI.execution_date).filter(
+                TI.dag_id == dag.dag_id, TI.execution_date.in_(chunk)))
+        tis = [TaskInstance(task, date) for date in chunk for task in tasks
+               if (task.task_id, date) not in existing]
+        session.bulk_save_objects(tis)
+        session.commit()
+        created += len(tis)
+    return created
 
 
 def set_state(task, execution_date, upstream=False, downstream=False,
-              future=False, past=False, state=State.SUCCESS, commit=False):
+              future=False, past=False, state=State.SUCCESS, commit=False,
+              batch_size=1000, progress_callback=None):
     """
     Set the state of a task instance and if needed its relatives. Can set state
     for future tasks (calculated from execution_date) and retroactively
@@ -65,20 +109,45 @@ def set_state(task, execution_date, upstream=False, downstream=False,
     :param past: Retroactively mark all tasks starting from start_date of the DAG
     :param state: State to which the tasks need to be set
     :param commit: Commit tasks to be altered to the database
+    :param batch_size: maximum number of values in a single IN clause, the
+        states are updated with one UPDATE statement per batch
+    :param progress_callback: called with a description of each step and
+        its number of task instances, first with the number of task
+        instances to alter
     :return: list of tasks that have been created and updated
     """
     assert isinstance(execution_date, datetime.datetime)
+    assert task.dag is not None
+
+    # find relatives (siblings = downstream, parents = upstream) if needed,
+    # the traversals go through the adjacency index of the DAG
+    task_ids = {task.task_id}
+    if downstream:
+        task_ids.update(t.task_id for t in
+                        task.get_flat_relatives(upstream=False))
+    if upstream:
+        task_ids.update(t.task_id for t in
+                        task.get_flat_relatives(upstream=True))
 
+    return _set_tasks_state(task.dag, task_ids, execution_date, future=future,
+                            past=past, state=state, commit=commit,
+                            batch_size=batch_size,
+                            progress_callback=progress_callback)
+
+
+def _set_tasks_state(dag, task_ids, execution_date, future, past, state,
+                     commit, batch_size, progress_callback=None):
     # microseconds are supported by the database, but is not handled
     # correctly by airflow on e.g. the filesystem and in other places
     execution_date = execution_date.replace(microsecond=0)
 
-    assert task.dag is not None
-    dag = task.dag
-
     latest_execution_date = dag.latest_execution_date
     assert latest_execution_date is not None
 
+    def report(step, count):
+        if progress_callback:
+            progress_callback(step, count)
+
     # determine date range of dag runs and tasks to consider
     end_date = latest_execution_date if future else execution_date
 
@@ -96,95 +165,134 @@ def set_state(task, execution_date, upstream=False, downstream=False,
     else:
         dates = dag.date_range(start_date=start_date, end_date=end_date)
 
-    # find relatives (siblings = downstream, parents = upstream) if needed
-    task_ids = [task.task_id]
-    if downstream:
-        relatives = task.get_flat_relatives(upstream=False)
-        task_ids += [t.task_id for t in relatives]
-    if upstream:
-        relatives = task.get_flat_relatives(upstream=True)
-        task_ids += [t.task_id for t in relatives]
-
     # verify the integrity of the dag runs in case a task was added or removed
     # set the confirmed execution dates as they might be different
     # from what was provided
+    session = Session()
+    DR = DagRun
     confirmed_dates = []
-    drs = DagRun.find(dag_id=dag.dag_id, execution_date=dates)
-    for dr in drs:
-        dr.dag = dag
-        dr.verify_integrity()
-        confirmed_dates.append(dr.execution_date)
+    for chunk in _chunks(dates, batch_size):
+        confirmed_dates.extend(date for date, in session.query(
+            DR.execution_date).filter(DR.dag_id == dag.dag_id,
+                                      DR.execution_date.in_(chunk)))
+    _create_task_instances(dag, confirmed_dates, session, batch_size)
 
     # go through subdagoperators and create dag runs. We will only work
     # within the scope of the subdag. We wont propagate to the parent dag,
-    # but we will propagate from parent to subdag.
-    session = Session()
-    dags = [dag]
-    sub_dag_ids = []
+    # but we will propagate from parent to subdag, to all of its tasks.
+    # The operators of deserialized DAGs are stand-ins, hence the duck typing.
+    dags = [(dag, task_ids)]
+    sub_dags = []
     while len(dags) > 0:
-        current_dag = dags.pop()
-        for task_id in task_ids:
+        current_dag, current_task_ids = dags.pop()
+        for task_id in current_task_ids:
             if not current_dag.has_task(task_id):
                 continue
 
-            current_task = current_dag.get_task(task_id)
-            if isinstance(current_task, SubDagOperator):
+            subdag = getattr(current_dag.get_task(task_id), 'subdag', None)
+            if subdag is not None:
                 # this works as a kind of integrity check
                 # it creates missing dag runs for subdagoperators,
                 # maybe this should be moved to dagrun.verify_integrity
-                drs = _create_dagruns(current_task.subdag,
-                                      execution_dates=confirmed_dates,
-                                      state=State.RUNNING,
-                                      run_id_template=BackfillJob.ID_FORMAT_PREFIX)
-
-                for dr in drs:
-                    dr.dag = current_task.subdag
-                    dr.verify_integrity()
-                    if commit:
-                        dr.state = state
-                        session.merge(dr)
-
-                dags.append(current_task.subdag)
-                sub_dag_ids.append(current_task.subdag.dag_id)
-
-    # now look for the task instances that are affected
+                _create_dagruns(subdag,
+                                execution_dates=confirmed_dates,
+                                state=State.RUNNING,
+                                run_id_template=BackfillJob.ID_FORMAT_PREFIX,
+                                batch_size=batch_size,
+                                session=session)
+                _create_task_instances(subdag, confirmed_dates, session,
+                                       batch_size)
+                dags.append((subdag, subdag.task_ids))
+                sub_dags.append(subdag)
+
+    # now look for the task instances that are affected: the given tasks of
+    # the main dag and *all* tasks of the sub dags
     TI = TaskInstance
-
-    # get all tasks of the main dag that will be affected by a state change
-    qry_dag = session.query(TI).filter(
-        TI.dag_id==dag.dag_id,
-        TI.execution_date.in_(confirmed_dates),
-        TI.task_id.in_(task_ids)).filter(
-        or_(TI.state.is_(None),
-            TI.state != state)
-    )
-
-    # get *all* tasks of the sub dags
-    if len(sub_dag_ids) > 0:
-        qry_sub_dag = session.query(TI).filter(
-            TI.dag_id.in_(sub_dag_ids),
-            TI.execution_date.in_(confirmed_dates)).filter(
+    targets = [(dag.dag_id, sorted(task_ids))]
+    targets += [(sub_dag.dag_id, sub_dag.task_ids) for sub_dag in sub_dags]
+
+    def altered_tis(dag_id, task_id_chunk, date_chunk):
+        return session.query(TI).filter(
+            TI.dag_id == dag_id,
+            TI.execution_date.in_(date_chunk),
+            TI.task_id.in_(task_id_chunk)).filter(
             or_(TI.state.is_(None),
                 TI.state != state)
         )
 
+    tis_altered = []
+    for dag_id, target_task_ids in targets:
+        for task_id_chunk in _chunks(target_task_ids, batch_size):
+            for date_chunk in _chunks(confirmed_dates, batch_size):
+                tis_altered += altered_tis(
+                    dag_id, task_id_chunk, date_chunk).all()
+    session.expunge_all()
+    report('task instances to set to {}'.format(state), len(tis_altered))
+
     if commit:
-        tis_altered = qry_dag.with_for_update().all()
-        if len(sub_dag_ids) > 0:
-            tis_altered += qry_sub_dag.with_for_update().all()
+        # one UPDATE per chunk rather than one per task instance, committed
+        # as they go to keep the rows locked briefly
+        for dag_id, target_task_ids in targets:
+            for task_id_chunk in _chunks(target_task_ids, batch_size):
+                for date_chunk in _chunks(confirmed_dates, batch_size):
+                    count = altered_tis(
+                        dag_id, task_id_chunk, date_chunk
+                    ).update({TI.state: state}, synchronize_session=False)
+                    session.commit()
+                    report('set task instances of {} to {}'.format(
+                        dag_id, state), count)
+
+        sub_dag_ids = [sub_dag.dag_id for sub_dag in sub_dags]
+        if sub_dag_ids:
+            for date_chunk in _chunks(confirmed_dates, batch_size):
+                session.query(DR).filter(
+                    DR.dag_id.in_(sub_dag_ids),
+                    DR.execution_date.in_(date_chunk),
+                ).update({DR.state: state}, synchronize_session=False)
+            session.commit()
+
         for ti in tis_altered:
             ti.state = state
-        session.commit()
-    else:
-        tis_altered = qry_dag.all()
-        if len(sub_dag_ids) > 0:
-            tis_altered += qry_sub_dag.all()
 
-    session.expunge_all()
     session.close()
 
     return tis_altered
 
+
+def set_state_async(task, execution_date, upstream=False, downstream=False,
+                    future=False, past=False, state=State.SUCCESS):
+    """
+    Same as set_state with commit, but in a MarkTasksJob running in a
+    background thread of this process.
+    :return: the id of the job, see get_set_state_progress
+    """
+    job = MarkTasksJob(task=task, execution_date=execution_date,
+                       upstream=upstream, downstream=downstream,
+                       future=future, past=past, state=state)
+    job_id = job.start()
+    if job_id is None:
+        raise AirflowException("Could not start marking {} on {}".format(
+            task, execution_date))
+    return job_id
+
+
+@provide_session
+def get_set_state_progress(job_id, session=None):
+    """
+    Get the state of a MarkTasksJob and, while it runs in this process, the
+    number of task instances it has to alter and has altered so far.
+    """
+    job = session.query(MarkTasksJob).filter(MarkTasksJob.id == job_id).first()
+    if job is None:
+        raise AirflowException("Job {} not found".format(job_id))
+    running_job = MarkTasksJob.running.get(job_id)
+    return {
+        'state': job.state,
+        'dag_id': job.dag_id,
+        'total': running_job.total if running_job else None,
+        'altered': running_job.altered if running_job else None,
+    }
+
 def set_dag_run_state(dag, execution_date, state=State.SUCCESS, commit=False):
     """
     Set the state of a dag run and all task instances associated with the dag
@@ -201,12 +309,12 @@ def set_dag_run_state(dag, execution_date, state=State.SUCCESS, commit=False):
     if not dag or not execution_date:
         return res
 
+    assert isinstance(execution_date, datetime.datetime)
+
     # Mark all task instances in the dag run
-    for task in dag.tasks:
-        task.dag = dag
-        new_state = set_state(task=task, execution_date=execution_date,
-                              state=state, commit=commit)
-        res.extend(new_state)
+    res = _set_tasks_state(dag, dag.task_ids, execution_date, future=False,
+                           past=False, state=state, commit=commit,
+                           batch_size=1000)
 
     # Mark the dag run
     if commit:
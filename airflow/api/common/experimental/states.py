@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import json
+import time
+from datetime import datetime, timedelta
+
+import dateutil.parser
+import six
+from sqlalchemy import DateTime, and_, or_
+
+from airflow import configuration as conf
+from airflow.exceptions import AirflowException
+from airflow.models import DagRun, TaskInstance
+from airflow.utils.db import provide_session
+
+TI_FIELDS = ['dag_id', 'task_id', 'execution_date', 'state', 'try_number',
+             'start_date', 'end_date', 'updated_at']
+DR_FIELDS = ['id', 'dag_id', 'run_id', 'execution_date', 'state',
+             'external_trigger', 'start_date', 'end_date', 'updated_at']
+
+
+def _ti_columns():
+    return [getattr(TaskInstance, field) for field in TI_FIELDS]
+
+
+def _dr_columns():
+    return [getattr(DagRun, field) if field != 'state'
+            else DagRun._state.label('state') for field in DR_FIELDS]
+
+
+def _to_dict(row, fields):
+    return {field: (getattr(row, field).isoformat()
+                    if isinstance(getattr(row, field), datetime)
+                    else getattr(row, field))
+            for field in fields}
+
+
+def _encode_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')) \
+        .decode('ascii')
+
+
+def _decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(
+            cursor.encode('ascii')).decode('utf-8'))
+    except (TypeError, ValueError):
+        raise AirflowException("Invalid cursor {}".format(cursor))
+
+
+def _dump_key(row, columns):
+    return [getattr(row, c.key).isoformat()
+            if isinstance(getattr(row, c.key), datetime)
+            else getattr(row, c.key) for c in columns]
+
+
+def _load_key(key, columns):
+    # the values of a key are strings, dates in ISO format, or ints
+    if (not isinstance(key, list) or not 0 < len(key) <= len(columns) or
+            not all(isinstance(v, six.string_types + six.integer_types)
+                    for v in key)):
+        raise AirflowException("Invalid cursor key {}".format(key))
+    try:
+        return [dateutil.parser.parse(v) if isinstance(c.type, DateTime)
+                else v for c, v in zip(columns, key)]
+    except (AttributeError, OverflowError, TypeError, ValueError):
+        raise AirflowException("Invalid cursor key {}".format(key))
+
+
+def _after(columns, key):
+    """
+    Rows coming after ``key`` in ascending order of ``columns``, or after
+    all the rows starting with ``key`` if it has fewer values, written out
+    as ``c1 >= v1 AND (c1 > v1 OR (c1 = v1 AND c2 > v2) ...)`` so that the
+    first column bounds an index range scan on every database.
+    """
+    key = _load_key(key, columns)
+    clauses = [
+        and_(*([c == v for c, v in zip(columns[:i], key[:i])] +
+               [columns[i] > key[i]]))
+        for i in range(len(key))]
+    return and_(columns[0] >= key[0], or_(*clauses))
+
+
+def _max_results(limit):
+    max_results = conf.getint('api', 'batch_max_results')
+    return min(limit, max_results) if limit else max_results
+
+
+def _page(qry, key_columns, fields, key, limit):
+    """
+    :return: the rows of qry after key, at most limit of them, and the key
+        of the last one if there are more, None otherwise
+    """
+    if key is not None:
+        qry = qry.filter(_after(key_columns, key))
+    rows = qry.order_by(*key_columns).limit(limit + 1).all()
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = _dump_key(rows[-1], key_columns)
+    return [_to_dict(row, fields) for row in rows], next_key
+
+
+def _filter_states(qry, column, states):
+    # None stands for the tasks instances that were never scheduled
+    clauses = []
+    if any(state is not None for state in states):
+        clauses.append(column.in_([s for s in states if s is not None]))
+    if None in states:
+        clauses.append(column.is_(None))
+    return qry.filter(or_(*clauses))
+
+
+@provide_session
+def get_task_instance_states(dag_id=None, task_ids=None, states=None,
+                             execution_date_gte=None, execution_date_lte=None,
+                             cursor=None, limit=None, session=None):
+    """
+    Get the states of the task instances matching the filters, a page at a
+    time in (dag_id, task_id, execution_date) order.
+
+    :param cursor: the cursor returned with the previous page, None for
+        the first page
+    :param limit: maximum number of task instances returned, at most
+        [api] batch_max_results
+    :return: the task instances as dicts, and the cursor of the next page,
+        None after the last page
+    """
+    TI = TaskInstance
+    qry = session.query(*_ti_columns())
+    if dag_id:
+        qry = qry.filter(TI.dag_id == dag_id)
+    if task_ids:
+        qry = qry.filter(TI.task_id.in_(task_ids))
+    if states:
+        qry = _filter_states(qry, TI.state, states)
+    if execution_date_gte:
+        qry = qry.filter(TI.execution_date >= execution_date_gte)
+    if execution_date_lte:
+        qry = qry.filter(TI.execution_date <= execution_date_lte)
+
+    task_instances, next_key = _page(
+        qry, [TI.dag_id, TI.task_id, TI.execution_date], TI_FIELDS,
+        _decode_cursor(cursor) if cursor else None, _max_results(limit))
+    return task_instances, next_key and _encode_cursor(next_key)
+
+
+@provide_session
+def get_dag_run_states(dag_id=None, states=None, execution_date_gte=None,
+                       execution_date_lte=None, cursor=None, limit=None,
+                       session=None):
+    """
+    Get the states of the DAG runs matching the filters, a page at a time
+    in the order they were created.
+
+    :param cursor: the cursor returned with the previous page, None for
+        the first page
+    :param limit: maximum number of DAG runs returned, at most
+        [api] batch_max_results
+    :return: the DAG runs as dicts, and the cursor of the next page, None
+        after the last page
+    """
+    DR = DagRun
+    qry = session.query(*_dr_columns())
+    if dag_id:
+        qry = qry.filter(DR.dag_id == dag_id)
+    if states:
+        qry = _filter_states(qry, DR._state, states)
+    if execution_date_gte:
+        qry = qry.filter(DR.execution_date >= execution_date_gte)
+    if execution_date_lte:
+        qry = qry.filter(DR.execution_date <= execution_date_lte)
+
+    dag_runs, next_key = _page(
+        qry, [DR.id], DR_FIELDS,
+        _decode_cursor(cursor) if cursor else None, _max_results(limit))
+    return dag_runs, next_key and _encode_cursor(next_key)
+
+
+@provide_session
+def get_state_changes(cursor=None, limit=None, session=None):
+    """
+    Get the task instances and DAG runs written since the cursor, in the
+    order they were written. Changes are only returned once they are
+    [api] state_changes_lag_sec seconds old, so that a change committed by
+    a slower transaction is not passed over.
+
+    :param cursor: the cursor returned by the previous call, None to get
+        none of the changes so far and the cursor to follow the next ones
+    :param limit: maximum number of task instances, and of DAG runs,
+        returned, at most [api] batch_max_results
+    :return: dict with the task_instances and dag_runs changed as dicts,
+        and the cursor to read the next changes from
+    """
+    horizon = (datetime.utcnow() -
+               timedelta(seconds=conf.getint('api', 'state_changes_lag_sec')))
+    # a one value key stands for all the rows written up to that time
+    horizon_key = [horizon.isoformat()]
+    if cursor is None:
+        return {'task_instances': [], 'dag_runs': [],
+                'cursor': _encode_cursor({'ti': horizon_key,
+                                          'dr': horizon_key})}
+
+    keys = _decode_cursor(cursor)
+    if (not isinstance(keys, dict) or set(keys) != {'ti', 'dr'} or
+            not all(isinstance(key, list) and key for key in keys.values())):
+        raise AirflowException("Invalid cursor {}".format(cursor))
+    limit = _max_results(limit)
+    TI = TaskInstance
+    DR = DagRun
+
+    task_instances, ti_key = _page(
+        session.query(*_ti_columns()).filter(TI.updated_at <= horizon),
+        [TI.updated_at, TI.dag_id, TI.task_id, TI.execution_date],
+        TI_FIELDS, keys['ti'], limit)
+    dag_runs, dr_key = _page(
+        session.query(*_dr_columns()).filter(DR.updated_at <= horizon),
+        [DR.updated_at, DR.id], DR_FIELDS, keys['dr'], limit)
+
+    # the horizon never moves back, the lag may have been raised
+    return {
+        'task_instances': task_instances,
+        'dag_runs': dag_runs,
+        'cursor': _encode_cursor({
+            'ti': ti_key or max(keys['ti'], horizon_key),
+            'dr': dr_key or max(keys['dr'], horizon_key),
+        }),
+    }
+
+
+def wait_for_state_changes(cursor=None, timeout=None, limit=None):
+    """
+    Long poll for state changes: like get_state_changes, but waits up to
+    timeout seconds, at most [api] state_changes_max_wait, for some. With
+    the default of 0, returns right away.
+    """
+    max_wait = conf.getint('api', 'state_changes_max_wait')
+    timeout = min(timeout, max_wait) if timeout is not None else max_wait
+    deadline = time.time() + timeout
+    while True:
+        changes = get_state_changes(cursor=cursor, limit=limit)
+        if (cursor is None or changes['task_instances'] or
+                changes['dag_runs'] or time.time() >= deadline):
+            return changes
+        cursor = changes['cursor']
+        time.sleep(min(conf.getfloat('api', 'state_changes_poll_interval'),
+                       max(0, deadline - time.time())))
@@ -20,8 +20,10 @@ from airflow.models import DagRun, DagBag
 from airflow.utils.state import State
 
 
-def trigger_dag(dag_id, run_id=None, conf=None, execution_date=None):
-    dagbag = DagBag()
+def trigger_dag(dag_id, run_id=None, conf=None, execution_date=None,
+                dagbag=None):
+    if dagbag is None:
+        dagbag = DagBag()
 
     if dag_id not in dagbag.dags:
         raise AirflowException("Dag id {} not found".format(dag_id))
@@ -57,3 +59,22 @@ def trigger_dag(dag_id, run_id=None, conf=None, execution_date=None):
     )
 
     return trigger
+
+
+def trigger_dags(runs):
+    """
+    Create many DAG runs, parsing the DAG files once.
+
+    :param runs: the arguments of trigger_dag for each DAG run, as dicts
+        with a dag_id and optionally a run_id, conf and execution_date
+    :return: for each DAG run, in order, the DagRun created or the
+        AirflowException raised
+    """
+    dagbag = DagBag()
+    results = []
+    for run in runs:
+        try:
+            results.append(trigger_dag(dagbag=dagbag, **run))
+        except AirflowException as err:
+            results.append(err)
+    return results
@@ -57,7 +57,7 @@ from airflow.ti_deps.dep_context import (DepContext, SCHEDULER_DEPS)
 from airflow.utils import db as db_utils
 from airflow.utils.log.logging_mixin import LoggingMixin, redirect_stderr, redirect_stdout
 from airflow.www.app import cached_app
-from airflow.utils.state import State
+from airflow.utils.state import State, SchedulerStates
 
 from sqlalchemy import func
 from sqlalchemy.orm import exc
@@ -228,6 +228,32 @@ def pool(args):
         log.info(_tabulate(pools=pools))
 
 
+def drain(args):
+    log = LoggingMixin().log
+
+    def _tabulate(state, blocking):
+        return "\nScheduler state: %s\n%s" % (
+            state, tabulate(sorted(blocking.items()),
+                            ['DAG', 'Blocking task instances'],
+                            tablefmt="fancy_grid"))
+
+    try:
+        if args.start:
+            state, blocking = api_client.start_drain()
+        elif args.stop:
+            state, blocking = api_client.stop_drain()
+        else:
+            state, blocking = api_client.get_drain_status()
+        log.info(_tabulate(state, blocking))
+        # stream the progress of the drain until Airflow can be redeployed
+        while args.wait and state == SchedulerStates.PAUSING:
+            time.sleep(args.poll_interval)
+            state, blocking = api_client.get_drain_status()
+            log.info(_tabulate(state, blocking))
+    except (AirflowException, IOError) as err:
+        log.error(err)
+
+
 def variables(args):
     if args.get:
         try:
@@ -557,11 +583,26 @@ def clear(args):
 
     if args.task_regex:
         for idx, dag in enumerate(dags):
-            dags[idx] = dag.sub_dag(
+            dags[idx] = dag.sub_dag_view(
                 task_regex=args.task_regex,
                 include_downstream=args.downstream,
                 include_upstream=args.upstream)
 
+    if args.dry_run:
+        for dag in dags:
+            for dag_id, state, count in dag.clear_counts(
+                    start_date=args.start_date,
+                    end_date=args.end_date,
+                    only_failed=args.only_failed,
+                    only_running=args.only_running,
+                    include_subdags=not args.exclude_subdags):
+                print("{}: {} task instances in state {}".format(
+                    dag_id, count, state))
+        return
+
+    def progress(step, count):
+        print("{}: {}".format(step, count))
+
     DAG.clear_dags(
         dags,
         start_date=args.start_date,
@@ -569,7 +610,8 @@ def clear(args):
         only_failed=args.only_failed,
         only_running=args.only_running,
         confirm_prompt=not args.no_confirm,
-        include_subdags=not args.exclude_subdags)
+        include_subdags=not args.exclude_subdags,
+        progress_callback=progress)
 
 
 def restart_workers(gunicorn_master_proc, num_workers_expected):
@@ -759,7 +801,12 @@ def webserver(args):
 
         def monitor_gunicorn(gunicorn_master_proc):
             # These run forever until SIG{INT, TERM, KILL, ...} signal is sent
-            if conf.getint('webserver', 'worker_refresh_interval') > 0:
+            # lazily loaded or serialized DAGs are read again by the workers
+            # when they change, refreshing the workers is not needed to pick
+            # them up
+            if conf.getint('webserver', 'worker_refresh_interval') > 0 and \
+                    not conf.getboolean('webserver', 'lazy_load_dags') and \
+                    not conf.getboolean('core', 'store_serialized_dags'):
                 restart_workers(gunicorn_master_proc, num_workers)
             else:
                 while True:
@@ -840,6 +887,38 @@ def scheduler(args):
         job.run()
 
 
+def sensor_service(args):
+    print(settings.HEADER)
+    job = jobs.SensorServiceJob(
+        run_duration=args.run_duration,
+        num_runs=args.num_runs,
+        poke_threads=args.poke_threads)
+
+    if args.daemon:
+        pid, stdout, stderr, log_file = setup_locations(
+            "sensor_service", args.pid, args.stdout, args.stderr, args.log_file)
+        handle = setup_logging(log_file)
+        stdout = open(stdout, 'w+')
+        stderr = open(stderr, 'w+')
+
+        ctx = daemon.DaemonContext(
+            pidfile=TimeoutPIDLockFile(pid, -1),
+            files_preserve=[handle],
+            stdout=stdout,
+            stderr=stderr,
+        )
+        with ctx:
+            job.run()
+
+        stdout.close()
+        stderr.close()
+    else:
+        signal.signal(signal.SIGINT, sigint_handler)
+        signal.signal(signal.SIGTERM, sigint_handler)
+        signal.signal(signal.SIGQUIT, sigquit_handler)
+        job.run()
+
+
 def serve_logs(args):
     print("Starting flask")
     import flask
@@ -1298,6 +1377,21 @@ class CLIFactory(object):
             ("-x", "--delete"),
             metavar="NAME",
             help="Delete a pool"),
+        # drain
+        'drain_start': Arg(
+            ("-s", "--start"),
+            "Stop scheduling new task instances ahead of a redeploy",
+            "store_true"),
+        'drain_stop': Arg(
+            ("-x", "--stop"), "Resume scheduling", "store_true"),
+        'drain_wait': Arg(
+            ("-w", "--wait"),
+            "Report the task instances left until the scheduler is idle",
+            "store_true"),
+        'drain_poll_interval': Arg(
+            ("-p", "--poll_interval"),
+            "Seconds between two reports when waiting",
+            type=int, default=10),
         # variables
         'set': Arg(
             ("-s", "--set"),
@@ -1441,6 +1535,12 @@ class CLIFactory(object):
             ("-n", "--num_runs"),
             default=-1, type=int,
             help="Set the number of runs to execute before exiting"),
+        # sensor_service
+        'poke_threads': Arg(
+            ("-t", "--poke_threads"),
+            default=None, type=int,
+            help="Number of sensors poked in parallel, defaults to "
+                 "[smart_sensor] poke_threads"),
         # worker
         'do_pickle': Arg(
             ("-p", "--do_pickle"),
@@ -1552,7 +1652,7 @@ class CLIFactory(object):
             'args': (
                 'dag_id', 'task_regex', 'start_date', 'end_date', 'subdir',
                 'upstream', 'downstream', 'no_confirm', 'only_failed',
-                'only_running', 'exclude_subdags', 'dag_regex'),
+                'only_running', 'exclude_subdags', 'dag_regex', 'dry_run'),
         }, {
             'func': pause,
             'help': "Pause a DAG",
@@ -1569,6 +1669,11 @@ class CLIFactory(object):
             'func': pool,
             'help': "CRUD operations on pools",
             "args": ('pool_set', 'pool_get', 'pool_delete'),
+        }, {
+            'func': drain,
+            'help': "Drain the scheduler ahead of a redeploy and follow its progress",
+            "args": ('drain_start', 'drain_stop', 'drain_wait',
+                     'drain_poll_interval'),
         }, {
             'func': variables,
             'help': "CRUD operations on variables",
@@ -1646,6 +1751,11 @@ class CLIFactory(object):
             'args': ('dag_id_opt', 'subdir', 'run_duration', 'num_runs',
                      'do_pickle', 'pid', 'daemon', 'stdout', 'stderr',
                      'log_file'),
+        }, {
+            'func': sensor_service,
+            'help': "Start the sensor service poking for smart sensors",
+            'args': ('run_duration', 'num_runs', 'poke_threads', 'pid',
+                     'daemon', 'stdout', 'stderr', 'log_file'),
         }, {
             'func': worker,
             'help': "Supervise or daemonize a Celery worker node",
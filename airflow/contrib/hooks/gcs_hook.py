@@ -13,11 +13,13 @@
 # limitations under the License.
 #
 from apiclient.discovery import build
-from apiclient.http import MediaFileUpload
+from apiclient.http import MediaFileUpload, MediaIoBaseDownload
 from googleapiclient import errors
 
 from airflow.contrib.hooks.gcp_api_base_hook import GoogleCloudBaseHook
+from airflow.utils.transfer import HashingWriter, TransferManager, file_md5
 
+import base64
 import logging
 
 
@@ -25,13 +27,20 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
     """
     Interact with Google Cloud Storage. This hook uses the Google Cloud Platform
     connection.
+
+    Files are uploaded and downloaded in chunks of ``transfer_manager``'s
+    part size (by default the one of the [transfer] configuration section),
+    retrying failed chunks, and ``upload_many``/``download_many`` transfer
+    several objects concurrently.
     """
 
     def __init__(self,
                  google_cloud_storage_conn_id='google_cloud_storage_default',
-                 delegate_to=None):
+                 delegate_to=None,
+                 transfer_manager=None):
         super(GoogleCloudStorageHook, self).__init__(google_cloud_storage_conn_id,
                                                      delegate_to)
+        self.transfer_manager = transfer_manager or TransferManager()
 
     def get_conn(self):
         """
@@ -112,10 +121,96 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
 
         return downloaded_file_bytes
 
+    # pylint:disable=redefined-builtin
+    def download_range(self, bucket, object, offset=0, length=None):
+        """
+        Get part of a file from Google Cloud Storage.
+
+        :param bucket: The bucket to fetch from.
+        :type bucket: string
+        :param object: The object to fetch.
+        :type object: string
+        :param offset: Byte offset to read from, from the end if negative.
+        :type offset: int
+        :param length: Maximum number of bytes to read, None for all.
+        :type length: int
+        :return: the bytes read, the offset they start at and the size of
+            the object
+        :rtype: tuple
+        """
+        service = self.get_conn()
+        metadata = service \
+            .objects() \
+            .get(bucket=bucket, object=object) \
+            .execute()
+        size = int(metadata['size'])
+        start = max(0, size + offset) if offset < 0 else offset
+        if start >= size:
+            return b'', start, size
+        end = size if length is None else min(size, start + length)
+        # pin the generation so the size is the one of what is read
+        request = service \
+            .objects() \
+            .get_media(bucket=bucket, object=object,
+                       generation=metadata['generation'])
+        request.headers['range'] = 'bytes={}-{}'.format(start, end - 1)
+        return request.execute(), start, size
+
+    # pylint:disable=redefined-builtin
+    def download_fileobj(self, bucket, object, fileobj):
+        """
+        Writes an object of Google Cloud Storage to a file object, one chunk
+        at a time, without holding the whole object in memory.
+
+        :param bucket: The bucket to fetch from.
+        :type bucket: string
+        :param object: The object to fetch.
+        :type object: string
+        :param fileobj: The file object to write to.
+        :type fileobj: file-like object
+        """
+        manager = self.transfer_manager
+        service = self.get_conn()
+        metadata = service \
+            .objects() \
+            .get(bucket=bucket, object=object) \
+            .execute()
+        # pin the generation so the checksum is the one of what is read
+        request = service \
+            .objects() \
+            .get_media(bucket=bucket, object=object,
+                       generation=metadata['generation'])
+        writer = HashingWriter(fileobj)
+        downloader = MediaIoBaseDownload(writer, request,
+                                         chunksize=manager.gcs_chunk_size)
+        done = False
+        while not done:
+            _, done = downloader.next_chunk(num_retries=manager.num_retries)
+
+        # composite objects only have a CRC32C
+        if manager.verify_checksums and 'md5Hash' in metadata:
+            manager.check('gs://{}/{}'.format(bucket, object),
+                          metadata['md5Hash'], writer.b64digest())
+
+    # pylint:disable=redefined-builtin
+    def download_many(self, transfers):
+        """
+        Downloads objects of Google Cloud Storage to local files,
+        ``transfer_manager.concurrency`` objects at a time.
+
+        :param transfers: (bucket, object, filename) tuples.
+        :type transfers: list[tuple]
+        """
+        def download(bucket, object, filename):
+            with open(filename, 'wb') as f:
+                self.download_fileobj(bucket, object, f)
+
+        self.transfer_manager.run_many(download, transfers)
+
     # pylint:disable=redefined-builtin
     def upload(self, bucket, object, filename, mime_type='application/octet-stream'):
         """
-        Uploads a local file to Google Cloud Storage.
+        Uploads a local file to Google Cloud Storage, in resumable chunks.
 
         :param bucket: The bucket to upload to.
         :type bucket: string
@@ -126,12 +221,39 @@ class GoogleCloudStorageHook(GoogleCloudBaseHook):
         :param mime_type: The MIME type to set when uploading the file.
         :type mime_type: string
         """
+        manager = self.transfer_manager
         service = self.get_conn()
-        media = MediaFileUpload(filename, mime_type)
-        response = service \
+        media = MediaFileUpload(filename, mime_type,
+                                chunksize=manager.gcs_chunk_size,
+                                resumable=True)
+        request = service \
             .objects() \
-            .insert(bucket=bucket, name=object, media_body=media) \
-            .execute()
+            .insert(bucket=bucket, name=object, media_body=media)
+        response = None
+        while response is None:
+            _, response = request.next_chunk(num_retries=manager.num_retries)
+
+        if manager.verify_checksums:
+            with open(filename, 'rb') as f:
+                expected = base64.b64encode(file_md5(f).digest()).decode('ascii')
+            manager.check('gs://{}/{}'.format(bucket, object),
+                          expected, response.get('md5Hash'))
+
+    # pylint:disable=redefined-builtin
+    def upload_many(self, transfers, mime_type='application/octet-stream'):
+        """
+        Uploads local files to Google Cloud Storage,
+        ``transfer_manager.concurrency`` files at a time.
+
+        :param transfers: (bucket, object, filename) tuples.
+        :type transfers: list[tuple]
+        :param mime_type: The MIME type to set when uploading the files.
+        :type mime_type: string
+        """
+        def upload(bucket, object, filename):
+            self.upload(bucket, object, filename, mime_type)
+
+        self.transfer_manager.run_many(upload, transfers)
 
     # pylint:disable=redefined-builtin
     def exists(self, bucket, object):
@@ -46,3 +46,9 @@ class VerticaHook(DbApiHook):
 
         conn = connect(**conn_config)
         return conn
+
+    def iterate_cursor(self, cursor):
+        """
+        Iterates over the rows of an executed vertica_python cursor
+        """
+        return cursor.iterate()
@@ -207,6 +207,8 @@ class AppEngineOperatorAsync(BaseOperator):
     :type kwargs: dict
     """
     template_fields = ['command_name']
+    # the command keeps running on App Engine and is adopted after a deploy
+    resumable_after_deploy = True
 
     @apply_defaults
     def __init__(self,
@@ -69,6 +69,10 @@ class GoogleCloudStorageDownloadOperator(BaseOperator):
         self.log.info('Executing download: %s, %s, %s', self.bucket, self.object, self.filename)
         hook = GoogleCloudStorageHook(google_cloud_storage_conn_id=self.google_cloud_storage_conn_id,
                                       delegate_to=self.delegate_to)
+        if self.filename and not self.store_to_xcom_key:
+            # streamed to the file chunk by chunk, never held in memory
+            hook.download_many([(self.bucket, self.object, self.filename)])
+            return
         file_bytes = hook.download(self.bucket, self.object, self.filename)
         if self.store_to_xcom_key:
             if sys.getsizeof(file_bytes) < 48000:
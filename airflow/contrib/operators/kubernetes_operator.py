@@ -27,6 +27,8 @@ POLL_BACKOFF_FACTOR = 1.25
 
 class KubernetesJobOperator(BaseOperator):
     template_fields = ('service_account_secret_name', )
+    # the job keeps running in Kubernetes and is picked up again after a deploy
+    resumable_after_deploy = True
 
     def __init__(self,
                  job_name,
@@ -22,6 +22,8 @@ class GoogleCloudStorageObjectSensor(BaseSensorOperator):
     """
     template_fields = ('bucket', 'object')
     ui_color = '#f0eee4'
+    poke_context_fields = (
+        'bucket', 'object', 'google_cloud_conn_id', 'delegate_to')
 
     @apply_defaults
     def __init__(
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from collections import deque
+
+
+class DagGraph(object):
+    """
+    Read-only adjacency index over the tasks of a DAG.
+
+    Every task gets an integer node id (tasks sorted by task_id) and the
+    edges are stored CSR-style: the relatives of node ``i`` are
+    ``indices[offsets[i]:offsets[i + 1]]``. Roots, leaves and the
+    topological order are computed once and cached, so traversals stop
+    paying for ``dag.get_task`` lookups and list membership tests.
+
+    The index is a snapshot: the DAG drops it whenever tasks or
+    relationships change, see ``DAG.graph``.
+
+    :param task_dict: the ``task_id -> task`` mapping of the DAG
+    :type task_dict: dict
+    """
+
+    def __init__(self, task_dict):
+        self._task_dict = task_dict
+        self._size = len(task_dict)
+
+        self.task_ids = sorted(task_dict.keys())
+        self.tasks = [task_dict[task_id] for task_id in self.task_ids]
+        self.index = {task_id: i for i, task_id in enumerate(self.task_ids)}
+
+        self.upstream_offsets, self.upstream_indices = self._build(upstream=True)
+        self.downstream_offsets, self.downstream_indices = self._build(
+            upstream=False)
+
+        self._roots = None
+        self._leaves = None
+        self._topological_order = None
+
+    def _build(self, upstream):
+        offsets = [0]
+        indices = []
+        index = self.index
+        for task in self.tasks:
+            if upstream:
+                relative_ids = task._upstream_task_ids
+            else:
+                relative_ids = task._downstream_task_ids
+            # relatives that are not part of the DAG (e.g. trimmed by
+            # sub_dag) are not part of the graph either
+            indices.extend(sorted(
+                index[task_id] for task_id in relative_ids if task_id in index))
+            offsets.append(len(indices))
+        return offsets, indices
+
+    def is_current(self, task_dict):
+        """
+        Whether this index was built from ``task_dict`` in its current shape.
+        """
+        return self._task_dict is task_dict and self._size == len(task_dict)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, task_id):
+        return task_id in self.index
+
+    def relative_nodes(self, node, upstream=False):
+        """
+        Node ids of the direct relatives of a node, upstream or downstream.
+        """
+        if upstream:
+            offsets, indices = self.upstream_offsets, self.upstream_indices
+        else:
+            offsets, indices = self.downstream_offsets, self.downstream_indices
+        return indices[offsets[node]:offsets[node + 1]]
+
+    def get_direct_relatives(self, task_id, upstream=False):
+        """
+        Direct relatives of a task, upstream or downstream.
+        """
+        tasks = self.tasks
+        return [tasks[i] for i in
+                self.relative_nodes(self.index[task_id], upstream)]
+
+    def get_flat_relative_nodes(self, task_id, upstream=False):
+        """
+        Node ids of all the relatives of a task, upstream or downstream,
+        in depth-first order. The task itself is not included.
+        """
+        start = self.index[task_id]
+        seen = bytearray(self._size)
+        seen[start] = 1
+        nodes = []
+        stack = list(reversed(self.relative_nodes(start, upstream)))
+        while stack:
+            node = stack.pop()
+            if seen[node]:
+                continue
+            seen[node] = 1
+            nodes.append(node)
+            stack.extend(reversed(self.relative_nodes(node, upstream)))
+        return nodes
+
+    def get_flat_relatives(self, task_id, upstream=False):
+        """
+        All the relatives of a task, upstream or downstream.
+        """
+        tasks = self.tasks
+        return [tasks[i] for i in
+                self.get_flat_relative_nodes(task_id, upstream)]
+
+    @property
+    def roots(self):
+        """
+        Tasks without any downstream task, which is what ``DAG.roots`` has
+        always returned (the tree view hangs off them).
+        """
+        if self._roots is None:
+            offsets = self.downstream_offsets
+            self._roots = [
+                task for i, task in enumerate(self.tasks)
+                if offsets[i] == offsets[i + 1]]
+        return self._roots
+
+    @property
+    def leaves(self):
+        """
+        Tasks without any upstream task.
+        """
+        if self._leaves is None:
+            offsets = self.upstream_offsets
+            self._leaves = [
+                task for i, task in enumerate(self.tasks)
+                if offsets[i] == offsets[i + 1]]
+        return self._leaves
+
+    def topological_sort(self):
+        """
+        Kahn's algorithm over the index. Returns the tasks ordered so that a
+        task comes after all of its upstream tasks, or None if the graph
+        contains a cycle.
+        """
+        if self._topological_order is None:
+            offsets = self.upstream_offsets
+            in_degree = [offsets[i + 1] - offsets[i] for i in range(self._size)]
+            ready = deque(i for i in range(self._size) if not in_degree[i])
+            order = []
+            while ready:
+                node = ready.popleft()
+                order.append(node)
+                for child in self.relative_nodes(node, upstream=False):
+                    in_degree[child] -= 1
+                    if not in_degree[child]:
+                        ready.append(child)
+            if len(order) < self._size:
+                return None
+            self._topological_order = tuple(self.tasks[i] for i in order)
+        return self._topological_order
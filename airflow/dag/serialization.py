@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+JSON representation of the structure of a DAG: its schedule, its tasks with
+their key fields and template fields, and the edges between them. The
+scheduler stores it (see ``airflow.models.SerializedDagModel``) so that the
+webserver and the API can show a DAG without importing the DAG file.
+
+A deserialized DAG is a regular ``DAG`` whose tasks are instances of
+``SerializedBaseOperator`` subclasses named after the original operator
+classes: they can be displayed, cleared or marked, but not executed.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from datetime import datetime, timedelta
+import hashlib
+import json
+
+import dateutil.parser
+import six
+
+from airflow.models import BaseOperator, DAG
+
+# bumped on incompatible changes, stored representations of another version
+# are ignored
+FORMAT_VERSION = 1
+
+DAG_FIELDS = [
+    'description', 'start_date', 'end_date', 'concurrency', 'max_active_runs',
+    'dagrun_timeout', 'default_view', 'orientation', 'catchup', 'params',
+    'doc_md', 'part_of', 'component', 'team',
+]
+TASK_FIELDS = [
+    'owner', 'email', 'email_on_retry', 'email_on_failure', 'retries',
+    'retry_delay', 'retry_exponential_backoff', 'max_retry_delay',
+    'start_date', 'end_date', 'depends_on_past', 'wait_for_downstream',
+    'params', 'adhoc', 'priority_weight', 'queue', 'pool', 'sla',
+    'execution_timeout', 'trigger_rule', 'run_as_user', 'task_concurrency',
+    'partner', 'part_of', 'component', 'team',
+]
+# set on the task after it is built, they are not BaseOperator arguments
+TASK_ATTRIBUTES = ['doc_md', 'resumable_after_deploy']
+
+
+def _encode(value):
+    if value is None or isinstance(value, (bool, float) + six.integer_types +
+                                   six.string_types):
+        return value
+    if isinstance(value, datetime):
+        return {'__type': 'datetime', '__value': value.isoformat()}
+    if isinstance(value, timedelta):
+        return {'__type': 'timedelta', '__value': value.total_seconds()}
+    if isinstance(value, dict):
+        return {'__type': 'dict',
+                '__value': {six.text_type(k): _encode(v)
+                            for k, v in value.items()}}
+    if isinstance(value, (list, tuple, set)):
+        return [_encode(v) for v in value]
+    return six.text_type(value)
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if value['__type'] == 'datetime':
+        return dateutil.parser.parse(value['__value'])
+    if value['__type'] == 'timedelta':
+        return timedelta(seconds=value['__value'])
+    return {k: _decode(v) for k, v in value['__value'].items()}
+
+
+def serialize_dag(dag):
+    """
+    :param dag: the DAG, as parsed from its file
+    :type dag: DAG
+    :return: the JSON compatible representation of the DAG
+    :rtype: dict
+    """
+    return {'__version': FORMAT_VERSION, 'dag': _serialize_dag(dag)}
+
+
+def _serialize_dag(dag):
+    data = {field: _encode(getattr(dag, field, None)) for field in DAG_FIELDS}
+    data['dag_id'] = dag.dag_id
+    data['fileloc'] = dag.full_filepath
+    if isinstance(dag.schedule_interval, timedelta):
+        data['schedule_interval'] = _encode(dag.schedule_interval)
+    else:
+        data['schedule_interval'] = dag.schedule_interval
+    data['tasks'] = [_serialize_task(task) for task in dag.tasks]
+    return data
+
+
+def _serialize_task(task):
+    data = {field: _encode(getattr(task, field, None))
+            for field in TASK_FIELDS + TASK_ATTRIBUTES}
+    data['task_id'] = task.task_id
+    data['task_type'] = task.task_type
+    data['ui_color'] = task.ui_color
+    data['ui_fgcolor'] = task.ui_fgcolor
+    data['template_fields'] = list(task.template_fields)
+    data['template_values'] = {
+        field: _encode(getattr(task, field, None))
+        for field in task.template_fields}
+    data['downstream_task_ids'] = sorted(task.downstream_task_ids)
+    if getattr(task, 'subdag', None) is not None:
+        data['subdag'] = _serialize_dag(task.subdag)
+    return data
+
+
+def dag_hash(data):
+    """
+    :return: the hash of a serialized DAG, to tell whether it changed
+    :rtype: str
+    """
+    return hashlib.sha1(
+        json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class SerializedBaseOperator(BaseOperator):
+    """
+    Stand-in for an operator of a deserialized DAG, carrying its fields but
+    not its code. ``operator_class`` makes one subclass per operator class
+    so that views grouping tasks by class keep working.
+    """
+
+    def execute(self, context):
+        raise NotImplementedError(
+            "{} was deserialized and cannot be executed".format(self))
+
+
+_operator_classes = {}
+
+
+def operator_class(task_type, ui_color, ui_fgcolor, template_fields):
+    """
+    :return: the SerializedBaseOperator subclass standing for the operator
+        class named task_type
+    """
+    key = (task_type, ui_color, ui_fgcolor, tuple(template_fields))
+    if key not in _operator_classes:
+        _operator_classes[key] = type(str(task_type), (SerializedBaseOperator,), {
+            'ui_color': ui_color,
+            'ui_fgcolor': ui_fgcolor,
+            'template_fields': tuple(template_fields),
+        })
+    return _operator_classes[key]
+
+
+def deserialize_dag(data):
+    """
+    :param data: a serialized DAG, see serialize_dag
+    :type data: dict
+    :return: the DAG, or None if it was serialized in another format version
+    :rtype: DAG
+    """
+    if data.get('__version') != FORMAT_VERSION:
+        return None
+    return _deserialize_dag(data['dag'])
+
+
+def _deserialize_dag(data):
+    kwargs = {field: _decode(data[field]) for field in DAG_FIELDS
+              if field != 'doc_md'}
+    dag = DAG(data['dag_id'],
+              schedule_interval=_decode(data['schedule_interval']),
+              full_filepath=data['fileloc'],
+              **kwargs)
+    dag.fileloc = data['fileloc']
+    dag.doc_md = data['doc_md']
+
+    for task_data in data['tasks']:
+        cls = operator_class(task_data['task_type'], task_data['ui_color'],
+                             task_data['ui_fgcolor'],
+                             task_data['template_fields'])
+        task = cls(task_id=task_data['task_id'], dag=dag,
+                   **{field: _decode(task_data[field]) for field in TASK_FIELDS})
+        for field in TASK_ATTRIBUTES:
+            setattr(task, field, task_data[field])
+        for field, value in task_data['template_values'].items():
+            setattr(task, field, _decode(value))
+        if 'subdag' in task_data:
+            task.subdag = _deserialize_dag(task_data['subdag'])
+            task.subdag.parent_dag = dag
+            task.subdag.is_subdag = True
+
+    for task_data in data['tasks']:
+        task = dag.get_task(task_data['task_id'])
+        for downstream_task_id in task_data['downstream_task_ids']:
+            task.set_downstream(dag.get_task(downstream_task_id))
+    return dag
@@ -38,3 +38,11 @@ class AirflowSkipException(AirflowException):
 
 class AirflowDagCycleException(AirflowException):
     pass
+
+
+class AirflowSmartSensorException(AirflowException):
+    """
+    Raised by a sensor that handed its pokes over to the sensor service; the
+    task instance is left in the ``sensing`` state.
+    """
+    pass
@@ -14,17 +14,40 @@
 
 from airflow.exceptions import AirflowException
 from airflow.contrib.hooks.aws_hook import AwsHook
+from airflow.utils.transfer import TransferManager, file_md5, s3_etag
 
+from multiprocessing.pool import ThreadPool
 from six import BytesIO
 from urllib.parse import urlparse
+import os
 import re
 import fnmatch
 
+
+def _etag_is_checksum(head):
+    # the ETag is no MD5 for KMS or customer key encryption, whether asked
+    # for or the default of the bucket
+    return (head.get('ServerSideEncryption') != 'aws:kms' and
+            not head.get('SSECustomerAlgorithm'))
+
+
 class S3Hook(AwsHook):
     """
     Interact with AWS S3, using the boto3 library.
+
+    Files are transferred by boto3's concurrent multipart engine, with the
+    part size and concurrency of ``transfer_manager`` (by default the ones of
+    the [transfer] configuration section).
+
+    :param transfer_manager: sizes, parallelizes and verifies transfers
+    :type transfer_manager: airflow.utils.transfer.TransferManager
     """
 
+    def __init__(self, *args, **kwargs):
+        self.transfer_manager = kwargs.pop('transfer_manager', None) or \
+            TransferManager()
+        super(S3Hook, self).__init__(*args, **kwargs)
+
     def get_conn(self):
         return self.get_client_type('s3')
 
@@ -64,12 +87,63 @@ class S3Hook(AwsHook):
     def check_for_prefix(self, bucket_name, prefix, delimiter):
         """
         Checks that a prefix exists in a bucket
+
+        The prefix exists as soon as one key starts with it, so this asks for
+        a single key instead of listing the whole level above the prefix.
         """
         prefix = prefix + delimiter if prefix[-1] != delimiter else prefix
-        prefix_split = re.split(r'(\w+[{d}])$'.format(d=delimiter), prefix, 1)
-        previous_level = prefix_split[0]
-        plist = self.list_prefixes(bucket_name, previous_level, delimiter)
-        return False if plist is None else prefix in plist        
+        response = self.get_conn().list_objects_v2(Bucket=bucket_name,
+                                                   Prefix=prefix,
+                                                   MaxKeys=1)
+        return len(response.get('Contents', [])) > 0
+
+    def _paginate(self, bucket_name, prefix='', delimiter='', page_size=None,
+                  client=None):
+        client = client or self.get_conn()
+        config = {'PageSize': page_size} if page_size else {}
+        paginator = client.get_paginator('list_objects_v2')
+        return paginator.paginate(Bucket=bucket_name,
+                                  Prefix=prefix,
+                                  Delimiter=delimiter,
+                                  PaginationConfig=config)
+
+    def iter_prefixes(self, bucket_name, prefix='', delimiter='',
+                      page_size=None):
+        """
+        Lazily lists prefixes in a bucket under prefix, requesting one page
+        of results at a time
+
+        :param bucket_name: the name of the bucket
+        :type bucket_name: str
+        :param prefix: a key prefix
+        :type prefix: str
+        :param delimiter: the delimiter marks key hierarchy.
+        :type delimiter: str
+        :param page_size: number of results per request, at most 1000
+        :type page_size: int
+        """
+        for page in self._paginate(bucket_name, prefix, delimiter, page_size):
+            for p in page.get('CommonPrefixes', []):
+                yield p['Prefix']
+
+    def iter_keys(self, bucket_name, prefix='', delimiter='', page_size=None):
+        """
+        Lazily lists keys in a bucket under prefix and not containing
+        delimiter, requesting one page of results at a time, so that callers
+        looking for one key stop listing as soon as they found it
+
+        :param bucket_name: the name of the bucket
+        :type bucket_name: str
+        :param prefix: a key prefix
+        :type prefix: str
+        :param delimiter: the delimiter marks key hierarchy.
+        :type delimiter: str
+        :param page_size: number of results per request, at most 1000
+        :type page_size: int
+        """
+        for page in self._paginate(bucket_name, prefix, delimiter, page_size):
+            for k in page.get('Contents', []):
+                yield k['Key']
 
     def list_prefixes(self, bucket_name, prefix='', delimiter=''):
         """
@@ -82,10 +156,7 @@ class S3Hook(AwsHook):
         :param delimiter: the delimiter marks key hierarchy.
         :type delimiter: str
         """
-        response = self.get_conn().list_objects_v2(Bucket=bucket_name, 
-                                                   Prefix=prefix, 
-                                                   Delimiter=delimiter)
-        return [p.Prefix for p in response['CommonPrefixes']] if response.get('CommonPrefixes') else None
+        return list(self.iter_prefixes(bucket_name, prefix, delimiter)) or None
 
     def list_keys(self, bucket_name, prefix='', delimiter=''):
         """
@@ -98,10 +169,52 @@ class S3Hook(AwsHook):
         :param delimiter: the delimiter marks key hierarchy.
         :type delimiter: str
         """
-        response = self.get_conn().list_objects_v2(Bucket=bucket_name, 
-                                                   Prefix=prefix, 
-                                                   Delimiter=delimiter)
-        return [k.Key for k in response['Contents']] if response.get('Contents') else None
+        return list(self.iter_keys(bucket_name, prefix, delimiter)) or None
+
+    def list_keys_sharded(self, bucket_name, prefix='', delimiter='/',
+                          max_workers=8, page_size=None):
+        """
+        Lists all keys in a bucket under prefix, like list_keys without a
+        delimiter, but lists the prefixes one delimiter level below prefix
+        (e.g. one per hour under a date) concurrently instead of paging
+        through the whole listing sequentially
+
+        :param bucket_name: the name of the bucket
+        :type bucket_name: str
+        :param prefix: a key prefix
+        :type prefix: str
+        :param delimiter: the delimiter splitting the listing into shards
+        :type delimiter: str
+        :param max_workers: maximum number of shards listed at the same time
+        :type max_workers: int
+        :param page_size: number of results per request, at most 1000
+        :type page_size: int
+        """
+        # boto3 clients are thread safe, creating them is not
+        client = self.get_conn()
+        keys = []
+        shards = []
+        for page in self._paginate(bucket_name, prefix, delimiter, page_size,
+                                   client=client):
+            keys.extend(k['Key'] for k in page.get('Contents', []))
+            shards.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+
+        def list_shard(shard):
+            return [k['Key']
+                    for page in self._paginate(bucket_name, shard,
+                                               page_size=page_size,
+                                               client=client)
+                    for k in page.get('Contents', [])]
+
+        if shards:
+            pool = ThreadPool(min(max_workers, len(shards)))
+            try:
+                for shard_keys in pool.map(list_shard, shards):
+                    keys.extend(shard_keys)
+            finally:
+                pool.close()
+                pool.join()
+        return sorted(keys) or None
 
     def check_for_key(self, key, bucket_name=None):
         """
@@ -148,6 +261,35 @@ class S3Hook(AwsHook):
         obj = self.get_key(key, bucket_name)
         return obj['Body'].read().decode('utf-8')    
 
+    def read_key_range(self, key, bucket_name=None, offset=0, length=None):
+        """
+        Reads part of a key from S3 with a ranged GET
+
+        :param key: S3 key that will point to the file
+        :type key: str
+        :param bucket_name: Name of the bucket in which the file is stored
+        :type bucket_name: str
+        :param offset: byte offset to read from, from the end if negative
+        :type offset: int
+        :param length: maximum number of bytes to read, None for all
+        :type length: int
+        :return: the bytes read, the offset they start at and the size of
+            the key
+        :rtype: tuple
+        """
+        if not bucket_name:
+            (bucket_name, key) = self.parse_s3_url(key)
+
+        conn = self.get_conn()
+        size = conn.head_object(Bucket=bucket_name, Key=key)['ContentLength']
+        start = max(0, size + offset) if offset < 0 else offset
+        if start >= size:
+            return b'', start, size
+        end = size if length is None else min(size, start + length)
+        obj = conn.get_object(Bucket=bucket_name, Key=key,
+                              Range='bytes={}-{}'.format(start, end - 1))
+        return obj['Body'].read(), start, size
+
     def check_for_wildcard_key(self,
                                wildcard_key, bucket_name=None, delimiter=''):
         """
@@ -169,12 +311,10 @@ class S3Hook(AwsHook):
         if not bucket_name:
             (bucket_name, wildcard_key) = self.parse_s3_url(wildcard_key)
         
-        prefix = re.split(r'[*]', wildcard_key, 1)[0]
-        klist = self.list_keys(bucket_name, prefix=prefix, delimiter=delimiter)
-        if klist:
-            key_matches = [k for k in klist if fnmatch.fnmatch(k, wildcard_key)]
-            if key_matches:
-                return self.get_key(key_matches[0], bucket_name)
+        prefix = re.split(r'[*?[]', wildcard_key, 1)[0]
+        for k in self.iter_keys(bucket_name, prefix=prefix, delimiter=delimiter):
+            if fnmatch.fnmatch(k, wildcard_key):
+                return self.get_key(k, bucket_name)
 
     def load_file(self,
                   filename,
@@ -205,12 +345,175 @@ class S3Hook(AwsHook):
         if not replace and self.check_for_key(key, bucket_name):
             raise ValueError("The key {key} already exists.".format(key=key))
         
+        self._upload_file(self.get_conn(), filename, key, bucket_name, encrypt)
+
+    def _upload_file(self, client, filename, key, bucket_name, encrypt):
         extra_args={}
         if encrypt:
             extra_args['ServerSideEncryption'] = "AES256"
-        
+
+        manager = self.transfer_manager
+        client.upload_file(filename, bucket_name, key, ExtraArgs=extra_args,
+                           Config=manager.s3_config())
+        if not manager.verify_checksums:
+            return
+        head = client.head_object(Bucket=bucket_name, Key=key)
+        if not _etag_is_checksum(head):
+            self.log.info('Cannot verify the checksum of %s', key)
+            return
+        with open(filename, 'rb') as f:
+            manager.check('s3://{}/{}'.format(bucket_name, key),
+                          head['ETag'].strip('"'),
+                          s3_etag(f, os.path.getsize(filename),
+                                  manager.part_size))
+
+    def upload_many(self, transfers, replace=False, encrypt=False):
+        """
+        Loads local files to S3, ``transfer_manager.concurrency`` files at a
+        time, each one by a concurrent multipart upload
+
+        :param transfers: (filename, key, bucket_name) tuples, see load_file
+        :type transfers: list[tuple]
+        :param replace: A flag to decide whether or not to overwrite the keys
+            if they already exist
+        :type replace: bool
+        :param encrypt: If True, the files will be encrypted on the
+            server-side by S3
+        :type encrypt: bool
+        """
+        # boto3 clients are thread safe, creating them is not
         client = self.get_conn()
-        client.upload_file(filename, bucket_name, key, ExtraArgs=extra_args)
+
+        def upload(filename, key, bucket_name=None):
+            if not bucket_name:
+                (bucket_name, key) = self.parse_s3_url(key)
+            if not replace and self._key_exists(client, key, bucket_name):
+                raise ValueError("The key {key} already exists.".format(key=key))
+            self._upload_file(client, filename, key, bucket_name, encrypt)
+
+        self.transfer_manager.run_many(upload, transfers)
+
+    def _key_exists(self, client, key, bucket_name):
+        try:
+            client.head_object(Bucket=bucket_name, Key=key)
+            return True
+        except:
+            return False
+
+    def load_fileobj(self,
+                     file_obj,
+                     key,
+                     bucket_name=None,
+                     replace=False,
+                     encrypt=False):
+        """
+        Loads a file object to S3, reading it sequentially and uploading its
+        parts concurrently, so it can be a pipe or a socket
+
+        :param file_obj: The file-like object to read from.
+        :type file_obj: file-like object
+        :param key: S3 key that will point to the file
+        :type key: str
+        :param bucket_name: Name of the bucket in which to store the file
+        :type bucket_name: str
+        :param replace: A flag to decide whether or not to overwrite the key
+            if it already exists
+        :type replace: bool
+        :param encrypt: If True, the file will be encrypted on the server-side
+            by S3 and will be stored in an encrypted form while at rest in S3.
+        :type encrypt: bool
+        """
+        if not bucket_name:
+            (bucket_name, key) = self.parse_s3_url(key)
+
+        if not replace and self.check_for_key(key, bucket_name):
+            raise ValueError("The key {key} already exists.".format(key=key))
+
+        extra_args={}
+        if encrypt:
+            extra_args['ServerSideEncryption'] = "AES256"
+
+        self.get_conn().upload_fileobj(
+            file_obj, bucket_name, key, ExtraArgs=extra_args,
+            Config=self.transfer_manager.s3_config())
+
+    def download_fileobj(self, key, file_obj, bucket_name=None):
+        """
+        Writes a key to a file object, downloading its parts concurrently
+        without holding the whole object in memory
+
+        :param key: S3 key that will point to the file
+        :type key: str
+        :param file_obj: The file-like object to write to, seekable or not
+        :type file_obj: file-like object
+        :param bucket_name: Name of the bucket in which the file is stored
+        :type bucket_name: str
+        """
+        if not bucket_name:
+            (bucket_name, key) = self.parse_s3_url(key)
+
+        self.get_conn().download_fileobj(
+            bucket_name, key, file_obj,
+            Config=self.transfer_manager.s3_config())
+
+    def download_file(self, key, filename, bucket_name=None):
+        """
+        Downloads a key to a local file, the parts concurrently
+
+        :param key: S3 key that will point to the file
+        :type key: str
+        :param filename: The local file path to write to
+        :type filename: str
+        :param bucket_name: Name of the bucket in which the file is stored
+        :type bucket_name: str
+        """
+        if not bucket_name:
+            (bucket_name, key) = self.parse_s3_url(key)
+
+        self._download_file(self.get_conn(), key, filename, bucket_name)
+
+    def _download_file(self, client, key, filename, bucket_name):
+        manager = self.transfer_manager
+        head = client.head_object(Bucket=bucket_name, Key=key)
+        client.download_file(bucket_name, key, filename,
+                             Config=manager.s3_config())
+        if not manager.verify_checksums:
+            return
+        etag = head['ETag'].strip('"')
+        actual = None
+        # the ETag of a multipart upload depends on its part size, which is
+        # only known if it matches the one of this manager
+        if _etag_is_checksum(head):
+            with open(filename, 'rb') as f:
+                if '-' not in etag:
+                    actual = file_md5(f).hexdigest()
+                else:
+                    actual = s3_etag(f, os.path.getsize(filename),
+                                     manager.part_size)
+                    if actual.split('-')[-1] != etag.split('-')[1]:
+                        actual = None
+        if actual is None:
+            self.log.info('Cannot verify the checksum of %s', key)
+        else:
+            manager.check('s3://{}/{}'.format(bucket_name, key), etag, actual)
+
+    def download_many(self, transfers):
+        """
+        Downloads keys to local files, ``transfer_manager.concurrency`` keys
+        at a time, each one by a concurrent multipart download
+
+        :param transfers: (key, filename, bucket_name) tuples, see
+            download_file
+        :type transfers: list[tuple]
+        """
+        client = self.get_conn()
+
+        def download(key, filename, bucket_name=None):
+            if not bucket_name:
+                (bucket_name, key) = self.parse_s3_url(key)
+            self._download_file(client, key, filename, bucket_name)
+
+        self.transfer_manager.run_many(download, transfers)
 
     def load_string(self, 
                     string_data,
@@ -16,6 +16,9 @@ from builtins import str
 from past.builtins import basestring
 from datetime import datetime
 from contextlib import closing
+from multiprocessing.pool import ThreadPool
+import gzip
+import os
 import sys
 
 from sqlalchemy import create_engine
@@ -36,6 +39,8 @@ class DbApiHook(BaseHook):
     supports_autocommit = False
     # Override with the object that exposes the connect method
     connector = None
+    # Token replaced by the range predicates of get_split_queries
+    split_conditions = '$CONDITIONS'
 
     def __init__(self, *args, **kwargs):
         if not self.conn_name_attr:
@@ -175,6 +180,119 @@ class DbApiHook(BaseHook):
         """
         return self.get_conn().cursor()
 
+    def iterate_cursor(self, cursor):
+        """
+        Returns an iterator over the rows of an executed cursor. Override
+        if the driver's cursors are not iterable.
+        """
+        return cursor
+
+    def get_split_queries(self, sql, split_by, num_chunks):
+        """
+        Splits a query into up to num_chunks queries over contiguous ranges
+        of the integer column split_by, to fetch its results in parallel.
+
+        Like Sqoop's free-form imports, a ``$CONDITIONS`` token in the query
+        is replaced by the range predicate of each chunk, which lets the
+        database use an index on split_by. Otherwise the query is wrapped in
+        a sub-query filtered on the range. Rows with a NULL split_by go to
+        the first chunk.
+
+        :param sql: the query to split
+        :type sql: str
+        :param split_by: integer column of the query's results to split on
+        :type split_by: str
+        :param num_chunks: number of chunks
+        :type num_chunks: int
+        :return: the queries of the chunks
+        :rtype: list[str]
+        """
+        if self.split_conditions not in sql:
+            sql = 'SELECT * FROM ({sql}) split_query WHERE {conditions}'.format(
+                sql=sql, conditions=self.split_conditions)
+        low, high = self.get_first(
+            'SELECT MIN({col}), MAX({col}) FROM ({sql}) split_bounds'.format(
+                col=split_by,
+                sql=sql.replace(self.split_conditions, '1 = 1')))
+        if low is None:
+            return [sql.replace(self.split_conditions, '1 = 1')]
+
+        low, high = int(low), int(high)
+        step = -(-(high - low + 1) // max(num_chunks, 1))
+        queries = []
+        for start in range(low, high + 1, step):
+            conditions = '{col} >= {start} AND {col} < {end}'.format(
+                col=split_by, start=start, end=start + step)
+            if start == low:
+                conditions = '({} OR {} IS NULL)'.format(conditions, split_by)
+            queries.append(sql.replace(self.split_conditions, conditions))
+        return queries
+
+    def dump_queries(self, queries, directory, delimiter=',', retries=2,
+                     parallelism=None, write_rows=None, suffix='.csv.gz'):
+        """
+        Runs queries concurrently, each on its own connection, and writes
+        the results of each to a file of directory, named
+        ``part-<index><suffix>``, by default gzip compressed delimited
+        files. A query that fails is retried from scratch up to retries
+        times.
+
+        :param queries: the queries, e.g. from get_split_queries
+        :type queries: list[str]
+        :param directory: the directory to write the files to
+        :type directory: str
+        :param delimiter: field delimiter in the files
+        :type delimiter: str
+        :param retries: number of times a failed query is retried
+        :type retries: int
+        :param parallelism: number of queries running at the same time,
+            all of them by default
+        :type parallelism: int
+        :param write_rows: writes the rows of a query to a file instead,
+            called with the cursor description, the rows and the filename
+        :type write_rows: callable
+        :param suffix: suffix of the file names
+        :type suffix: str
+        :return: the cursor description of the first query, None if there
+            are no queries
+        :rtype: tuple
+        """
+        def write_csv(description, rows, filename):
+            import unicodecsv as csv
+            with gzip.open(filename, 'wb') as f:
+                csv_writer = csv.writer(f, delimiter=delimiter, encoding='utf-8')
+                csv_writer.writerows(rows)
+
+        write_rows = write_rows or write_csv
+
+        def dump(index, sql):
+            filename = os.path.join(
+                directory, 'part-{:05d}{}'.format(index, suffix))
+            for attempt in range(retries + 1):
+                try:
+                    with closing(self.get_conn()) as conn:
+                        with closing(conn.cursor()) as cur:
+                            cur.execute(sql)
+                            write_rows(cur.description,
+                                       self.iterate_cursor(cur), filename)
+                            return cur.description
+                except Exception:
+                    if attempt == retries:
+                        raise
+                    self.log.exception("Chunk %s failed, retrying: %s",
+                                       index, sql)
+
+        if not queries:
+            return None
+        pool = ThreadPool(min(parallelism or len(queries), len(queries)))
+        try:
+            descriptions = pool.map(lambda args: dump(*args),
+                                    list(enumerate(queries)))
+        finally:
+            pool.close()
+            pool.join()
+        return descriptions[0]
+
     def insert_rows(self, table, rows, target_fields=None, commit_every=1000):
         """
         A generic way to insert a set of tuples into a table,
@@ -19,6 +19,7 @@ from past.builtins import basestring
 
 import unicodecsv as csv
 import itertools
+import os
 import re
 import subprocess
 import time
@@ -33,6 +34,18 @@ from airflow import configuration
 import airflow.security.utils as utils
 
 HIVE_QUEUE_PRIORITIES = ['VERY_HIGH', 'HIGH', 'NORMAL', 'LOW', 'VERY_LOW']
+# file formats HiveCliHook.load_file can stage data in
+HIVE_FILE_FORMATS = ['textfile', 'parquet', 'orc']
+# pyarrow types of the Hive column types, other columns are stored as strings
+HIVE_ARROW_TYPES = {
+    'BOOLEAN': 'bool_',
+    'TINYINT': 'int8',
+    'SMALLINT': 'int16',
+    'INT': 'int32',
+    'BIGINT': 'int64',
+    'FLOAT': 'float32',
+    'DOUBLE': 'float64',
+}
 
 
 class HiveCliHook(BaseHook):
@@ -273,7 +286,9 @@ class HiveCliHook(BaseHook):
             field_dict=None,
             delimiter=',',
             encoding='utf8',
-            pandas_kwargs=None, **kwargs):
+            pandas_kwargs=None,
+            file_format='textfile',
+            **kwargs):
         """
         Loads a pandas DataFrame into hive.
 
@@ -294,6 +309,8 @@ class HiveCliHook(BaseHook):
         :type encoding: str
         :param pandas_kwargs: passed to DataFrame.to_csv
         :type pandas_kwargs: dict
+        :param file_format: format of the staged file, see load_file
+        :type file_format: str
         :param kwargs: passed to self.load_file
         """
 
@@ -316,6 +333,18 @@ class HiveCliHook(BaseHook):
             pandas_kwargs = {}
 
         with TemporaryDirectory(prefix='airflow_hiveop_') as tmp_dir:
+            if file_format != 'textfile':
+                if field_dict is None:
+                    field_dict = _infer_field_types_from_df(df)
+                filepath = os.path.join(tmp_dir, 'data.' + file_format)
+                self.write_columnar_file(df.itertuples(index=False, name=None),
+                                         field_dict, filepath, file_format)
+                return self.load_file(filepath=filepath,
+                                      table=table,
+                                      field_dict=field_dict,
+                                      file_format=file_format,
+                                      **kwargs)
+
             with NamedTemporaryFile(dir=tmp_dir) as f:
 
                 if field_dict is None and (create or recreate):
@@ -339,18 +368,22 @@ class HiveCliHook(BaseHook):
             overwrite=True,
             partition=None,
             recreate=False,
-            tblproperties=None):
+            tblproperties=None,
+            file_format='textfile'):
         """
         Loads a local file into Hive
 
         Note that the table generated in Hive uses ``STORED AS textfile``
-        which isn't the most efficient serialization format. If a
-        large amount of data is loaded and/or if the tables gets
-        queried considerably, you may want to use this operator only to
-        stage the data into a temporary table before loading it into its
-        final destination using a ``HiveOperator``.
-
-        :param filepath: local filepath of the file to load
+        by default, which isn't the most efficient serialization format.
+        If a large amount of data is loaded and/or if the tables gets
+        queried considerably, you may want to stage the data as Parquet or
+        ORC files (see ``write_columnar_file``) into a table of that format,
+        or use this operator only to stage the data into a temporary table
+        before loading it into its final destination using a
+        ``HiveOperator``.
+
+        :param filepath: local filepath of the file to load, or of a
+            directory of files to load
         :type filepath: str
         :param table: target Hive table, use dot notation to target a
             specific database
@@ -372,7 +405,13 @@ class HiveCliHook(BaseHook):
         :type recreate: bool
         :param tblproperties: TBLPROPERTIES of the hive table being created
         :type tblproperties: dict
+        :param file_format: format of the file(s) to load and of the table
+            being created: textfile (delimited), parquet or orc
+        :type file_format: str
         """
+        if file_format not in HIVE_FILE_FORMATS:
+            raise ValueError("file_format must be one of {}".format(
+                HIVE_FILE_FORMATS))
         hql = ''
         if recreate:
             hql += "DROP TABLE IF EXISTS {table};\n"
@@ -386,9 +425,10 @@ class HiveCliHook(BaseHook):
                 pfields = ",\n    ".join(
                     [p + " STRING" for p in partition])
                 hql += "PARTITIONED BY ({pfields})\n"
-            hql += "ROW FORMAT DELIMITED\n"
-            hql += "FIELDS TERMINATED BY '{delimiter}'\n"
-            hql += "STORED AS textfile\n"
+            if file_format == 'textfile':
+                hql += "ROW FORMAT DELIMITED\n"
+                hql += "FIELDS TERMINATED BY '{delimiter}'\n"
+            hql += "STORED AS {file_format}\n"
             if tblproperties is not None:
                 tprops = ", ".join(
                     ["'{0}'='{1}'".format(k, v) for k, v in tblproperties.items()])
@@ -409,6 +449,75 @@ class HiveCliHook(BaseHook):
         self.log.info(hql)
         self.run_cli(hql)
 
+    @staticmethod
+    def write_columnar_file(rows, field_dict, filepath, file_format='parquet',
+                            batch_size=100000):
+        """
+        Writes rows to a Parquet or ORC file with pyarrow, batch_size rows
+        at a time, typed after the Hive types of field_dict so that the file
+        can be loaded into a table created from field_dict.
+
+        :param rows: the rows, sequences of values in field_dict's order
+        :type rows: iterable
+        :param field_dict: A dictionary of the fields name in the rows
+            as keys and their Hive types as values
+        :type field_dict: OrderedDict
+        :param filepath: path of the file to write
+        :type filepath: str
+        :param file_format: parquet or orc (pyarrow >= 4.0)
+        :type file_format: str
+        :param batch_size: number of rows per row group / stripe
+        :type batch_size: int
+        """
+        import pyarrow as pa
+
+        def to_string(value):
+            if value is None or value != value:
+                return None
+            if isinstance(value, bytes):
+                return value.decode('utf-8', 'replace')
+            return value if isinstance(value, basestring) else str(value)
+
+        def nullable(convert):
+            return lambda value: None if value is None else convert(value)
+
+        converters = {'bool_': nullable(bool), 'float32': nullable(float),
+                      'float64': nullable(float), 'string': to_string}
+        names = list(field_dict.keys())
+        types = [HIVE_ARROW_TYPES.get(t.upper(), 'string')
+                 for t in field_dict.values()]
+        convert = [converters.get(t, nullable(int)) for t in types]
+        types = [getattr(pa, t)() for t in types]
+
+        if file_format == 'parquet':
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(
+                filepath, pa.schema([pa.field(n, t) for n, t in zip(names, types)]))
+            write = writer.write_table
+        elif file_format == 'orc':
+            from pyarrow import orc
+            writer = orc.ORCWriter(filepath)
+            write = writer.write
+        else:
+            raise ValueError("Cannot write {} files".format(file_format))
+
+        try:
+            rows = iter(rows)
+            written = False
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                # an empty batch is only written for an empty file, which
+                # still needs the schema
+                if batch or not written:
+                    columns = [pa.array([c(row[i]) for row in batch], type=t)
+                               for i, (c, t) in enumerate(zip(convert, types))]
+                    write(pa.Table.from_arrays(columns, names=names))
+                    written = True
+                if len(batch) < batch_size:
+                    break
+        finally:
+            writer.close()
+
     def kill(self):
         if hasattr(self, 'sp'):
             if self.sp.poll() is None:
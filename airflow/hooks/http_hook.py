@@ -13,22 +13,85 @@
 # limitations under the License.
 
 from builtins import str
+from multiprocessing.pool import ThreadPool
+import os
+import threading
 
 import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from six.moves import http_client
+from urllib3.util.retry import Retry
 
+from airflow import configuration as conf
 from airflow.hooks.base_hook import BaseHook
 from airflow.exceptions import AirflowException
 
+# transport adapters, and the connections they keep open, shared by the hooks
+# of a process per connection id
+_adapters = {}
+_adapters_pid = None
+_adapters_lock = threading.Lock()
+
+
+def _forget_parent_adapters():
+    global _adapters_pid
+    if _adapters_pid != os.getpid():
+        # connections opened by the parent process are not shared with it
+        _adapters.clear()
+        _adapters_pid = os.getpid()
+
+
+def _get_adapter(http_conn_id):
+    with _adapters_lock:
+        _forget_parent_adapters()
+        if http_conn_id not in _adapters:
+            retries = Retry(
+                total=conf.getint('http', 'max_retries'),
+                backoff_factor=conf.getfloat('http', 'retry_backoff_factor'),
+                status_forcelist=(502, 503, 504),
+                raise_on_status=False)
+            _adapters[http_conn_id] = HTTPAdapter(
+                pool_maxsize=conf.getint('http', 'pool_size'),
+                max_retries=retries)
+        return _adapters[http_conn_id]
+
 
 class HttpHook(BaseHook):
     """
     Interact with HTTP servers.
+
+    The connections to the servers of a connection id are kept open and
+    reused by all the hooks of a process, see the [http] section of the
+    configuration for the size of the pools, the retries and the timeout.
     """
 
     def __init__(self, method='POST', http_conn_id='http_default'):
         self.http_conn_id = http_conn_id
         self.method = method
 
+    @staticmethod
+    def mount(http_conn_id, adapter):
+        """
+        Sends the requests to the connection id through ``adapter`` in this
+        process, e.g. a LocalHttpAdapter in tests.
+        """
+        with _adapters_lock:
+            _forget_parent_adapters()
+            _adapters[http_conn_id] = adapter
+
+    @staticmethod
+    def unmount(http_conn_id):
+        """
+        Closes the adapter of the connection id in this process, the next
+        requests go through a new pooled adapter.
+        """
+        with _adapters_lock:
+            _forget_parent_adapters()
+            adapter = _adapters.pop(http_conn_id, None)
+        if adapter is not None:
+            adapter.close()
+
     # headers is required to make it required
     def get_conn(self, headers):
         """
@@ -36,6 +99,9 @@ class HttpHook(BaseHook):
         """
         conn = self.get_connection(self.http_conn_id)
         session = requests.Session()
+        adapter = _get_adapter(self.http_conn_id)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
 
         if "://" in conn.host:
             self.base_url = conn.host
@@ -98,7 +164,8 @@ class HttpHook(BaseHook):
             verify=extra_options.get("verify", False),
             proxies=extra_options.get("proxies", {}),
             cert=extra_options.get("cert"),
-            timeout=extra_options.get("timeout"),
+            timeout=extra_options.get(
+                "timeout", conf.getfloat('http', 'timeout') or None),
             allow_redirects=extra_options.get("allow_redirects", True))
 
         try:
@@ -116,3 +183,75 @@ class HttpHook(BaseHook):
                 self.log.error(response.text)
             raise AirflowException(str(response.status_code)+":"+response.reason)
         return response
+
+    def run_many(self, requests_kwargs, concurrency=None):
+        """
+        Performs many requests concurrently, over the pooled connections
+
+        :param requests_kwargs: the keyword arguments of run for each
+            request: endpoint, and optionally data, headers and
+            extra_options
+        :type requests_kwargs: list of dict
+        :param concurrency: number of requests sent at the same time,
+            [http] pool_size by default
+        :type concurrency: int
+        :return: the responses, in order. The first error is raised once
+            the requests already sent are over.
+        """
+        requests_kwargs = list(requests_kwargs)
+        if not requests_kwargs:
+            return []
+        concurrency = concurrency or conf.getint('http', 'pool_size')
+        pool = ThreadPool(min(concurrency, len(requests_kwargs)))
+        try:
+            return pool.map(lambda kwargs: self.run(**kwargs), requests_kwargs)
+        finally:
+            pool.close()
+            pool.join()
+
+
+class LocalHttpAdapter(BaseAdapter):
+    """
+    Answers requests from registered responses instead of the network, to
+    test code using HttpHook without a server::
+
+        adapter = LocalHttpAdapter()
+        adapter.register('GET', 'http://localhost/health', text='OK')
+        HttpHook.mount('http_default', adapter)
+
+    The requests sent are kept in ``requests``. Unregistered URLs get a 404.
+    ``HttpHook.unmount('http_default')`` goes back to the network.
+    """
+
+    def __init__(self):
+        super(LocalHttpAdapter, self).__init__()
+        self.responses = {}
+        self.requests = []
+
+    def register(self, method, url, status_code=200, text='', headers=None):
+        """
+        Answers the requests to url, whatever their query string, with the
+        given response
+        """
+        self.responses[(method.upper(), url)] = (status_code, text,
+                                                 headers or {})
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        status_code, text, headers = self.responses.get(
+            (request.method, request.url.split('?')[0]),
+            (404, '', {}))
+
+        response = requests.Response()
+        response.status_code = status_code
+        response.reason = http_client.responses.get(status_code, '')
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = 'utf-8'
+        response._content = text.encode('utf-8')
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
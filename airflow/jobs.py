@@ -18,6 +18,7 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import getpass
+import importlib
 import logging
 import multiprocessing
 import os
@@ -25,14 +26,16 @@ import psutil
 import signal
 import six
 import socket
+import subprocess
 import sys
 import threading
 import time
 from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timedelta
+from multiprocessing.pool import ThreadPool
 from past.builtins import basestring
 from sqlalchemy import (
-    Column, Integer, String, DateTime, func, Index, or_, and_, not_)
+    Column, Integer, String, DateTime, func, Index, or_, and_, not_, exists)
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm.session import make_transient
 from tabulate import tabulate
@@ -57,6 +60,7 @@ from airflow.utils.db import (
 from airflow.utils.email import send_email
 from airflow.utils.log.logging_mixin import LoggingMixin, StreamLogWriter
 from airflow.utils.state import State, SchedulerStates
+from airflow.utils.trigger_rule import TriggerRule
 
 Base = models.Base
 ID_LEN = models.ID_LEN
@@ -302,7 +306,8 @@ class DagFileProcessor(AbstractDagFileProcessor, LoggingMixin):
     # Counter that increments everytime an instance of this class is created
     class_creation_counter = 0
 
-    def __init__(self, file_path, pickle_dags, dag_id_white_list):
+    def __init__(self, file_path, pickle_dags, dag_id_white_list,
+                 check_slas=True):
         """
         :param file_path: a Python file containing Airflow DAG definitions
         :type file_path: unicode
@@ -310,6 +315,8 @@ class DagFileProcessor(AbstractDagFileProcessor, LoggingMixin):
         :type pickle_dags: bool
         :param dag_id_whitelist: If specified, only look at these DAG ID's
         :type dag_id_whitelist: list[unicode]
+        :param check_slas: whether to check the SLAs of the DAGs in the file
+        :type check_slas: bool
         """
         self._file_path = file_path
         # Queue that's used to pass results from the child process.
@@ -318,6 +325,7 @@ class DagFileProcessor(AbstractDagFileProcessor, LoggingMixin):
         self._process = None
         self._dag_id_white_list = dag_id_white_list
         self._pickle_dags = pickle_dags
+        self._check_slas = check_slas
         # The result of Scheduler.process_file(file_path).
         self._result = None
         # Whether the process is done running.
@@ -338,7 +346,8 @@ class DagFileProcessor(AbstractDagFileProcessor, LoggingMixin):
                         file_path,
                         pickle_dags,
                         dag_id_white_list,
-                        thread_name):
+                        thread_name,
+                        check_slas=True):
         """
         Launch a process to process the given file.
 
@@ -354,6 +363,8 @@ class DagFileProcessor(AbstractDagFileProcessor, LoggingMixin):
         :type dag_id_white_list: list[unicode]
         :param thread_name: the name to use for the process that is launched
         :type thread_name: unicode
+        :param check_slas: whether to check the SLAs of the DAGs in the file
+        :type check_slas: bool
         :return: the process that was launched
         :rtype: multiprocessing.Process
         """
@@ -390,7 +401,8 @@ class DagFileProcessor(AbstractDagFileProcessor, LoggingMixin):
                          os.getpid(), file_path)
                 scheduler_job = SchedulerJob(dag_ids=dag_id_white_list, log=log)
                 result = scheduler_job.process_file(file_path,
-                                                    pickle_dags)
+                                                    pickle_dags,
+                                                    check_slas)
                 result_queue.put(result)
                 end_time = time.time()
                 log.info(
@@ -419,7 +431,8 @@ class DagFileProcessor(AbstractDagFileProcessor, LoggingMixin):
             self.file_path,
             self._pickle_dags,
             self._dag_id_white_list,
-            "DagFileProcessor{}".format(self._instance_id))
+            "DagFileProcessor{}".format(self._instance_id),
+            self._check_slas)
         self._start_time = datetime.utcnow()
 
     def terminate(self, sigkill=False):
@@ -598,6 +611,30 @@ class SchedulerJob(BaseJob):
         # Parse and schedule each file no faster than this interval. Default
         # to 3 minutes.
         self.file_process_interval = file_process_interval
+        # Check the SLAs of the DAGs of a file no faster than this interval.
+        # 0 checks them every time the file is processed.
+        self.sla_check_interval = conf.getint('scheduler', 'sla_check_interval')
+        # Look for zombie and deploy orphaned task instances no faster than
+        # this interval.
+        self.zombie_detection_interval = conf.getint(
+            'scheduler', 'zombie_detection_interval')
+        self.zombie_task_threshold = conf.getint(
+            'scheduler', 'scheduler_zombie_task_threshold')
+        # The DAGs of the zombies, parsed the first time they are needed to
+        # send the failure emails and run the callbacks of their tasks
+        self.zombie_dagbag = None
+        # Read the scheduler state (running, pausing for a redeploy, idle)
+        # from the database no faster than this interval.
+        self.scheduler_state_refresh_interval = conf.getint(
+            'scheduler', 'scheduler_state_refresh_interval')
+        # Operators whose running tasks a redeploy does not wait for, from
+        # the operator classes of this process and of the DAGs processed,
+        # and the ones last recorded for the other processes to read.
+        self.resumable_operators = models.get_resumable_operators()
+        self.recorded_resumable_operators = None
+        # Store the serialized DAGs for the webserver and the API to read.
+        self.store_serialized_dags = conf.getboolean(
+            'core', 'store_serialized_dags')
 
         self.max_tis_per_query = conf.getint('scheduler', 'max_tis_per_query')
         if run_duration is None:
@@ -641,20 +678,39 @@ class SchedulerJob(BaseJob):
 
         ts = datetime.utcnow()
         SlaMiss = models.SlaMiss
+        missed = []
         for ti in max_tis:
             task = dag.get_task(ti.task_id)
-            dttm = ti.execution_date
-            if task.sla:
-                dttm = dag.following_schedule(dttm)
-                while dttm < datetime.utcnow():
-                    following_schedule = dag.following_schedule(dttm)
-                    if following_schedule + task.sla < datetime.utcnow():
-                        session.merge(models.SlaMiss(
-                            task_id=ti.task_id,
-                            dag_id=ti.dag_id,
-                            execution_date=dttm,
-                            timestamp=ts))
-                    dttm = dag.following_schedule(dttm)
+            if not task.sla:
+                continue
+            # The period starting at a schedule date missed its SLA once the
+            # following schedule date plus the SLA is in the past, that is
+            # for every schedule date before the last one preceding ts - sla.
+            last_missed = dag.previous_schedule(ts - task.sla)
+            if last_missed is None:
+                continue
+            missed.extend(
+                (ti.task_id, dttm)
+                for dttm in dag.get_schedules_between(ti.execution_date, last_missed))
+
+        if missed:
+            recorded = set(
+                (task_id, execution_date)
+                for task_id, execution_date in session
+                .query(SlaMiss.task_id, SlaMiss.execution_date)
+                .filter(SlaMiss.dag_id == dag.dag_id)
+                .filter(SlaMiss.execution_date >= min(d for _, d in missed)))
+            new_misses = [{
+                'task_id': task_id,
+                'dag_id': dag.dag_id,
+                'execution_date': execution_date,
+                'timestamp': ts,
+                'email_sent': False,
+                'notification_sent': False,
+            } for task_id, execution_date in missed
+                if (task_id, execution_date) not in recorded]
+            if new_misses:
+                session.bulk_insert_mappings(SlaMiss, new_misses)
         session.commit()
 
         slas = (
@@ -967,6 +1023,160 @@ class SchedulerJob(BaseJob):
                     self.log.debug('Queuing task: %s', ti)
                     queue.append(ti.key)
 
+    @provide_session
+    def _kill_zombies(self, dagbag=None, session=None):
+        """
+        Finds, with one query, the running task instances whose LocalTaskJob
+        stopped or missed its heartbeats for scheduler_zombie_task_threshold
+        seconds (zombies), or last heartbeat before the last deploy (deploy
+        orphans). Zombies are set up for retry, or failed when out of
+        retries, and deploy orphans reset to no state, in bulk. They are
+        taken off the executor too, so that they can be queued again right
+        away.
+
+        Zombies are then counted as failed tries, and the emails and
+        callbacks of the ones whose task is found in dagbag are handled
+        like for any other failure.
+
+        :param dagbag: the DAGs of the zombies, by default a LazyDagBag
+            parsing the files of only those DAGs
+        :type dagbag: airflow.models.DagBag
+        """
+        TI = models.TaskInstance
+        LJ = LocalTaskJob
+        now = datetime.utcnow()
+        limit_dttm = now - timedelta(seconds=self.zombie_task_threshold)
+        last_deployed = (
+            session
+                .query(func.max(models.LastDeployedTime.last_deployed))
+                .as_scalar()
+        )
+        rows = (
+            session
+                .query(TI.dag_id, TI.task_id, TI.execution_date, TI.start_date,
+                       TI.try_number, TI.max_tries, LJ.latest_heartbeat,
+                       last_deployed.label('last_deployed'))
+                .join(LJ, TI.job_id == LJ.id)
+                .filter(TI.state == State.RUNNING)
+                .filter(or_(
+                    LJ.state != State.RUNNING,
+                    LJ.latest_heartbeat < limit_dttm,
+                    LJ.latest_heartbeat < last_deployed,
+                ))
+                .with_for_update()
+                .all()
+        )
+
+        if not rows:
+            return
+
+        zombies = []
+        orphans = []
+        logs = []
+        task_fails = []
+        for row in rows:
+            self.executor.running.pop(
+                (row.dag_id, row.task_id, row.execution_date), None)
+            self.executor.queued_tasks.pop(
+                (row.dag_id, row.task_id, row.execution_date), None)
+            key = {
+                'dag_id': row.dag_id,
+                'task_id': row.task_id,
+                'execution_date': row.execution_date,
+            }
+            ti = dict(
+                key, end_date=now, hostname=None,
+                duration=((now - row.start_date).total_seconds()
+                          if row.start_date else None))
+            if (row.last_deployed and row.latest_heartbeat and
+                    row.latest_heartbeat < row.last_deployed):
+                ti['state'] = event = State.NONE
+                orphans.append(ti)
+            else:
+                # try_number was incremented when the task started running,
+                # see TaskInstance.handle_retry_event
+                if row.try_number <= (row.max_tries or 0):
+                    ti['state'] = State.UP_FOR_RETRY
+                else:
+                    ti['state'] = State.FAILED
+                event = State.FAILED
+                zombies.append(ti)
+                if row.start_date:
+                    task_fails.append(dict(
+                        key, start_date=row.start_date, end_date=now,
+                        duration=ti['duration']))
+            logs.append(dict(key, dttm=now, event=event))
+
+        session.bulk_update_mappings(TI, zombies + orphans)
+        session.bulk_insert_mappings(models.Log, logs)
+        session.bulk_insert_mappings(models.TaskFail, task_fails)
+        session.commit()
+
+        for stat, tis in (('zombies_killed', zombies),
+                          ('deploy_zombies', orphans)):
+            for ti in tis:
+                Stats.incr(stat, tags=['task_id:%s' % ti['task_id'],
+                                       'dag_id:%s' % ti['dag_id']])
+        self.log.warning(
+            "Killed %s zombie task instances and reset %s deploy orphans: %s",
+            len(zombies), len(orphans),
+            ', '.join('{dag_id}.{task_id} {execution_date} -> {state}'.format(**ti)
+                      for ti in zombies + orphans))
+
+        if not zombies:
+            return
+        if dagbag is None:
+            if self.zombie_dagbag is None:
+                self.zombie_dagbag = models.LazyDagBag(
+                    self.subdir, read_serialized=False)
+            dagbag = self.zombie_dagbag
+        batch_size = self.max_tis_per_query or len(zombies)
+        for i in range(0, len(zombies), batch_size):
+            for ti in session.query(TI).filter(or_(*[
+                    and_(TI.dag_id == zombie['dag_id'],
+                         TI.task_id == zombie['task_id'],
+                         TI.execution_date == zombie['execution_date'])
+                    for zombie in zombies[i:i + batch_size]])):
+                self._handle_zombie_failure(ti, dagbag, session=session)
+            session.commit()
+
+    def _handle_zombie_failure(self, ti, dagbag, session):
+        """
+        Counts the failed try of a zombie task instance, already set up for
+        retry or failed, and when its task is found in dagbag deletes its
+        Kubernetes job, if any, sends its emails and runs its callbacks.
+        """
+        tags = ['task_id:%s' % ti.task_id, 'dag_id:%s' % ti.dag_id]
+        Stats.incr('operator_failures_{}'.format(ti.operator), tags=tags)
+        Stats.incr('ti_failures', tags=tags + ['operator:%s' % ti.operator])
+        try:
+            dag = dagbag.get_dag(ti.dag_id)
+            if dag is not None and dag.has_task(ti.task_id):
+                ti.task = dag.get_task(ti.task_id)
+        except Exception:
+            self.log.exception("Cannot load the DAG of zombie %s", ti)
+        models.TaskInstanceStat.record(ti, failed=True, session=session)
+
+        if getattr(ti, 'task', None) is None:
+            self.log.warning(
+                "Task of zombie %s not found, its emails and callbacks are "
+                "not handled", ti)
+            return
+        if ti.operator == "KubernetesJobOperator":
+            from airflow.contrib.utils.kubernetes_utils import uniquify_job_name
+            try:
+                ti.task.clean_up(uniquify_job_name(
+                    ti.task, {'execution_date': ti.execution_date}))
+            except subprocess.CalledProcessError:
+                self.log.error(
+                    "Failed to delete pod - it may have already been destroyed.")
+        try:
+            context = ti.get_template_context(session=session)
+        except Exception:
+            self.log.exception("Cannot get the context of zombie %s", ti)
+            context = None
+        ti.alert_failure("{} killed as zombie".format(ti), context)
+
     @provide_session
     def _remove_zombies_from_executor(self,
                                              simple_dag_bag,
@@ -1424,7 +1634,7 @@ class SchedulerJob(BaseJob):
                 total_tis_queued += len(tis_with_state_changed)
             return total_tis_queued
 
-    def _process_dags(self, dagbag, dags, tis_out):
+    def _process_dags(self, dagbag, dags, tis_out, check_slas=True):
         """
         Iterates over the dags and processes them. Processing includes:
 
@@ -1438,6 +1648,8 @@ class SchedulerJob(BaseJob):
         :type dags: DAG
         :param tis_out: A queue to add generated TaskInstance objects
         :type tis_out: multiprocessing.Queue[TaskInstance]
+        :param check_slas: whether to check the SLAs of the DAGs
+        :type check_slas: bool
         :return: None
         """
 
@@ -1457,7 +1669,8 @@ class SchedulerJob(BaseJob):
             if dag_run:
                 self.log.info("Created %s", dag_run)
             self._process_task_instances(dag, tis_out)
-            self.manage_slas(dag)
+            if check_slas:
+                self.manage_slas(dag)
 
         models.DagStat.update([d.dag_id for d in dags])
 
@@ -1574,10 +1787,20 @@ class SchedulerJob(BaseJob):
         known_file_paths = list_py_file_paths(self.subdir)
         self.log.info("There are %s files in %s", len(known_file_paths), self.subdir)
 
+        # SLAs are checked on their own cadence, decided here since the
+        # processors do not outlive the processing of their file
+        last_sla_checks = {}
+
         def processor_factory(file_path):
+            now = time.time()
+            check_slas = (now - last_sla_checks.get(file_path, 0) >=
+                          self.sla_check_interval)
+            if check_slas:
+                last_sla_checks[file_path] = now
             return DagFileProcessor(file_path,
                                     pickle_dags,
-                                    self.dag_ids)
+                                    self.dag_ids,
+                                    check_slas=check_slas)
 
         processor_manager = DagFileProcessorManager(self.subdir,
                                                     known_file_paths,
@@ -1637,6 +1860,8 @@ class SchedulerJob(BaseJob):
 
         # Last time stats were printed
         last_stat_print_time = datetime(2000, 1, 1)
+        # Last time zombie task instances were looked for
+        last_zombie_detection_time = datetime(2000, 1, 1)
         # Last time that self.heartbeat() was called.
         last_self_heartbeat_time = datetime.utcnow()
         # Last time that the DAG dir was traversed to look for files
@@ -1681,6 +1906,19 @@ class SchedulerJob(BaseJob):
 
             # Send tasks for execution if available
             simple_dag_bag = SimpleDagBag(simple_dags)
+            for simple_dag in simple_dags:
+                self.resumable_operators.update(simple_dag.resumable_operators)
+            if self.resumable_operators != self.recorded_resumable_operators:
+                SchedulerState().set_resumable_operators(self.resumable_operators)
+                self.recorded_resumable_operators = set(self.resumable_operators)
+
+            if ((datetime.utcnow() - last_zombie_detection_time).total_seconds() >=
+                    self.zombie_detection_interval):
+                try:
+                    self._kill_zombies()
+                except Exception:
+                    self.log.exception("Error killing zombies!")
+                last_zombie_detection_time = datetime.utcnow()
 
             self._remove_zombies_from_executor(simple_dag_bag)
 
@@ -1704,7 +1942,8 @@ class SchedulerJob(BaseJob):
                                                            State.SCHEDULED],
                                                           State.NONE)
 
-                scheduler_state = SchedulerState().get_state()
+                scheduler_state = SchedulerState().get_state(
+                    max_age=self.scheduler_state_refresh_interval)
 
                 # Only start new operators if scheduler is in state running.
                 if scheduler_state == SchedulerStates.RUNNING:
@@ -1773,17 +2012,19 @@ class SchedulerJob(BaseJob):
 
     @provide_session
     def _airflow_ready_for_redeploy(self, session=None):
+        """
+        We are ready to redeploy once no task is running but the ones of
+        operators resumable after a deploy.
+        """
         TI = models.TaskInstance
-        # We are not ready to redeploy if there are any runnable tasks that,
-        tis = session.query(TI).filter(TI.state == State.RUNNING).all()
-        for ti in tis:
-            # are not resumable post-deploy.
-            if ti.state in [State.RUNNING, State.QUEUED, State.UP_FOR_RETRY] and ti.operator not in ["KubernetesJobOperator", "AppEngineOperatorAsync"]:
-                return False
-        return True
+        blocking = SchedulerState.redeploy_blockers(
+            session, self.resumable_operators, func.count(TI.task_id)).scalar()
+        self.log.info("Waiting for %s task instances before redeploying", blocking)
+        return blocking == 0
 
     @provide_session
-    def process_file(self, file_path, pickle_dags=False, session=None):
+    def process_file(self, file_path, pickle_dags=False, check_slas=True,
+                     session=None):
         """
         Process a Python file containing Airflow DAGs.
 
@@ -1794,8 +2035,6 @@ class SchedulerJob(BaseJob):
         3. For each DAG, see what tasks should run and create appropriate task
         instances in the DB.
         4. Record any errors importing the file into ORM
-        5. Kill (in ORM) any task instances belonging to the DAGs that haven't
-        issued a heartbeat in a while.
 
         Returns a list of SimpleDag objects that represent the DAGs found in
         the file
@@ -1805,6 +2044,9 @@ class SchedulerJob(BaseJob):
         :param pickle_dags: whether serialize the DAGs found in the file and
         save them to the db
         :type pickle_dags: bool
+        :param check_slas: whether to check the SLAs of the DAGs found in the
+        file
+        :type check_slas: bool
         :return: a list of SimpleDags made from the Dags found in the file
         :rtype: list[SimpleDag]
         """
@@ -1830,6 +2072,14 @@ class SchedulerJob(BaseJob):
         for dag in dagbag.dags.values():
             dag.sync_to_db()
 
+        if self.store_serialized_dags:
+            try:
+                models.SerializedDagModel.write_dags(
+                    dagbag.dags.values(), session=session)
+            except Exception:
+                self.log.exception("Failed at serializing the DAGs of %s",
+                                   file_path)
+
         paused_dag_ids = [dag.dag_id for dag in dagbag.dags.values()
                           if dag.is_paused]
 
@@ -1858,7 +2108,7 @@ class SchedulerJob(BaseJob):
         # returns true?)
         ti_keys_to_schedule = []
 
-        self._process_dags(dagbag, dags, ti_keys_to_schedule)
+        self._process_dags(dagbag, dags, ti_keys_to_schedule, check_slas)
 
         for ti_key in ti_keys_to_schedule:
             dag = dagbag.dags[ti_key[0]]
@@ -1894,10 +2144,6 @@ class SchedulerJob(BaseJob):
             self.update_import_errors(session, dagbag)
         except Exception:
             self.log.exception("Error logging import errors!")
-        try:
-            dagbag.kill_zombies()
-        except Exception:
-            self.log.exception("Error killing zombies!")
 
         return simple_dags
 
@@ -1978,6 +2224,9 @@ class BackfillJob(BaseJob):
             self.executed_dag_run_dates = executed_dag_run_dates or set()
             self.finished_runs = finished_runs
             self.total_runs = total_runs
+            # task instances sent to the executor by the last loop
+            self.submitted = 0
+            self.start_time = datetime.utcnow()
 
     def __init__(
             self,
@@ -2005,15 +2254,140 @@ class BackfillJob(BaseJob):
         self.delay_on_limit_secs = delay_on_limit_secs
         super(BackfillJob, self).__init__(*args, **kwargs)
 
-    def _update_counters(self, ti_status):
+    @provide_session
+    def _refresh_task_instances(self, tis, session=None):
+        """
+        Refreshes task instances from the database like
+        TaskInstance.refresh_from_db, with one query per chunk of their dag
+        runs instead of one query per task instance.
+        :param tis: task instances of this job's dag
+        :type tis: list[TaskInstance]
+        :return: the state of every task instance of those dag runs keyed by
+            (task_id, execution_date)
+        :rtype: dict
+        """
+        TI = models.TaskInstance
+        execution_dates = sorted({ti.execution_date for ti in tis})
+        rows = {}
+        batch_size = self.max_tis_per_query or 500
+        for i in range(0, len(execution_dates), batch_size):
+            rows.update(
+                ((row.task_id, row.execution_date), row)
+                for row in session.query(
+                    TI.task_id, TI.execution_date, TI.state, TI.start_date,
+                    TI.end_date, TI.try_number, TI.max_tries, TI.hostname,
+                    TI.pid,
+                ).filter(
+                    TI.dag_id == self.dag_id,
+                    TI.execution_date.in_(execution_dates[i:i + batch_size]),
+                ))
+        session.commit()
+
+        for ti in tis:
+            row = rows.get((ti.task_id, ti.execution_date))
+            if row:
+                ti.state = row.state
+                ti.start_date = row.start_date
+                ti.end_date = row.end_date
+                ti.try_number = row.try_number
+                ti.max_tries = row.max_tries
+                ti.hostname = row.hostname
+                ti.pid = row.pid
+            else:
+                ti.state = None
+        return {key: row.state for key, row in rows.items()}
+
+    def _upstream_pending(self, ti, run_states):
+        """
+        Whether the trigger rule of a task instance certainly fails because
+        of upstream task instances still to finish, told from the states of
+        the current loop so no dependency query is needed. Only all_success
+        tasks with no failed or skipped upstream qualify, the trigger rule
+        would not flag them.
+        """
+        if (self.ignore_task_deps or
+                ti.task.trigger_rule != TriggerRule.ALL_SUCCESS):
+            return False
+        pending = False
+        for task_id in ti.task.upstream_task_ids:
+            state = run_states.get((task_id, ti.execution_date), False)
+            if state is False or state in (
+                    State.FAILED, State.UPSTREAM_FAILED, State.SKIPPED):
+                return False
+            if state != State.SUCCESS:
+                pending = True
+        return pending
+
+    @provide_session
+    def _queue_task_instances(self, ready, ti_status, executor, pickle_id,
+                              session=None):
+        """
+        Sends the task instances whose dependencies are met to the executor,
+        locking and setting them to QUEUED in one query and one commit per
+        batch of max_tis_per_query.
+        :param ready: (key, task instance, ignore_depends_on_past) triples
+        :type ready: list[tuple]
+        :return: the number of task instances sent to the executor
+        :rtype: int
+        """
+        if not ready:
+            return 0
+        TI = models.TaskInstance
+        submitted = 0
+        batch_size = self.max_tis_per_query or len(ready)
+        for i in range(0, len(ready), batch_size):
+            batch = ready[i:i + batch_size]
+            locked = {
+                locked_ti.key: locked_ti
+                for locked_ti in session.query(TI).filter(
+                    TI.dag_id == self.dag_id,
+                    or_(*[and_(TI.task_id == ti.task_id,
+                               TI.execution_date == ti.execution_date)
+                          for _, ti, _ in batch]),
+                ).with_for_update().all()}
+
+            to_queue = []
+            for key, ti, ignore_depends_on_past in batch:
+                locked_ti = locked.get(key)
+                ti.state = locked_ti.state if locked_ti else None
+                if ti.state not in (State.SCHEDULED, State.UP_FOR_RETRY):
+                    continue
+                if executor.has_task(ti):
+                    self.log.debug(
+                        "Task Instance %s already in executor waiting for queue to clear",
+                        ti
+                    )
+                    continue
+                self.log.debug('Sending %s to executor', ti)
+                # Skip scheduled state, we are executing immediately
+                ti.state = locked_ti.state = State.QUEUED
+                to_queue.append((key, ti, ignore_depends_on_past))
+            session.commit()
+
+            for key, ti, ignore_depends_on_past in to_queue:
+                executor.queue_task_instance(
+                    ti,
+                    mark_success=self.mark_success,
+                    pickle_id=pickle_id,
+                    ignore_task_deps=self.ignore_task_deps,
+                    ignore_depends_on_past=ignore_depends_on_past,
+                    pool=self.pool)
+                ti_status.started[key] = ti
+                ti_status.to_run.pop(key)
+            submitted += len(to_queue)
+        return submitted
+
+    @provide_session
+    def _update_counters(self, ti_status, session=None):
         """
         Updates the counters per state of the tasks that were running. Can re-add
         to tasks to run in case required.
         :param ti_status: the internal status of the backfill job tasks
         :type ti_status: BackfillJob._DagRunTaskStatus
         """
+        self._refresh_task_instances(
+            list(ti_status.started.values()), session=session)
         for key, ti in list(ti_status.started.items()):
-            ti.refresh_from_db()
             if ti.state == State.SUCCESS:
                 ti_status.succeeded.add(key)
                 self.log.debug("Task instance %s succeeded. Don't rerun.", ti)
@@ -2169,6 +2543,9 @@ class BackfillJob(BaseJob):
         return tasks_to_run
 
     def _log_progress(self, ti_status):
+        finished = (len(ti_status.succeeded) + len(ti_status.failed) +
+                    len(ti_status.skipped))
+        elapsed = (datetime.utcnow() - ti_status.start_time).total_seconds()
         msg = ' | '.join([
             "[backfill progress]",
             "finished run {0} of {1}",
@@ -2178,7 +2555,9 @@ class BackfillJob(BaseJob):
             "failed: {5}",
             "skipped: {6}",
             "deadlocked: {7}",
-            "not ready: {8}"
+            "not ready: {8}",
+            "submitted: {9}",
+            "finished per minute: {10:.1f}"
         ]).format(
             ti_status.finished_runs,
             ti_status.total_runs,
@@ -2188,7 +2567,9 @@ class BackfillJob(BaseJob):
             len(ti_status.failed),
             len(ti_status.skipped),
             len(ti_status.deadlocked),
-            len(ti_status.not_ready))
+            len(ti_status.not_ready),
+            ti_status.submitted,
+            finished * 60.0 / max(elapsed, 1))
         self.log.info(msg)
 
         self.log.debug(
@@ -2227,18 +2608,21 @@ class BackfillJob(BaseJob):
             self.log.debug("*** Clearing out not_ready list ***")
             ti_status.not_ready.clear()
 
+            # one query refreshes the task instances to run and gives the
+            # state of every task instance of their dag runs
+            run_states = self._refresh_task_instances(
+                list(ti_status.to_run.values()), session=session)
+            to_run_by_task = defaultdict(list)
+            for key, ti in ti_status.to_run.items():
+                to_run_by_task[ti.task_id].append((key, ti))
+            ready = []
+
             # we need to execute the tasks bottom to top
             # or leaf to root, as otherwise tasks might be
             # determined deadlocked while they are actually
             # waiting for their upstream to finish
             for task in self.dag.topological_sort():
-                for key, ti in list(ti_status.to_run.items()):
-                    if task.task_id != ti.task_id:
-                        continue
-
-                    ti.refresh_from_db()
-
-                    task = self.dag.get_task(ti.task_id)
+                for key, ti in to_run_by_task.get(task.task_id, ()):
                     ti.task = task
 
                     ignore_depends_on_past = (
@@ -2293,34 +2677,17 @@ class BackfillJob(BaseJob):
 
                     # Is the task runnable? -- then run it
                     # the dependency checker can change states of tis
-                    if ti.are_dependencies_met(
-                            dep_context=backfill_context,
-                            session=session,
-                            verbose=True):
-                        ti.refresh_from_db(lock_for_update=True, session=session)
-                        if ti.state == State.SCHEDULED or ti.state == State.UP_FOR_RETRY:
-                            if executor.has_task(ti):
-                                self.log.debug(
-                                    "Task Instance %s already in executor waiting for queue to clear",
-                                    ti
-                                )
-                            else:
-                                self.log.debug('Sending %s to executor', ti)
-                                # Skip scheduled state, we are executing immediately
-                                ti.state = State.QUEUED
-                                session.merge(ti)
-                                executor.queue_task_instance(
-                                    ti,
-                                    mark_success=self.mark_success,
-                                    pickle_id=pickle_id,
-                                    ignore_task_deps=self.ignore_task_deps,
-                                    ignore_depends_on_past=ignore_depends_on_past,
-                                    pool=self.pool)
-                                ti_status.started[key] = ti
-                                ti_status.to_run.pop(key)
-                        session.commit()
+                    if (not self._upstream_pending(ti, run_states) and
+                            ti.are_dependencies_met(
+                                dep_context=backfill_context,
+                                session=session,
+                                verbose=True)):
+                        ready.append((key, ti, ignore_depends_on_past))
                         continue
 
+                    # downstream tasks later in this loop see the new state
+                    run_states[(ti.task_id, ti.execution_date)] = ti.state
+
                     if ti.state == State.UPSTREAM_FAILED:
                         self.log.error("Task instance %s upstream failed", ti)
                         ti_status.failed.add(key)
@@ -2341,6 +2708,9 @@ class BackfillJob(BaseJob):
                     self.log.debug('Adding %s to not_ready', ti)
                     ti_status.not_ready.add(key)
 
+            ti_status.submitted = self._queue_task_instances(
+                ready, ti_status, executor, pickle_id, session=session)
+
             # execute the tasks in the queue
             self.heartbeat()
             executor.heartbeat()
@@ -2664,3 +3034,316 @@ class LocalTaskJob(BaseJob):
             )
             self.task_runner.terminate()
             self.terminating = True
+
+
+class SensorServiceJob(BaseJob):
+    """
+    The sensor service pokes on behalf of the sensor task instances waiting
+    in the ``sensing`` state, see ``BaseSensorOperator``. Pokes run in a
+    thread pool, sensor instances with the same hashcode share a single
+    poke, sensor classes setting ``batch_pokes`` answer all of their pokes
+    with one ``poke_many`` call per loop, and the task instances whose
+    criteria is met or that timed out are finished together at the end of
+    every loop.
+    """
+
+    __mapper_args__ = {
+        'polymorphic_identity': 'SensorServiceJob'
+    }
+
+    def __init__(
+            self,
+            num_runs=-1,
+            run_duration=None,
+            poke_threads=None,
+            *args, **kwargs):
+        """
+        :param num_runs: The number of poke loops to run before exiting.
+        -1 for unlimited within the run_duration.
+        :type num_runs: int
+        :param run_duration: how long to run (in seconds) before exiting,
+        -1 for unlimited
+        :type run_duration: int
+        :param poke_threads: number of sensors poked in parallel
+        :type poke_threads: int
+        """
+        self.num_runs = num_runs
+        self.run_duration = run_duration if run_duration is not None else -1
+        self.poke_threads = (
+            poke_threads or conf.getint('smart_sensor', 'poke_threads'))
+        super(SensorServiceJob, self).__init__(*args, **kwargs)
+
+        self.heartrate = conf.getint('smart_sensor',
+                                     'sensor_service_heartbeat_sec')
+        self._sensor_classes = {}
+
+    def _execute(self):
+        self.log.info("Starting the sensor service with %s poke threads",
+                      self.poke_threads)
+        pool = ThreadPool(self.poke_threads)
+        execute_start_time = datetime.utcnow()
+        loop_count = 0
+        try:
+            while True:
+                loop_count += 1
+                self.poke_sensors(pool)
+
+                if 0 < self.num_runs <= loop_count:
+                    self.log.info("Exiting sensor service loop as all runs "
+                                  "have completed")
+                    break
+                run_time = (datetime.utcnow() - execute_start_time).total_seconds()
+                if 0 < self.run_duration < run_time:
+                    self.log.info("Exiting sensor service loop as run "
+                                  "duration %ss has passed", self.run_duration)
+                    break
+                self.heartbeat()
+        finally:
+            pool.close()
+            pool.join()
+
+    def _get_sensor_class(self, classpath):
+        if classpath not in self._sensor_classes:
+            module_name, class_name = classpath.rsplit('.', 1)
+            self._sensor_classes[classpath] = getattr(
+                importlib.import_module(module_name), class_name)
+        return self._sensor_classes[classpath]
+
+    def _batch_pokes(self, classpath):
+        try:
+            return self._get_sensor_class(classpath).batch_pokes
+        except Exception:
+            # reported by _poke
+            return False
+
+    def _poke(self, pokes):
+        """
+        Runs in the thread pool, pokes for sensors of the same class and
+        returns for each poke whether the criteria is met and the exception
+        raised, if any.
+        """
+        classpath = pokes[0][0]
+        try:
+            sensor_class = self._get_sensor_class(classpath)
+            sensors = [
+                (sensor_class(task_id='sensor_service_{}'.format(hashcode),
+                              **poke_context),
+                 {'execution_date': execution_date})
+                for _, hashcode, poke_context, execution_date in pokes]
+            return [(bool(criteria_met), None)
+                    for criteria_met in sensor_class.poke_many(sensors)]
+        except Exception as e:
+            self.log.exception("%s pokes of %s failed", len(pokes), classpath)
+            return [(False, e)] * len(pokes)
+
+    @staticmethod
+    def _failed_state(sensor_instance, ti):
+        # what TaskInstance.handle_failure would decide
+        if sensor_instance.retries and ti.try_number <= ti.max_tries:
+            return State.UP_FOR_RETRY
+        return State.FAILED
+
+    @provide_session
+    def poke_sensors(self, pool, session=None):
+        """
+        Pokes once for every group of sensor instances due for a poke, then
+        finishes the task instances whose criteria is met, whose poke raised
+        or that timed out.
+
+        :param pool: thread pool running the pokes
+        :type pool: multiprocessing.pool.ThreadPool
+        :return: the number of task instances finished
+        """
+        SI = models.SensorInstance
+        TI = models.TaskInstance
+
+        # forget the sensor instances whose task instance was cleared or
+        # marked externally, RUNNING ones are still registering
+        session.query(SI).filter(~exists().where(and_(
+            TI.dag_id == SI.dag_id,
+            TI.task_id == SI.task_id,
+            TI.execution_date == SI.execution_date,
+            TI.state.in_([State.SENSING, State.RUNNING]),
+        ))).delete(synchronize_session=False)
+        session.commit()
+
+        groups = defaultdict(list)
+        for sensor_instance in session.query(SI).join(TI, and_(
+                TI.dag_id == SI.dag_id,
+                TI.task_id == SI.task_id,
+                TI.execution_date == SI.execution_date,
+        )).filter(TI.state == State.SENSING):
+            groups[sensor_instance.hashcode].append(sensor_instance)
+
+        now = datetime.utcnow()
+        due = [hashcode for hashcode, sensor_instances in groups.items()
+               if any(si.last_poke_date is None or
+                      (now - si.last_poke_date).total_seconds() >= si.poke_interval
+                      for si in sensor_instances)]
+        Stats.gauge('sensor_service.sensing', sum(len(g) for g in groups.values()))
+        Stats.gauge('sensor_service.pokes', len(due))
+        if not due:
+            return 0
+
+        # sensors answering many pokes with a single lookup get all of theirs
+        # in one batch, the others are poked one by one
+        batches = []
+        batched = defaultdict(list)
+        for hashcode in due:
+            si = groups[hashcode][0]
+            poke = (si.operator, hashcode, si.poke_context, si.execution_date)
+            if self._batch_pokes(si.operator):
+                batched[si.operator].append(poke)
+            else:
+                batches.append([poke])
+        batches.extend(batched.values())
+        due = [poke[1] for batch in batches for poke in batch]
+        results = [result for batch_results in pool.map(self._poke, batches)
+                   for result in batch_results]
+
+        now = datetime.utcnow()
+        outcomes = {}
+        for hashcode, (criteria_met, error) in zip(due, results):
+            for si in groups[hashcode]:
+                si.last_poke_date = now
+                key = (si.dag_id, si.task_id, si.execution_date)
+                timed_out = (now - si.start_date).total_seconds() > si.timeout
+                if criteria_met:
+                    outcomes[key] = (si, State.SUCCESS)
+                elif error is not None or (timed_out and not si.soft_fail):
+                    # failed, retried or not depending on the task instance
+                    outcomes[key] = (si, None)
+                elif timed_out:
+                    outcomes[key] = (si, State.SKIPPED)
+        session.commit()
+        if not outcomes:
+            return 0
+
+        finished = 0
+        keys = list(outcomes)
+        batch_size = self.max_tis_per_query or len(keys)
+        for i in range(0, len(keys), batch_size):
+            # lock and re-check the state, it may have changed while poking
+            tis = session.query(TI).filter(
+                TI.state == State.SENSING,
+                or_(*[and_(TI.dag_id == dag_id,
+                           TI.task_id == task_id,
+                           TI.execution_date == execution_date)
+                      for dag_id, task_id, execution_date
+                      in keys[i:i + batch_size]]),
+            ).with_for_update().all()
+            for ti in tis:
+                si, state = outcomes[ti.key]
+                ti.state = state or self._failed_state(si, ti)
+                ti.end_date = now
+                ti.set_duration()
+                session.add(models.Log(
+                    state or State.FAILED, None,
+                    dag_id=ti.dag_id, task_id=ti.task_id,
+                    execution_date=ti.execution_date))
+                if not state:
+                    session.add(models.TaskFail(
+                        ti, ti.execution_date, ti.start_date, ti.end_date))
+                models.TaskInstanceStat.record(
+                    ti, failed=not state, session=session)
+                session.delete(si)
+                self.log.info("Marking %s as %s", ti, ti.state)
+            finished += len(tis)
+            session.commit()
+
+        Stats.incr('sensor_service.finished', finished)
+        return finished
+
+
+class MarkTasksJob(BaseJob):
+    """
+    Sets the state of a task instance and of its relatives, like
+    ``mark_tasks.set_state`` with commit, in a background thread of the
+    process starting it. Its state is recorded in the job table like any
+    job, its progress is only known to that process, see ``running``.
+    """
+
+    __mapper_args__ = {
+        'polymorphic_identity': 'MarkTasksJob'
+    }
+
+    # jobs started by this process that are not over, by id
+    running = {}
+
+    def __init__(
+            self,
+            task,
+            execution_date,
+            upstream=False,
+            downstream=False,
+            future=False,
+            past=False,
+            state=State.SUCCESS,
+            *args, **kwargs):
+        """
+        See ``mark_tasks.set_state`` for the parameters.
+        """
+        self.task = task
+        self.dag_id = task.dag.dag_id
+        self.execution_date = execution_date
+        self.upstream = upstream
+        self.downstream = downstream
+        self.future = future
+        self.past = past
+        self.target_state = state
+        # task instances to alter, and altered so far
+        self.total = None
+        self.altered = 0
+        self._recorded = threading.Event()
+        super(MarkTasksJob, self).__init__(*args, **kwargs)
+
+    def start(self):
+        """
+        Runs the job in a daemon thread.
+
+        :return: the id of the job once it is recorded, None if it could not
+            be recorded
+        :rtype: int
+        """
+        def run():
+            try:
+                self.run()
+            finally:
+                self._recorded.set()
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        self._recorded.wait()
+        return self.id
+
+    def _progress(self, step, count):
+        self.log.info("%s: %s", step, count)
+        # the first step counts the task instances to alter
+        if self.total is None:
+            self.total = count
+        else:
+            self.altered += count
+
+    def _execute(self):
+        from airflow.api.common.experimental.mark_tasks import set_state
+
+        MarkTasksJob.running[self.id] = self
+        self._recorded.set()
+        try:
+            set_state(task=self.task, execution_date=self.execution_date,
+                      upstream=self.upstream, downstream=self.downstream,
+                      future=self.future, past=self.past,
+                      state=self.target_state, commit=True,
+                      progress_callback=self._progress)
+        except Exception:
+            self.log.exception("Failed to set %s on %s to %s",
+                               self.task, self.execution_date,
+                               self.target_state)
+            with create_session() as session:
+                self.end_date = datetime.utcnow()
+                self.state = State.FAILED
+                session.merge(self)
+            raise
+        finally:
+            del MarkTasksJob.running[self.id]
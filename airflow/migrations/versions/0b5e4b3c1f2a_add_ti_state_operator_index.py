@@ -0,0 +1,41 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Add (state, operator) index to task_instance for the redeploy check
+
+Revision ID: 0b5e4b3c1f2a
+Revises: 6e96a59344a4
+Create Date: 2026-10-18 16:42:07.513209
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '0b5e4b3c1f2a'
+down_revision = '6e96a59344a4'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    # running task instances of operators that are not resumable after a
+    # deploy, counted by SchedulerJob._airflow_ready_for_redeploy
+    op.create_index('ti_state_operator', 'task_instance',
+                    ['state', 'operator'], unique=False,
+                    mysql_length={'operator': 191})
+
+
+def downgrade():
+    op.drop_index('ti_state_operator', table_name='task_instance')
@@ -0,0 +1,48 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Add updated_at to task_instance and dag_run for the state changes API
+
+Revision ID: 3e1b7d9f4a25
+Revises: 7a3f5c2e9d18
+Create Date: 2026-10-18 22:17:36.581042
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3e1b7d9f4a25'
+down_revision = '7a3f5c2e9d18'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    # left empty for existing rows, they show up in the state changes once
+    # they are written again
+    op.add_column('task_instance',
+                  sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.create_index('ti_updated_at', 'task_instance', ['updated_at'],
+                    unique=False)
+    op.add_column('dag_run',
+                  sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.create_index('dr_updated_at', 'dag_run', ['updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('dr_updated_at', table_name='dag_run')
+    op.drop_column('dag_run', 'updated_at')
+    op.drop_index('ti_updated_at', table_name='task_instance')
+    op.drop_column('task_instance', 'updated_at')
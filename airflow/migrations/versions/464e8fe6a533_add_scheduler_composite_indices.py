@@ -0,0 +1,48 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Add composite indices for the scheduler queries
+
+Revision ID: 464e8fe6a533
+Revises: 53bee4c621a1
+Create Date: 2026-10-18 10:12:44.512876
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '464e8fe6a533'
+down_revision = '53bee4c621a1'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    # DagRun.find(dag_id, state) ordered by execution_date, get_active_runs
+    # and the dag_run side of _change_state_for_tis_without_dagrun
+    op.create_index('dr_dag_state_date', 'dag_run',
+                    ['dag_id', 'state', 'execution_date'], unique=False)
+    # covers DAG.get_num_task_instances (dag_id = ?, state IN, task_id IN)
+    op.create_index('ti_dag_state_task', 'task_instance',
+                    ['dag_id', 'state', 'task_id'], unique=False)
+    # RUNNING task instances joined to their job by kill_zombies
+    op.create_index('ti_state_job_id', 'task_instance',
+                    ['state', 'job_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ti_state_job_id', table_name='task_instance')
+    op.drop_index('ti_dag_state_task', table_name='task_instance')
+    op.drop_index('dr_dag_state_date', table_name='dag_run')
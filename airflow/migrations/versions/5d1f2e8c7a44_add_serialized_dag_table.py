@@ -0,0 +1,47 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Add serialized_dag table
+
+Revision ID: 5d1f2e8c7a44
+Revises: 0b5e4b3c1f2a
+Create Date: 2026-10-18 18:05:31.204417
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5d1f2e8c7a44'
+down_revision = '0b5e4b3c1f2a'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+def upgrade():
+    op.create_table('serialized_dag',
+                    sa.Column('dag_id', sa.String(length=250), nullable=False),
+                    sa.Column('root_dag_id', sa.String(length=250), nullable=True),
+                    sa.Column('fileloc', sa.String(length=2000), nullable=True),
+                    sa.Column('dag_hash', sa.String(length=40), nullable=True),
+                    # the serialization of large DAGs exceeds 64 KB
+                    sa.Column('data', sa.Text().with_variant(mysql.MEDIUMTEXT(), 'mysql'),
+                              nullable=True),
+                    sa.Column('last_updated', sa.DateTime(), nullable=True),
+                    sa.PrimaryKeyConstraint('dag_id'))
+
+
+def downgrade():
+    op.drop_table('serialized_dag')
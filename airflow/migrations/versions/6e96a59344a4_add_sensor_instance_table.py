@@ -0,0 +1,54 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Add sensor_instance table for the sensor service
+
+Revision ID: 6e96a59344a4
+Revises: 464e8fe6a533
+Create Date: 2026-10-18 14:03:21.207214
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '6e96a59344a4'
+down_revision = '464e8fe6a533'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import dill
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'sensor_instance',
+        sa.Column('task_id', sa.String(length=250), nullable=False),
+        sa.Column('dag_id', sa.String(length=250), nullable=False),
+        sa.Column('execution_date', sa.DateTime(), nullable=False),
+        sa.Column('try_number', sa.Integer(), nullable=True),
+        sa.Column('operator', sa.String(length=1000), nullable=True),
+        sa.Column('poke_context', sa.PickleType(pickler=dill), nullable=True),
+        sa.Column('hashcode', sa.String(length=40), nullable=True),
+        sa.Column('poke_interval', sa.Float(), nullable=True),
+        sa.Column('timeout', sa.Float(), nullable=True),
+        sa.Column('soft_fail', sa.Boolean(), nullable=True),
+        sa.Column('retries', sa.Integer(), nullable=True),
+        sa.Column('start_date', sa.DateTime(), nullable=True),
+        sa.Column('last_poke_date', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('task_id', 'dag_id', 'execution_date')
+    )
+
+
+def downgrade():
+    op.drop_table('sensor_instance')
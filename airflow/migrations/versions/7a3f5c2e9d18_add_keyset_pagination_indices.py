@@ -0,0 +1,44 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Add execution_date first indices to task_instance and dag_run for the
+keyset paginated admin lists
+
+Revision ID: 7a3f5c2e9d18
+Revises: 9c4e8a1d2b6f
+Create Date: 2026-10-18 21:03:51.204617
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '7a3f5c2e9d18'
+down_revision = '9c4e8a1d2b6f'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    # the task instance and DAG run lists are ordered by these keys, newest
+    # first, and read one page after the last key shown
+    op.create_index('ti_execution_date_dag_task', 'task_instance',
+                    ['execution_date', 'dag_id', 'task_id'], unique=False)
+    op.create_index('dr_execution_date', 'dag_run',
+                    ['execution_date', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('dr_execution_date', table_name='dag_run')
+    op.drop_index('ti_execution_date_dag_task', table_name='task_instance')
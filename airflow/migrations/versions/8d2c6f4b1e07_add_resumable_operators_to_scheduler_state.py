@@ -0,0 +1,38 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Add resumable_operators to scheduler_state
+
+Revision ID: 8d2c6f4b1e07
+Revises: 3e1b7d9f4a25
+Create Date: 2026-10-18 23:41:12.204517
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8d2c6f4b1e07'
+down_revision = '3e1b7d9f4a25'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('scheduler_state',
+                  sa.Column('resumable_operators', sa.Text(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('scheduler_state', 'resumable_operators')
@@ -0,0 +1,62 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Add task_instance_stat table
+
+Revision ID: 9c4e8a1d2b6f
+Revises: 5d1f2e8c7a44
+Create Date: 2026-10-18 19:12:48.730921
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '9c4e8a1d2b6f'
+down_revision = '5d1f2e8c7a44'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('task_instance_stat',
+                    sa.Column('task_id', sa.String(length=250), nullable=False),
+                    sa.Column('dag_id', sa.String(length=250), nullable=False),
+                    sa.Column('execution_date', sa.DateTime(), nullable=False),
+                    sa.Column('duration', sa.Float(), nullable=True),
+                    sa.Column('fail_duration', sa.Float(), nullable=True),
+                    sa.Column('tries', sa.Integer(), nullable=True),
+                    sa.Column('landing_time', sa.Float(), nullable=True),
+                    sa.Column('end_date', sa.DateTime(), nullable=True),
+                    sa.PrimaryKeyConstraint('task_id', 'dag_id', 'execution_date'))
+
+    # rollups of the task instances that already finished, landing times
+    # depend on the schedule of their DAG and are left for the landing
+    # times chart to compute from end_date
+    op.execute("""
+        INSERT INTO task_instance_stat (task_id, dag_id, execution_date,
+            duration, fail_duration, tries, end_date)
+        SELECT ti.task_id, ti.dag_id, ti.execution_date, ti.duration,
+            COALESCE((SELECT SUM(tf.duration) FROM task_fail tf
+                      WHERE tf.task_id = ti.task_id
+                      AND tf.dag_id = ti.dag_id
+                      AND tf.execution_date = ti.execution_date), 0),
+            ti.try_number, ti.end_date
+        FROM task_instance ti
+        WHERE ti.end_date IS NOT NULL
+    """)
+
+
+def downgrade():
+    op.drop_table('task_instance_stat')
@@ -23,7 +23,7 @@ install_aliases()
 from builtins import str
 from builtins import object, bytes
 import copy
-from collections import namedtuple, defaultdict
+from collections import namedtuple, defaultdict, OrderedDict
 from datetime import datetime, timedelta
 import dill
 import functools
@@ -51,28 +51,30 @@ from urllib.parse import urlparse
 from sqlalchemy import (
     Column, Integer, String, DateTime, Text, Boolean, ForeignKey, PickleType,
     Index, Float, LargeBinary)
-from sqlalchemy import func, or_, and_
+from sqlalchemy import func, or_, and_, case
 from sqlalchemy.ext.declarative import declarative_base, declared_attr
 from sqlalchemy.dialects.mysql import LONGTEXT
 from sqlalchemy.orm import reconstructor, relationship, synonym
 
-from croniter import croniter
 import six
 
 from airflow import settings, utils
 from airflow.executors import GetDefaultExecutor, LocalExecutor
 from airflow import configuration
 from airflow.exceptions import (
-    AirflowDagCycleException, AirflowException, AirflowSkipException, AirflowTaskTimeout
+    AirflowDagCycleException, AirflowException, AirflowSkipException, AirflowTaskTimeout,
+    AirflowSmartSensorException
 )
 from airflow.dag.base_dag import BaseDag, BaseDagBag
+from airflow.dag.graph import DagGraph
 from airflow.ti_deps.deps.not_in_retry_period_dep import NotInRetryPeriodDep
 from airflow.ti_deps.deps.prev_dagrun_dep import PrevDagrunDep
 from airflow.ti_deps.deps.trigger_rule_dep import TriggerRuleDep
 from airflow.ti_deps.deps.task_concurrency_dep import TaskConcurrencyDep
 
 from airflow.ti_deps.dep_context import DepContext, QUEUE_DEPS, RUN_DEPS
-from airflow.utils.dates import cron_presets, date_range as utils_date_range
+from airflow.utils.dates import (
+    cron_presets, cron_schedule, date_range as utils_date_range)
 from airflow.utils.db import provide_session
 from airflow.utils.decorators import apply_defaults
 from airflow.utils.email import send_email
@@ -160,6 +162,100 @@ def clear_task_instances(tis, session, activate_dag_runs=True, dag=None):
             dr.start_date = datetime.utcnow()
 
 
+def bulk_clear_task_instances(qry, session, activate_dag_runs=True, dag=None,
+                              batch_size=1000, progress_callback=None):
+    """
+    Set-based version of ``clear_task_instances``: clears the task instances
+    matched by a TaskInstance query with ``UPDATE ... WHERE`` statements
+    instead of loading and merging them one by one. Running ones get their
+    job shut down, the others are reset with their max_tries bumped.
+
+    :param qry: query over TaskInstance selecting the task instances to clear
+    :type qry: sqlalchemy.orm.query.Query
+    :param dag: DAG used to look up the retries of each task
+    :type dag: DAG
+    :param batch_size: maximum number of values in a single IN clause
+    :type batch_size: int
+    :param progress_callback: called with a description of each step and
+        the number of rows it updated
+    :type progress_callback: callable
+    :return: the number of task instances cleared
+    """
+    TI = TaskInstance
+    from airflow.jobs import BaseJob as BJ
+
+    def report(step, count):
+        if progress_callback:
+            progress_callback(step, count)
+
+    def chunks(items):
+        items = list(items)
+        for i in range(0, len(items), batch_size):
+            yield items[i:i + batch_size]
+
+    dag_ids, execution_dates = set(), set()
+    if activate_dag_runs:
+        # the DagRuns to reactivate have to be found before the states change
+        for dag_id, execution_date in qry.with_entities(
+                TI.dag_id, TI.execution_date).distinct():
+            dag_ids.add(dag_id)
+            execution_dates.add(execution_date)
+
+    cleared = 0
+    not_running = qry.filter(or_(TI.state.is_(None), TI.state != State.RUNNING))
+
+    task_ids_by_retries = defaultdict(list)
+    if dag:
+        for task in dag.tasks:
+            task_ids_by_retries[task.retries].append(task.task_id)
+    for retries, task_ids in task_ids_by_retries.items():
+        for chunk in chunks(task_ids):
+            count = not_running.filter(TI.task_id.in_(chunk)).update({
+                TI.max_tries: TI.try_number + retries,
+                TI.state: State.NONE,
+            }, synchronize_session=False)
+            cleared += count
+            report('reset task instances with {} retries'.format(retries), count)
+
+    # Ignore errors when updating max_tries if dag is None or task not found
+    # in dag since database records could be outdated. We make max_tries the
+    # maximum value of its original max_tries or the current task try number.
+    unknown = not_running
+    for chunk in chunks(dag.task_ids if dag else []):
+        unknown = unknown.filter(~TI.task_id.in_(chunk))
+    count = unknown.update({
+        TI.max_tries: case(
+            [(TI.max_tries > TI.try_number, TI.max_tries)],
+            else_=TI.try_number),
+        TI.state: State.NONE,
+    }, synchronize_session=False)
+    cleared += count
+    report('reset task instances of unknown tasks', count)
+
+    running = qry.filter(TI.state == State.RUNNING, TI.job_id.isnot(None))
+    count = session.query(BJ).filter(
+        BJ.id.in_(running.with_entities(TI.job_id).subquery())
+    ).update({BJ.state: State.SHUTDOWN}, synchronize_session=False)
+    report('shut down jobs', count)
+    count = running.update(
+        {TI.state: State.SHUTDOWN}, synchronize_session=False)
+    cleared += count
+    report('shut down running task instances', count)
+
+    if dag_ids:
+        for chunk in chunks(execution_dates):
+            count = session.query(DagRun).filter(
+                DagRun.dag_id.in_(dag_ids),
+                DagRun.execution_date.in_(chunk),
+            ).update({
+                DagRun.state: State.RUNNING,
+                DagRun.start_date: datetime.utcnow(),
+            }, synchronize_session=False)
+            report('reactivated dag runs', count)
+
+    return cleared
+
+
 class DagBag(BaseDagBag, LoggingMixin):
     """
     A dagbag is a collection of dags, parsed out of a folder tree and has high
@@ -215,6 +311,14 @@ class DagBag(BaseDagBag, LoggingMixin):
         """
         return len(self.dags)
 
+    @property
+    def dag_ids(self):
+        """
+        :return: the IDs of the DAGs of this dagbag
+        :rtype: list[unicode]
+        """
+        return list(self.dags.keys())
+
     def get_dag(self, dag_id):
         """
         Gets the DAG out of the dictionary, and refreshes it if expired
@@ -406,59 +510,9 @@ class DagBag(BaseDagBag, LoggingMixin):
 
                     ti.handle_zombie("{} killed as zombie".format(str(ti)))
 
-                    # TODO Tasks that are zombied out are not retried.  Fix this.  Details below:
-                    # When trying to figure out why zombies aren't getting retried, one naturally finds themselves in
-                    # SchedulerJob._find_executable_task_instances().  Adding some logging there will reveal that the
-                    # SchedulerJob thinks it's running the zombied tasks already because they are stored in an
-                    # in-memory map.  This would naturally lead one to the conclusion that something like the below was
-                    # needed here:
-                    #
-                    # if ti_key in self.executor.queued_tasks:
-                    #     del self.executor.queued_tasks[ti_key]
-                    # if ti_key in self.executor.running:
-                    #     del self.executor.running[ti_key]
-                    #
-                    # What you would find, however, is that the above does not work.  The reason it doesn't work is
-                    # a matter of some regrettable (some might say unconscionable) complexity:
-                    #
-                    # The fundamental loop in which tasks are scheduled lives in SchedulerJob._execute().  Prior to
-                    # jumping into a while True and scheduling forever, the SchedulerJob instantiates a
-                    # DagFileProcessor, which in turn repeatedly opens up a subprocess in which it creates a separate
-                    # SchedulerJob. These secondary SchedulerJobs' role is to process dags from a directory on disk.
-                    # It is these secondary SchedulerJobs that end up running kill_zombies(), and the primary
-                    # SchedulerJob that end up sending tasks to the workers /if it hasn't already done so./
-                    #
-                    # This is why it's not sufficient to modify the executor from within kill_zombies() - it is not the
-                    # same executor as the one from the primary SchedulerJob, and the primary SchedulerJob will not hear
-                    # kill_zombies() scream.
-                    #
-                    # Don't worry, it does get more confusing.  The skeptical programmer may add logging to this method
-                    # (kill_zombies) to inspect the state of the executor, and see that updates to the executor state
-                    # in the primary SchedulerJob find their way into the executor of the secondary SchedulerJobs.
-                    # Well, that's because the subprocess that ends up calling kill_zombies is repeatedly generated, and
-                    # evey time it is created, it inherits the executor from the parent process, with all of the
-                    # updated state that entails.
-                    #
-                    # While it is laudable to separate the work of generating dags from the work of scheduling
-                    # those dags, one could reasonably ask WHY THESE WERE NOT MADE SEPARATE THINGS GIVEN THAT THEY HAVE
-                    # DIFFERENT JOBS AND RUN IN DIFFERENT PROCESSES.
-                    #
-                    # Even having accepted the unknowability of the above, once could still find themselves wondering
-                    # WHY THE SCHEDULING WORK OF IDENTIFYING AND LABELING ZOMBIES IS PERFORMED BY THE PROCESS WHOSE
-                    # RESPONSIBILITY IS THE GENERATION OF DAGS.
-                    #
-                    # Unfortunately, the way this zombie killing responsibility is "designed", the only way to fix
-                    # the problem of the "real SchedulerJob" not knowing that the "dag processing SchedulerJob"
-                    # identified a zombie is to speak through some inter-process channel, which seems a bit like
-                    # buying a jet because your family dentist lives in another country.
-                    #
-                    # Moving the zombie handling to the process that schedules jobs is out of scope for now, but we
-                    # leave the above analysis to save any future poor soul from the unmitigated hell of trying to
-                    # figure out why zombied tasks do not retry.
-                    #
-                    # PS: If you find yourself thinking "no big deal, we can just unset the task from the executor
-                    # in the primary SchedulerJob when the task being examined is UP_FOR_RETRY":
-                    # YOU'RE WRONG - the secondary SchedulerJobs do that work too.
+                    # The scheduler does not call this: SchedulerJob._kill_zombies
+                    # finds zombies itself, and takes them off its executor so
+                    # that they are retried.
 
                     self.log.info('Marked zombie job %s as zombied', ti)
                     Stats.incr(
@@ -862,6 +916,249 @@ class DagPickle(Base):
         self.pickle = dag
 
 
+class SerializedDagModel(Base):
+    """
+    The structure of a DAG as serialized by the scheduler, see
+    airflow.dag.serialization, for the webserver and the API to read without
+    importing the DAG file. The row of a root DAG holds the serialization of
+    the DAG and of its subdags, the rows of subdags point to it.
+    """
+
+    __tablename__ = "serialized_dag"
+
+    dag_id = Column(String(ID_LEN), primary_key=True)
+    root_dag_id = Column(String(ID_LEN))
+    fileloc = Column(String(2000))
+    dag_hash = Column(String(40))
+    data = Column(Text)
+    last_updated = Column(DateTime)
+
+    @classmethod
+    @provide_session
+    def write_dags(cls, dags, session=None):
+        """
+        Stores the serialization of the root DAGs among dags, with their
+        subdags, when it changed since they were last stored.
+
+        :param dags: DAGs parsed from a file
+        :type dags: list[DAG]
+        :return: the IDs of the root DAGs stored
+        :rtype: list[unicode]
+        """
+        from airflow.dag.serialization import dag_hash, serialize_dag
+
+        dags = [dag for dag in dags if not dag.parent_dag]
+        if not dags:
+            return []
+        stored_hashes = dict(
+            session.query(cls.dag_id, cls.dag_hash)
+            .filter(cls.dag_id.in_([dag.dag_id for dag in dags])))
+
+        now = datetime.utcnow()
+        stored = []
+        for dag in dags:
+            data = serialize_dag(dag)
+            data_hash = dag_hash(data)
+            if stored_hashes.get(dag.dag_id) == data_hash:
+                continue
+            session.merge(cls(
+                dag_id=dag.dag_id, root_dag_id=dag.dag_id,
+                fileloc=dag.full_filepath, dag_hash=data_hash,
+                data=json.dumps(data), last_updated=now))
+            for subdag in dag.subdags:
+                session.merge(cls(
+                    dag_id=subdag.dag_id, root_dag_id=dag.dag_id,
+                    fileloc=dag.full_filepath, dag_hash=data_hash,
+                    data=None, last_updated=now))
+            stored.append(dag.dag_id)
+        session.commit()
+        return stored
+
+    @classmethod
+    @provide_session
+    def get_version(cls, dag_id, session=None):
+        """
+        :return: the ID of the root DAG of the DAG and the hash of its
+            serialization, or None if the DAG is not stored
+        :rtype: tuple
+        """
+        return session.query(cls.root_dag_id, cls.dag_hash).filter(
+            cls.dag_id == dag_id).first()
+
+    @classmethod
+    @provide_session
+    def get_dag(cls, dag_id, session=None):
+        """
+        :return: the deserialized DAG, or None if it is not stored or was
+            stored in another format
+        :rtype: DAG
+        """
+        from airflow.dag.serialization import deserialize_dag
+
+        root_dag_id = session.query(cls.root_dag_id).filter(
+            cls.dag_id == dag_id).scalar()
+        data = root_dag_id and session.query(cls.data).filter(
+            cls.dag_id == root_dag_id).scalar()
+        if not data:
+            return None
+        dag = deserialize_dag(json.loads(data))
+        if dag is None or dag.dag_id == dag_id:
+            return dag
+        return next((subdag for subdag in dag.subdags
+                     if subdag.dag_id == dag_id), None)
+
+
+class LazyDagBag(DagBag):
+    """
+    A DagBag that starts empty and parses the file of a DAG, found through
+    DagModel.fileloc, the first time the DAG is asked for. This is what the
+    webserver uses when lazy_load_dags is on, so that workers start without
+    importing every DAG file.
+
+    The DAGs of at most max_files files are kept, the least recently used
+    files are dropped. A kept DAG is parsed again when it is expired from the
+    UI, or when its file changed on disk: the modification time is compared
+    first, then the content hash, so that a file touched but not modified is
+    not parsed again.
+
+    With read_serialized, DAGs are read from the serializations the scheduler
+    stores instead, and read again when their hash changes. Their files are
+    only parsed for the DAGs the scheduler has not stored.
+
+    :param dag_folder: the folder of the DAGs, files outside of it are loaded
+        too as long as the scheduler recorded them
+    :type dag_folder: unicode
+    :param executor: the executor to use when executing task instances
+        in this DagBag
+    :param max_files: number of files, or of serialized root DAGs, to keep
+    :type max_files: int
+    :param read_serialized: whether to read the DAGs serialized by the
+        scheduler, store_serialized_dags by default
+    :type read_serialized: bool
+    """
+
+    def __init__(self, dag_folder=None, executor=None, max_files=None,
+                 read_serialized=None):
+        if executor is None:
+            executor = GetDefaultExecutor()
+        self.dag_folder = dag_folder or settings.DAGS_FOLDER
+        self.dags = {}
+        self.file_last_changed = {}
+        self.executor = executor
+        self.import_errors = {}
+        self.max_files = max_files or configuration.getint(
+            'webserver', 'lazy_dagbag_max_files')
+        # the parsed files, least recently used first, to their DAG IDs
+        self._files = OrderedDict()
+        self._file_hashes = {}
+        if read_serialized is None:
+            read_serialized = configuration.getboolean(
+                'core', 'store_serialized_dags')
+        self.read_serialized = read_serialized
+        # the deserialized root DAGs, least recently used first, with the
+        # hash of their serialization
+        self._serialized = OrderedDict()
+
+    @property
+    @provide_session
+    def dag_ids(self, session=None):
+        """
+        :return: the IDs of the active DAGs, parsed or not
+        :rtype: list[unicode]
+        """
+        return [dag_id for dag_id, in session.query(DagModel.dag_id).filter(
+            DagModel.is_active)]
+
+    def get_dag(self, dag_id):
+        """
+        Gets the DAG, parsing its file if it is not parsed yet or changed
+        """
+        if self.read_serialized:
+            dag = self._get_serialized_dag(dag_id)
+            if dag is not None:
+                return dag
+
+        orm_dag = DagModel.get_current(dag_id)
+        if orm_dag is None or not orm_dag.fileloc:
+            return self.dags.get(dag_id)
+
+        filepath = orm_dag.fileloc
+        if filepath in self._files and dag_id in self.dags and \
+                not self._is_stale(self.dags[dag_id], orm_dag):
+            # most recently used
+            self._files[filepath] = self._files.pop(filepath)
+        else:
+            self._load(filepath)
+        return self.dags.get(dag_id)
+
+    def collect_dags(self, dag_folder=None, only_if_updated=True):
+        """
+        Drops all the parsed DAGs, they are parsed again when asked for
+        """
+        for filepath in list(self._files):
+            self._drop(filepath)
+        self._serialized.clear()
+
+    def _get_serialized_dag(self, dag_id):
+        version = SerializedDagModel.get_version(dag_id)
+        if version is None:
+            return None
+        root_dag_id, data_hash = version
+        cached = self._serialized.pop(root_dag_id, None)
+        if cached and cached[0] == data_hash:
+            root_dag = cached[1]
+        else:
+            root_dag = SerializedDagModel.get_dag(root_dag_id)
+            if root_dag is None:
+                return None
+        # most recently used
+        self._serialized[root_dag_id] = (data_hash, root_dag)
+        while len(self._serialized) > self.max_files:
+            self._serialized.pop(next(iter(self._serialized)))
+        if root_dag.dag_id == dag_id:
+            return root_dag
+        return next((subdag for subdag in root_dag.subdags
+                     if subdag.dag_id == dag_id), None)
+
+    @staticmethod
+    def _hash(filepath):
+        with open(filepath, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    def _is_stale(self, dag, orm_dag):
+        if orm_dag.last_expired and dag.last_loaded < orm_dag.last_expired:
+            return True
+        filepath = orm_dag.fileloc
+        try:
+            last_changed = datetime.fromtimestamp(os.path.getmtime(filepath))
+            if last_changed == self.file_last_changed.get(filepath):
+                return False
+            if self._hash(filepath) == self._file_hashes.get(filepath):
+                self.file_last_changed[filepath] = last_changed
+                return False
+        except (IOError, OSError):
+            pass
+        return True
+
+    def _load(self, filepath):
+        self._drop(filepath)
+        found_dags = self.process_file(filepath, only_if_updated=False)
+        self._files[filepath] = [dag.dag_id for dag in found_dags]
+        try:
+            self._file_hashes[filepath] = self._hash(filepath)
+        except (IOError, OSError):
+            pass
+        while len(self._files) > self.max_files:
+            self._drop(next(iter(self._files)))
+
+    def _drop(self, filepath):
+        for dag_id in self._files.pop(filepath, []):
+            self.dags.pop(dag_id, None)
+        self.file_last_changed.pop(filepath, None)
+        self._file_hashes.pop(filepath, None)
+        self.import_errors.pop(filepath, None)
+
+
 class LastDeployedTime(Base, LoggingMixin):
     """
     last_deployed_time stores the time airflow was last deployed.  This is used to allow task re-entry following a deploy.
@@ -905,31 +1202,58 @@ class SchedulerState(Base, LoggingMixin):
     are free to launch.  When state is PAUSING, no new operators are scheduled.  When state
     is IDLE, only externally-running tasks are still active, meaning airflow can safely be
     redeployed.
+
+    The last state read or set by this process is cached, so that the scheduler
+    loop only goes to the database once the cached state is older than the
+    max_age it accepts.
+
+    The scheduler also records the operator classes it knows to be resumable
+    after a deploy, so that the other processes, which do not import the
+    operators of every DAG, tell the same task instances apart.
     """
 
     __tablename__ = "scheduler_state"
 
     state = Column(String(50), primary_key=True)
+    # comma separated names of the resumable operator classes
+    resumable_operators = Column(Text)
 
     __table_args__ = (
         Index('state', state, state),
     )
 
+    # (state, time it was read or set) shared by the instances of this process
+    _cached = None
+
     def __init__(self):
 
         self._log = logging.getLogger("airflow.scheduler_state")
 
+    @classmethod
+    def _cache(cls, state):
+        SchedulerState._cached = (state, datetime.utcnow())
+        return state
+
     @provide_session
-    def get_state(self, session=None):
+    def get_state(self, max_age=0, session=None):
         """
         Get the current scheduler state
+
+        :param max_age: seconds the cached state can be used for instead of
+            reading it from the database
+        :type max_age: int
         """
 
         if session is None:
             raise Exception("Session is none - cannot get state!")
 
+        cached = SchedulerState._cached
+        if max_age and cached and \
+                (datetime.utcnow() - cached[1]).total_seconds() < max_age:
+            return cached[0]
+
         SS = SchedulerState
-        ss = session.query(SS).all()
+        ss = session.query(SS.state).all()
         if len(ss) > 1:
             raise Exception("Found multiple rows for scheduler_state - this should never happen!")
 
@@ -937,8 +1261,9 @@ class SchedulerState(Base, LoggingMixin):
             self.state = "RUNNING"
             session.merge(self)
             session.commit()
+            return self._cache(self.state)
         else:
-            return ss[0].state
+            return self._cache(ss[0].state)
 
     @provide_session
     def set_state(self, state, session=None):
@@ -962,8 +1287,68 @@ class SchedulerState(Base, LoggingMixin):
             ss[0].state = state
             session.commit()
 
+        self._cache(state)
         return self.get_state()
 
+    @provide_session
+    def set_resumable_operators(self, resumable_operators, session=None):
+        """
+        Record the names of the operator classes resumable after a deploy
+
+        :param resumable_operators: see get_resumable_operators
+        :type resumable_operators: set[str]
+        """
+        # creates the row if there is none yet
+        self.get_state(session=session)
+        session.query(SchedulerState).update(
+            {SchedulerState.resumable_operators:
+                ','.join(sorted(resumable_operators))},
+            synchronize_session=False)
+        session.commit()
+
+    @staticmethod
+    @provide_session
+    def get_resumable_operators(session=None):
+        """
+        :return: the names of the operator classes resumable after a deploy
+            recorded by the scheduler
+        :rtype: set[str]
+        """
+        recorded = session.query(SchedulerState.resumable_operators).scalar()
+        return set(recorded.split(',')) if recorded else set()
+
+    @staticmethod
+    def redeploy_blockers(session, resumable_operators, *entities):
+        """
+        Query for entities of the running task instances a redeploy has to
+        wait for, all but the ones of resumable operators. It is covered by
+        the ti_state_operator index.
+
+        :param resumable_operators: names of the operator classes resumable
+            after a deploy, see get_resumable_operators
+        :type resumable_operators: set[str]
+        """
+        TI = TaskInstance
+        qry = session.query(*entities).filter(TI.state == State.RUNNING)
+        if resumable_operators:
+            qry = qry.filter(~TI.operator.in_(sorted(resumable_operators)))
+        return qry
+
+
+def get_resumable_operators():
+    """
+    Names of the operator classes imported by this process that are
+    resumable after a deploy, see BaseOperator.resumable_after_deploy
+    """
+    names = set()
+    classes = [BaseOperator]
+    while classes:
+        cls = classes.pop()
+        if cls.resumable_after_deploy:
+            names.add(cls.__name__)
+        classes.extend(cls.__subclasses__())
+    return names
+
 
 class TaskInstance(Base, LoggingMixin):
     """
@@ -999,12 +1384,21 @@ class TaskInstance(Base, LoggingMixin):
     operator = Column(String(1000))
     queued_dttm = Column(DateTime)
     pid = Column(Integer)
+    # last time the row was written, read by the state changes API
+    updated_at = Column(DateTime, default=datetime.utcnow,
+                        onupdate=datetime.utcnow)
 
     __table_args__ = (
         Index('ti_dag_state', dag_id, state),
         Index('ti_state', state),
         Index('ti_state_lkp', dag_id, task_id, execution_date, state),
         Index('ti_pool', pool, state, priority_weight),
+        Index('ti_dag_state_task', dag_id, state, task_id),
+        Index('ti_state_job_id', state, job_id),
+        Index('ti_state_operator', state, operator,
+              mysql_length={'operator': 191}),
+        Index('ti_execution_date_dag_task', execution_date, dag_id, task_id),
+        Index('ti_updated_at', updated_at),
     )
 
     def __init__(self, task, execution_date, state=None):
@@ -1746,6 +2140,15 @@ class TaskInstance(Base, LoggingMixin):
             self.refresh_from_db(lock_for_update=True)
             self.hostname = None
             self.state = State.SUCCESS
+        except AirflowSmartSensorException:
+            # the sensor service pokes from now on and finishes the task
+            # instance, no end date and no callbacks yet
+            self.refresh_from_db(lock_for_update=True)
+            self.state = State.SENSING
+            self.hostname = None
+            session.merge(self)
+            session.commit()
+            return
         except AirflowSkipException:
             self.refresh_from_db(lock_for_update=True)
             self.state = State.SKIPPED
@@ -1773,6 +2176,7 @@ class TaskInstance(Base, LoggingMixin):
         if not test_mode:
             session.add(Log(self.state, self))
             session.merge(self)
+            TaskInstanceStat.record(self, session=session)
         self.hostname = None
         session.commit()
 
@@ -1892,26 +2296,44 @@ class TaskInstance(Base, LoggingMixin):
 
         # Log failure duration
         session.add(TaskFail(task, self.execution_date, self.start_date, self.end_date))
+        if not test_mode:
+            TaskInstanceStat.record(self, failed=True, session=session)
 
         # Let's go deeper
-        try:
-            # try_number is incremented by 1 during task instance run. So the
-            # current task instance try_number is the try_number for the next
-            # task instance run. We only mark task instance as FAILED if the
-            # next task instance try_number exceeds the max_tries.
-            if task.retries and self.try_number <= self.max_tries:
-                self.state = retry_state
-                self.log.info('Marking task as {}'.format(retry_state))
-                if task.email_on_retry and task.email:
-                    self.email_alert(error, is_retry=True)
+        # try_number is incremented by 1 during task instance run. So the
+        # current task instance try_number is the try_number for the next
+        # task instance run. We only mark task instance as FAILED if the
+        # next task instance try_number exceeds the max_tries.
+        if task.retries and self.try_number <= self.max_tries:
+            self.state = retry_state
+            self.log.info('Marking task as {}'.format(retry_state))
+        else:
+            self.state = State.FAILED
+            if task.retries:
+                self.log.info('All retries failed; marking task as FAILED')
             else:
-                self.state = State.FAILED
-                if task.retries:
-                    self.log.info('All retries failed; marking task as FAILED')
-                else:
-                    self.log.info('Marking task as FAILED.')
-                if task.email_on_failure and task.email:
-                    self.email_alert(error, is_retry=False)
+                self.log.info('Marking task as FAILED.')
+        self.alert_failure(error, context, retry_state)
+
+        if not test_mode:
+            session.merge(self)
+        session.commit()
+        self.log.error(str(error))
+
+    def alert_failure(self, error, context=None, retry_state=State.UP_FOR_RETRY):
+        """
+        Sends the retry or failure email of the task and runs its retry or
+        failure callback, once the task instance was set to retry_state or
+        failed.
+        """
+        task = self.task
+        try:
+            if (self.state == retry_state and task.email_on_retry and
+                    task.email):
+                self.email_alert(error, is_retry=True)
+            if (self.state == State.FAILED and task.email_on_failure and
+                    task.email):
+                self.email_alert(error, is_retry=False)
         except Exception as e2:
             self.log.error('Failed to send email to: %s', task.email)
             self.log.exception(e2)
@@ -1926,11 +2348,6 @@ class TaskInstance(Base, LoggingMixin):
             self.log.error("Failed at executing callback")
             self.log.exception(e3)
 
-        if not test_mode:
-            session.merge(self)
-        session.commit()
-        self.log.error(str(error))
-
     @provide_session
     def get_template_context(self, session=None):
         task = self.task
@@ -2189,6 +2606,129 @@ class TaskFail(Base):
         self.duration = (self.end_date - self.start_date).total_seconds()
 
 
+class TaskInstanceStat(Base):
+    """
+    Per task instance rollup of what the duration, tries and landing times
+    charts show, updated as task instances finish so that the charts do not
+    load task instances and their failures: the duration of the last try,
+    the cumulated duration of the failed tries, the number of tries and the
+    landing time, seconds between the end of the schedule period and the
+    end of the last try. The landing time is left empty when the DAG is not
+    known, the chart computes it from end_date then.
+    """
+
+    __tablename__ = "task_instance_stat"
+
+    task_id = Column(String(ID_LEN), primary_key=True)
+    dag_id = Column(String(ID_LEN), primary_key=True)
+    execution_date = Column(DateTime, primary_key=True)
+    duration = Column(Float)
+    fail_duration = Column(Float, default=0)
+    tries = Column(Integer)
+    landing_time = Column(Float)
+    end_date = Column(DateTime)
+
+    @classmethod
+    @provide_session
+    def record(cls, ti, failed=False, session=None):
+        """
+        Updates the rollup of a task instance that just finished a try.
+
+        :param ti: the task instance, with its end date and duration set
+        :type ti: TaskInstance
+        :param failed: whether the try failed
+        :type failed: bool
+        """
+        stat = session.query(cls).filter(
+            cls.dag_id == ti.dag_id,
+            cls.task_id == ti.task_id,
+            cls.execution_date == ti.execution_date).first()
+        if stat is None:
+            stat = cls(dag_id=ti.dag_id, task_id=ti.task_id,
+                       execution_date=ti.execution_date, fail_duration=0)
+        stat.duration = ti.duration
+        if failed and ti.duration:
+            stat.fail_duration = (stat.fail_duration or 0) + ti.duration
+        stat.tries = ti.try_number
+        stat.end_date = ti.end_date
+
+        # the schedule period is only known with the task of the DAG
+        dag = ti.task.dag if getattr(ti, 'task', None) else None
+        if dag and ti.end_date:
+            period_end = ti.execution_date
+            if dag.schedule_interval and dag.following_schedule(period_end):
+                period_end = dag.following_schedule(period_end)
+            stat.landing_time = (ti.end_date - period_end).total_seconds()
+        session.merge(stat)
+
+
+class SensorInstance(Base):
+    """
+    SensorInstance holds what the sensor service needs to poke on behalf of a
+    sensor task instance in the ``sensing`` state: the sensor class and the
+    arguments its poke depends on. See ``airflow.jobs.SensorServiceJob``.
+    """
+
+    __tablename__ = "sensor_instance"
+
+    task_id = Column(String(ID_LEN), primary_key=True)
+    dag_id = Column(String(ID_LEN), primary_key=True)
+    execution_date = Column(DateTime, primary_key=True)
+    try_number = Column(Integer)
+    operator = Column(String(1000))
+    poke_context = Column(PickleType(pickler=dill))
+    hashcode = Column(String(40))
+    poke_interval = Column(Float)
+    timeout = Column(Float)
+    soft_fail = Column(Boolean, default=False)
+    retries = Column(Integer, default=0)
+    start_date = Column(DateTime)
+    last_poke_date = Column(DateTime)
+
+    def __init__(self, ti, sensor, poke_context):
+        self.dag_id = ti.dag_id
+        self.task_id = ti.task_id
+        self.execution_date = ti.execution_date
+        self.try_number = ti.try_number
+        self.operator = self.get_classpath(sensor)
+        self.poke_context = poke_context
+        self.hashcode = self.get_hashcode(
+            self.operator, poke_context,
+            ti.execution_date if sensor.poke_uses_execution_date else None)
+        self.poke_interval = sensor.poke_interval
+        self.timeout = sensor.timeout
+        self.soft_fail = sensor.soft_fail
+        self.retries = sensor.retries
+        self.start_date = ti.start_date or datetime.utcnow()
+        # the sensor poked once before registering
+        self.last_poke_date = datetime.utcnow()
+
+    @staticmethod
+    def get_classpath(sensor):
+        return '{}.{}'.format(sensor.__class__.__module__,
+                              sensor.__class__.__name__)
+
+    @staticmethod
+    def get_hashcode(classpath, poke_context, execution_date=None):
+        """
+        Sensor instances with the same hashcode poke for the same thing, the
+        sensor service pokes only once for all of them.
+        """
+        key = json.dumps([classpath, poke_context, execution_date],
+                         sort_keys=True, default=str)
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    @classmethod
+    @provide_session
+    def register(cls, ti, sensor, poke_context, session=None):
+        """
+        Hands the pokes of a running sensor task instance over to the sensor
+        service. Registering again (e.g. a retry) replaces the previous row.
+        """
+        session.merge(cls(ti, sensor, poke_context))
+        session.commit()
+
+
 class Log(Base):
     """
     Used to actively log events to the database
@@ -2409,6 +2949,10 @@ class BaseOperator(LoggingMixin):
     # Defines the color in the UI
     ui_color = '#fff'
     ui_fgcolor = '#000'
+    # Whether running instances of the operator survive a redeploy of
+    # Airflow, e.g. because the work runs and is tracked elsewhere. A drain
+    # does not wait for them.
+    resumable_after_deploy = False
     UNDEFINED_LABEL = 'airflow-undefined'
 
     @apply_defaults
@@ -2737,11 +3281,6 @@ class BaseOperator(LoggingMixin):
         pass
 
     def __deepcopy__(self, memo):
-        """
-        Hack sorting double chained task lists by task_id to avoid hitting
-        max_depth on deepcopy operations.
-        """
-        sys.setrecursionlimit(5000)  # TODO fix this in a better way
         cls = self.__class__
         result = cls.__new__(cls)
         memo[id(self)] = result
@@ -2820,9 +3359,21 @@ class BaseOperator(LoggingMixin):
                     self.log.exception(e)
         self.prepare_template()
 
+    def _in_dag_graph(self):
+        """
+        Whether this task is the one its DAG's graph index knows under its
+        task_id, in which case relatives can be read off the index.
+        """
+        if not self.has_dag():
+            return False
+        return self.dag.task_dict.get(self.task_id) is self
+
     @property
     def upstream_list(self):
         """@property: list of tasks directly upstream"""
+        if self._in_dag_graph():
+            return self.dag.graph.get_direct_relatives(
+                self.task_id, upstream=True)
         return [self.dag.get_task(tid) for tid in self._upstream_task_ids]
 
     @property
@@ -2832,6 +3383,9 @@ class BaseOperator(LoggingMixin):
     @property
     def downstream_list(self):
         """@property: list of tasks directly downstream"""
+        if self._in_dag_graph():
+            return self.dag.graph.get_direct_relatives(
+                self.task_id, upstream=False)
         return [self.dag.get_task(tid) for tid in self._downstream_task_ids]
 
     @property
@@ -2872,7 +3426,7 @@ class BaseOperator(LoggingMixin):
 
         count = qry.count()
 
-        clear_task_instances(qry.all(), session, dag=self.dag)
+        bulk_clear_task_instances(qry, session, dag=self.dag)
 
         session.commit()
 
@@ -2896,6 +3450,9 @@ class BaseOperator(LoggingMixin):
         """
         Get a flat list of relatives, either upstream or downstream.
         """
+        if not l and self._in_dag_graph():
+            return self.dag.graph.get_flat_relatives(
+                self.task_id, upstream=upstream)
         if not l:
             l = []
         for t in self.get_direct_relatives(upstream):
@@ -3000,6 +3557,7 @@ class BaseOperator(LoggingMixin):
         if dag and not self.has_dag():
             self.dag = dag
 
+        dag._invalidate_graph()
         for task in task_list:
             if dag and not task.has_dag():
                 task.dag = dag
@@ -3226,6 +3784,7 @@ class DAG(BaseDag, LoggingMixin):
         # set file location to caller source path
         self.fileloc = sys._getframe().f_back.f_code.co_filename
         self.task_dict = dict()
+        self._graph = None
         self.start_date = start_date
         self.end_date = end_date
         self.schedule_interval = schedule_interval
@@ -3320,18 +3879,45 @@ class DAG(BaseDag, LoggingMixin):
 
     def following_schedule(self, dttm):
         if isinstance(self._schedule_interval, six.string_types):
-            cron = croniter(self._schedule_interval, dttm)
-            return cron.get_next(datetime)
+            return cron_schedule(self._schedule_interval).following(dttm)
         elif isinstance(self._schedule_interval, timedelta):
             return dttm + self._schedule_interval
 
     def previous_schedule(self, dttm):
         if isinstance(self._schedule_interval, six.string_types):
-            cron = croniter(self._schedule_interval, dttm)
-            return cron.get_prev(datetime)
+            return cron_schedule(self._schedule_interval).previous(dttm)
         elif isinstance(self._schedule_interval, timedelta):
             return dttm - self._schedule_interval
 
+    def get_schedules_between(self, start, end):
+        """
+        Returns the schedule dates strictly after ``start`` and strictly
+        before ``end``, the dates ``following_schedule`` would walk through
+        starting from ``start``, without walking.
+
+        :param start: the date to start from, excluded
+        :type start: datetime
+        :param end: the date to stop at, excluded
+        :type end: datetime
+        :return: the schedule dates, sorted
+        :rtype: list
+        """
+        if isinstance(self._schedule_interval, six.string_types):
+            return cron_schedule(self._schedule_interval).between(start, end)
+        elif isinstance(self._schedule_interval, timedelta):
+            interval = self._schedule_interval
+            if interval <= timedelta(0) or end <= start:
+                return []
+            # integer arithmetic on microseconds, timedelta // timedelta
+            # does not exist on python 2
+            span = end - start
+            span = (span.days * 86400 + span.seconds) * 10 ** 6 + span.microseconds
+            step = (interval.days * 86400 + interval.seconds) * 10 ** 6 + \
+                interval.microseconds
+            return [start + interval * i
+                    for i in range(1, (span - 1) // step + 1)]
+        return []
+
     def get_run_dates(self, start_date, end_date=None):
         """
         Returns a list of dates between the interval received as parameter using this
@@ -3634,60 +4220,45 @@ class DAG(BaseDag, LoggingMixin):
         tis = tis.order_by(TI.execution_date).all()
         return tis
 
+    @property
+    def graph(self):
+        """
+        Adjacency index of the DAG's tasks, built on first access and
+        rebuilt after tasks or relationships change.
+
+        :rtype: airflow.dag.graph.DagGraph
+        """
+        graph = getattr(self, '_graph', None)
+        if graph is None or not graph.is_current(self.task_dict):
+            graph = DagGraph(self.task_dict)
+            self._graph = graph
+        return graph
+
+    def _invalidate_graph(self):
+        self._graph = None
+
     @property
     def roots(self):
-        return [t for t in self.tasks if not t.downstream_list]
+        """@property: tasks without any downstream task"""
+        return list(self.graph.roots)
+
+    @property
+    def leaves(self):
+        """@property: tasks without any upstream task"""
+        return list(self.graph.leaves)
 
     def topological_sort(self):
         """
         Sorts tasks in topographical order, such that a task comes after any of its
         upstream dependencies.
 
-        Heavily inspired by:
-        http://blog.jupo.org/2012/04/06/topological-sorting-acyclic-directed-graphs/
-
         :return: list of tasks in topological order
         """
-
-        # copy the the tasks so we leave it unmodified
-        graph_unsorted = self.tasks[:]
-
-        graph_sorted = []
-
-        # special case
-        if len(self.tasks) == 0:
-            return tuple(graph_sorted)
-
-        # Run until the unsorted graph is empty.
-        while graph_unsorted:
-            # Go through each of the node/edges pairs in the unsorted
-            # graph. If a set of edges doesn't contain any nodes that
-            # haven't been resolved, that is, that are still in the
-            # unsorted graph, remove the pair from the unsorted graph,
-            # and append it to the sorted graph. Note here that by using
-            # using the items() method for iterating, a copy of the
-            # unsorted graph is used, allowing us to modify the unsorted
-            # graph as we move through it. We also keep a flag for
-            # checking that that graph is acyclic, which is true if any
-            # nodes are resolved during each pass through the graph. If
-            # not, we need to bail out as the graph therefore can't be
-            # sorted.
-            acyclic = False
-            for node in list(graph_unsorted):
-                for edge in node.upstream_list:
-                    if edge in graph_unsorted:
-                        break
-                # no edges in upstream tasks
-                else:
-                    acyclic = True
-                    graph_unsorted.remove(node)
-                    graph_sorted.append(node)
-
-            if not acyclic:
-                raise AirflowException("A cyclic dependency occurred in dag: {}"
-                                       .format(self.dag_id))
-
-        return tuple(graph_sorted)
+        graph_sorted = self.graph.topological_sort()
+        if graph_sorted is None:
+            raise AirflowException("A cyclic dependency occurred in dag: {}"
+                                   .format(self.dag_id))
+        return graph_sorted
 
     @provide_session
     def set_dag_runs_state(
@@ -3699,19 +4270,13 @@ class DAG(BaseDag, LoggingMixin):
             dirty_ids.append(dr.dag_id)
         DagStat.update(dirty_ids, session=session)
 
-    @provide_session
-    def clear(
-            self, start_date=None, end_date=None,
+    def _get_clear_query(
+            self, session, start_date=None, end_date=None,
             only_failed=False,
             only_running=False,
-            confirm_prompt=False,
-            include_subdags=True,
-            reset_dag_runs=True,
-            dry_run=False,
-            session=None):
+            include_subdags=True):
         """
-        Clears a set of task instances associated with the current dag for
-        a specified date range.
+        Query over the task instances ``clear`` would act upon.
         """
         TI = TaskInstance
         tis = session.query(TI)
@@ -3736,6 +4301,48 @@ class DAG(BaseDag, LoggingMixin):
             tis = tis.filter(TI.state == State.FAILED)
         if only_running:
             tis = tis.filter(TI.state == State.RUNNING)
+        return tis
+
+    @provide_session
+    def clear_counts(
+            self, start_date=None, end_date=None,
+            only_failed=False,
+            only_running=False,
+            include_subdags=True,
+            session=None):
+        """
+        Counts the task instances ``clear`` would act upon, per dag_id and
+        state, without loading them.
+
+        :return: list of (dag_id, state, count) tuples
+        """
+        TI = TaskInstance
+        tis = self._get_clear_query(
+            session, start_date=start_date, end_date=end_date,
+            only_failed=only_failed, only_running=only_running,
+            include_subdags=include_subdags)
+        return tis.with_entities(TI.dag_id, TI.state, func.count()).group_by(
+            TI.dag_id, TI.state).order_by(TI.dag_id, TI.state).all()
+
+    @provide_session
+    def clear(
+            self, start_date=None, end_date=None,
+            only_failed=False,
+            only_running=False,
+            confirm_prompt=False,
+            include_subdags=True,
+            reset_dag_runs=True,
+            dry_run=False,
+            progress_callback=None,
+            session=None):
+        """
+        Clears a set of task instances associated with the current dag for
+        a specified date range.
+        """
+        tis = self._get_clear_query(
+            session, start_date=start_date, end_date=end_date,
+            only_failed=only_failed, only_running=only_running,
+            include_subdags=include_subdags)
 
         if dry_run:
             tis = tis.all()
@@ -3755,7 +4362,8 @@ class DAG(BaseDag, LoggingMixin):
             do_it = utils.helpers.ask_yesno(question)
 
         if do_it:
-            clear_task_instances(tis.all(), session, dag=self)
+            bulk_clear_task_instances(
+                tis, session, dag=self, progress_callback=progress_callback)
             if reset_dag_runs:
                 self.set_dag_runs_state(session=session)
         else:
@@ -3775,30 +4383,41 @@ class DAG(BaseDag, LoggingMixin):
             confirm_prompt=False,
             include_subdags=True,
             reset_dag_runs=True,
-            dry_run=False):
-        all_tis = []
+            dry_run=False,
+            progress_callback=None):
+        if dry_run:
+            all_tis = []
+            for dag in dags:
+                tis = dag.clear(
+                    start_date=start_date,
+                    end_date=end_date,
+                    only_failed=only_failed,
+                    only_running=only_running,
+                    confirm_prompt=False,
+                    include_subdags=include_subdags,
+                    reset_dag_runs=reset_dag_runs,
+                    dry_run=True)
+                all_tis.extend(tis)
+            return all_tis
+
+        counts = []
         for dag in dags:
-            tis = dag.clear(
+            counts.extend(dag.clear_counts(
                 start_date=start_date,
                 end_date=end_date,
                 only_failed=only_failed,
                 only_running=only_running,
-                confirm_prompt=False,
-                include_subdags=include_subdags,
-                reset_dag_runs=reset_dag_runs,
-                dry_run=True)
-            all_tis.extend(tis)
+                include_subdags=include_subdags))
 
-        if dry_run:
-            return all_tis
-
-        count = len(all_tis)
+        count = sum(c for _, _, c in counts)
         do_it = True
         if count == 0:
             print("Nothing to clear.")
             return 0
         if confirm_prompt:
-            ti_list = "\n".join([str(t) for t in all_tis])
+            ti_list = "\n".join(
+                "{}: {} in state {}".format(dag_id, c, state)
+                for dag_id, state, c in counts)
             question = (
                 "You are about to delete these {} tasks:\n"
                 "{}\n\n"
@@ -3814,7 +4433,8 @@ class DAG(BaseDag, LoggingMixin):
                           confirm_prompt=False,
                           include_subdags=include_subdags,
                           reset_dag_runs=reset_dag_runs,
-                          dry_run=False)
+                          dry_run=False,
+                          progress_callback=progress_callback)
         else:
             count = 0
             print("Bail. Nothing was cleared.")
@@ -3827,49 +4447,96 @@ class DAG(BaseDag, LoggingMixin):
         result = cls.__new__(cls)
         memo[id(self)] = result
         for k, v in list(self.__dict__.items()):
-            if k not in ('user_defined_macros', 'user_defined_filters', 'params'):
+            if k not in ('user_defined_macros', 'user_defined_filters', 'params',
+                         '_graph'):
                 setattr(result, k, copy.deepcopy(v, memo))
 
+        result._graph = None
         result.user_defined_macros = self.user_defined_macros
         result.user_defined_filters = self.user_defined_filters
         result.params = self.params
         return result
 
-    def sub_dag(self, task_regex, include_downstream=False,
-                include_upstream=True):
+    def _select_task_ids(self, task_regex, include_downstream=False,
+                         include_upstream=True):
         """
-        Returns a subset of the current dag as a deep copy of the current dag
-        based on a regex that should match one or many tasks, and includes
-        upstream and downstream neighbours based on the flag passed.
+        Ids of the tasks matching a regex, plus their upstream and downstream
+        relatives based on the flags passed.
         """
-
-        dag = copy.deepcopy(self)
-
+        graph = self.graph
         regex_match = [
-            t for t in dag.tasks if re.findall(task_regex, t.task_id)]
-        also_include = []
-        for t in regex_match:
+            task_id for task_id in graph.task_ids
+            if re.findall(task_regex, task_id)]
+        task_ids = set(regex_match)
+        for task_id in regex_match:
             if include_downstream:
-                also_include += t.get_flat_relatives(upstream=False)
+                task_ids.update(
+                    graph.task_ids[i] for i in
+                    graph.get_flat_relative_nodes(task_id, upstream=False))
             if include_upstream:
-                also_include += t.get_flat_relatives(upstream=True)
+                task_ids.update(
+                    graph.task_ids[i] for i in
+                    graph.get_flat_relative_nodes(task_id, upstream=True))
+        return task_ids
 
-        # Compiling the unique list of tasks that made the cut
-        dag.task_dict = {t.task_id: t for t in regex_match + also_include}
-        for t in dag.tasks:
+    def _copy_subset(self, task_ids, result=None):
+        """
+        Deep copies the dag, keeping only the given tasks. Tasks that did not
+        make the cut are never copied.
+        """
+        if result is None:
+            cls = self.__class__
+            result = cls.__new__(cls)
+        memo = {id(self): result}
+        for k, v in list(self.__dict__.items()):
+            if k not in ('user_defined_macros', 'user_defined_filters', 'params',
+                         '_graph', 'task_dict'):
+                setattr(result, k, copy.deepcopy(v, memo))
+
+        result.user_defined_macros = self.user_defined_macros
+        result.user_defined_filters = self.user_defined_filters
+        result.params = self.params
+        result.task_dict = {
+            task_id: copy.deepcopy(self.task_dict[task_id], memo)
+            for task_id in task_ids}
+        for t in result.tasks:
             # Removing upstream/downstream references to tasks that did not
             # made the cut
-            t._upstream_task_ids = t._upstream_task_ids.intersection(dag.task_dict.keys())
-            t._downstream_task_ids = t._downstream_task_ids.intersection(
-                dag.task_dict.keys())
+            t._upstream_task_ids = t._upstream_task_ids.intersection(task_ids)
+            t._downstream_task_ids = t._downstream_task_ids.intersection(task_ids)
+        result._graph = None
+
+        if len(result.task_dict) < len(self.task_dict):
+            result.partial = True
 
-        if len(dag.tasks) < len(self.tasks):
-            dag.partial = True
+        return result
 
-        return dag
+    def sub_dag(self, task_regex, include_downstream=False,
+                include_upstream=True):
+        """
+        Returns a subset of the current dag as a deep copy of the current dag
+        based on a regex that should match one or many tasks, and includes
+        upstream and downstream neighbours based on the flag passed.
+        """
+        return self._copy_subset(self._select_task_ids(
+            task_regex,
+            include_downstream=include_downstream,
+            include_upstream=include_upstream))
+
+    def sub_dag_view(self, task_regex, include_downstream=False,
+                     include_upstream=True):
+        """
+        Same selection as ``sub_dag``, but returns a ``DagView`` sharing the
+        task objects of the current dag instead of a deep copy. Use it when
+        the subset is only read, e.g. to render or clear it.
+        """
+        return DagView(self, self._select_task_ids(
+            task_regex,
+            include_downstream=include_downstream,
+            include_upstream=include_upstream))
 
     def has_task(self, task_id):
-        return task_id in (t.task_id for t in self.tasks)
+        return task_id in self.task_dict
 
     def get_task(self, task_id):
         if task_id in self.task_dict:
@@ -3956,6 +4623,7 @@ class DAG(BaseDag, LoggingMixin):
                 category=PendingDeprecationWarning)
         else:
             self.task_dict[task.task_id] = task
+            self._invalidate_graph()
             task.dag = self
 
         self.task_count = len(self.task_dict)
@@ -4204,9 +4872,11 @@ class DAG(BaseDag, LoggingMixin):
             # generally safe assumption, the only place this function is called
             # is in airflow.jobs.SchedulerJob._find_executable_task_instances(),
             # which is looking specifically for running states. That should keep
-            # the number of inspected rows down to a dull roar.
+            # the number of inspected rows down to a dull roar. ti_dag_state_task
+            # also covers task_id, so the count is answered from the index.
             # https://docs.sqlalchemy.org/en/13/orm/query.html#sqlalchemy.orm.query.Query.with_hint
-            qry = qry.with_hint(TaskInstance, 'USE INDEX (ti_dag_state)', dialect_name='mysql')
+            qry = qry.with_hint(TaskInstance, 'USE INDEX (ti_dag_state_task)',
+                                dialect_name='mysql')
             if None in states:
                 qry = qry.filter(or_(
                     TaskInstance.state.in_(states),
@@ -4251,6 +4921,73 @@ class DAG(BaseDag, LoggingMixin):
         visit_map[task_id] = DagBag.CYCLE_DONE
 
 
+class DagView(DAG):
+    """
+    A read-only subset of a DAG, as returned by ``DAG.sub_dag_view``.
+
+    The view shares every attribute and task object of its parent DAG and
+    only holds its own ``task_dict``, so creating one does not copy any
+    operator. Relationships to tasks outside of the view are trimmed by the
+    view's ``graph``, hence traversals should go through ``view.graph`` (or
+    ``roots`` and ``topological_sort``) rather than ``task.upstream_list``,
+    which still reflects the parent DAG.
+
+    The tasks are copied the first time the view is mutated through
+    ``add_task`` or ``set_dependency``, after which it behaves like the
+    result of ``DAG.sub_dag``.
+
+    :param dag: the DAG to take the subset of
+    :type dag: DAG
+    :param task_ids: ids of the tasks to keep
+    :type task_ids: iterable of string
+    """
+
+    def __init__(self, dag, task_ids):
+        if isinstance(dag, DagView) and not dag.materialized:
+            dag = dag._parent
+        self.__dict__.update(dag.__dict__)
+        self._parent = dag
+        self.task_dict = {task_id: dag.task_dict[task_id] for task_id in task_ids}
+        self._graph = None
+        if len(self.task_dict) < len(dag.task_dict):
+            self.partial = True
+
+    @property
+    def materialized(self):
+        return self._parent is None
+
+    def materialize(self):
+        """
+        Replaces the shared tasks by copies owned by the view, so that it can
+        be modified without affecting its parent DAG.
+        """
+        if not self.materialized:
+            parent = self._parent
+            parent._copy_subset(self.task_ids, result=self)
+            self._parent = None
+        return self
+
+    def _copy_subset(self, task_ids, result=None):
+        if self.materialized:
+            return super(DagView, self)._copy_subset(task_ids, result=result)
+        return self._parent._copy_subset(task_ids, result=result)
+
+    def __deepcopy__(self, memo):
+        if self.materialized:
+            return super(DagView, self).__deepcopy__(memo)
+        result = self._parent._copy_subset(self.task_ids)
+        memo[id(self)] = result
+        return result
+
+    def add_task(self, task):
+        self.materialize()
+        super(DagView, self).add_task(task)
+
+    def set_dependency(self, upstream_task_id, downstream_task_id):
+        self.materialize()
+        super(DagView, self).set_dependency(upstream_task_id, downstream_task_id)
+
+
 class Chart(Base):
     __tablename__ = "chart"
 
@@ -4745,11 +5482,17 @@ class DagRun(Base, LoggingMixin):
     run_id = Column(String(ID_LEN))
     external_trigger = Column(Boolean, default=True)
     conf = Column(PickleType)
+    # last time the row was written, read by the state changes API
+    updated_at = Column(DateTime, default=datetime.utcnow,
+                        onupdate=datetime.utcnow)
 
     dag = None
 
     __table_args__ = (
         Index('dr_run_id', dag_id, run_id, unique=True),
+        Index('dr_dag_state_date', dag_id, _state, execution_date),
+        Index('dr_execution_date', execution_date, id),
+        Index('dr_updated_at', updated_at),
     )
 
     def __repr__(self):
@@ -22,6 +22,7 @@ from airflow.hooks.hive_hooks import HiveCliHook
 from airflow.hooks.mssql_hook import MsSqlHook
 from airflow.models import BaseOperator
 from airflow.utils.decorators import apply_defaults
+from airflow.utils.file import TemporaryDirectory
 
 
 class MsSqlToHiveTransfer(BaseOperator):
@@ -57,6 +58,21 @@ class MsSqlToHiveTransfer(BaseOperator):
     :type hive_conn_id: str
     :param tblproperties: TBLPROPERTIES of the hive table being created
     :type tblproperties: dict
+    :param split_by: integer column of the query's results on which to
+        split the extraction, see ``DbApiHook.get_split_queries``. The
+        query is run through a single cursor if not set
+    :type split_by: str
+    :param num_chunks: number of ranges of split_by extracted in parallel,
+        each into a compressed file, the files being loaded at once
+    :type num_chunks: int
+    :param chunk_retries: number of times the extraction of a chunk is
+        retried
+    :type chunk_retries: int
+    :param file_format: format of the staged files and of the table
+        created in Hive: textfile, parquet or orc. Parquet and ORC files are
+        written with pyarrow (hive extra), typed after the Hive types of
+        the columns
+    :type file_format: str
     """
 
     template_fields = ('sql', 'partition', 'hive_table')
@@ -75,6 +91,10 @@ class MsSqlToHiveTransfer(BaseOperator):
             mssql_conn_id='mssql_default',
             hive_cli_conn_id='hive_cli_default',
             tblproperties=None,
+            split_by=None,
+            num_chunks=1,
+            chunk_retries=2,
+            file_format='textfile',
             *args, **kwargs):
         super(MsSqlToHiveTransfer, self).__init__(*args, **kwargs)
         self.sql = sql
@@ -87,6 +107,10 @@ class MsSqlToHiveTransfer(BaseOperator):
         self.hive_cli_conn_id = hive_cli_conn_id
         self.partition = partition or {}
         self.tblproperties = tblproperties
+        self.split_by = split_by
+        self.num_chunks = num_chunks
+        self.chunk_retries = chunk_retries
+        self.file_format = file_format
 
     @classmethod
     def type_map(cls, mssql_type):
@@ -98,33 +122,69 @@ class MsSqlToHiveTransfer(BaseOperator):
         }
         return d[mssql_type] if mssql_type in d else 'STRING'
 
+    def get_field_dict(self, description):
+        field_dict = OrderedDict()
+        col_count = 0
+        for field in description:
+            col_count += 1
+            col_position = "Column{position}".format(position=col_count)
+            field_dict[col_position if field[0] == '' else field[0]] = self.type_map(field[1])
+        return field_dict
+
     def execute(self, context):
         hive = HiveCliHook(hive_cli_conn_id=self.hive_cli_conn_id)
         mssql = MsSqlHook(mssql_conn_id=self.mssql_conn_id)
 
+        if (self.split_by and self.num_chunks > 1) or \
+                self.file_format != 'textfile':
+            if self.split_by and self.num_chunks > 1:
+                queries = mssql.get_split_queries(
+                    self.sql, self.split_by, self.num_chunks)
+            else:
+                queries = [self.sql]
+            self.log.info(
+                "Dumping Microsoft SQL Server query results to local %s files, in %s chunks",
+                self.file_format, len(queries))
+            write_rows = None
+            suffix = '.csv.gz'
+            if self.file_format != 'textfile':
+                suffix = '.' + self.file_format
+
+                def write_rows(description, rows, filename):
+                    hive.write_columnar_file(
+                        rows, self.get_field_dict(description), filename,
+                        self.file_format)
+
+            with TemporaryDirectory(prefix='airflow_mssql_to_hive_') as tmp_dir:
+                description = mssql.dump_queries(
+                    queries, tmp_dir, delimiter=self.delimiter,
+                    retries=self.chunk_retries, write_rows=write_rows,
+                    suffix=suffix)
+                self.load(hive, tmp_dir, self.get_field_dict(description))
+            return
+
         self.log.info("Dumping Microsoft SQL Server query results to local file")
         conn = mssql.get_conn()
         cursor = conn.cursor()
         cursor.execute(self.sql)
         with NamedTemporaryFile("w") as f:
             csv_writer = csv.writer(f, delimiter=self.delimiter, encoding='utf-8')
-            field_dict = OrderedDict()
-            col_count = 0
-            for field in cursor.description:
-                col_count += 1
-                col_position = "Column{position}".format(position=col_count)
-                field_dict[col_position if field[0] == '' else field[0]] = self.type_map(field[1])
+            field_dict = self.get_field_dict(cursor.description)
             csv_writer.writerows(cursor)
             f.flush()
             cursor.close()
             conn.close()
-            self.log.info("Loading file into Hive")
-            hive.load_file(
-                f.name,
-                self.hive_table,
-                field_dict=field_dict,
-                create=self.create,
-                partition=self.partition,
-                delimiter=self.delimiter,
-                recreate=self.recreate,
-                tblproperties=self.tblproperties)
+            self.load(hive, f.name, field_dict)
+
+    def load(self, hive, filepath, field_dict):
+        self.log.info("Loading file into Hive")
+        hive.load_file(
+            filepath,
+            self.hive_table,
+            field_dict=field_dict,
+            create=self.create,
+            partition=self.partition,
+            delimiter=self.delimiter,
+            recreate=self.recreate,
+            file_format=self.file_format,
+            tblproperties=self.tblproperties)
@@ -13,7 +13,9 @@
 # limitations under the License.
 
 from tempfile import NamedTemporaryFile
+import errno
 import subprocess
+import threading
 
 from airflow.exceptions import AirflowException
 from airflow.hooks.S3_hook import S3Hook
@@ -35,6 +37,14 @@ class S3FileTransformOperator(BaseOperator):
     destination file. The operator then takes over control and uploads the
     local destination file to S3.
 
+    In streaming mode nothing is written to the local filesystem: the source
+    object is piped into the standard input of the transformation script
+    while its standard output is uploaded with a multipart upload, so that
+    download, transformation and upload overlap and memory stays bounded by
+    the parts in flight. The script then gets ``/dev/stdin`` and
+    ``/dev/stdout`` as arguments and must read and write them sequentially.
+    The upload is aborted if the script or the download fail.
+
     :param source_s3_key: The key to be retrieved from S3
     :type source_s3_key: str
     :param source_s3_conn_id: source s3 connection
@@ -47,11 +57,16 @@ class S3FileTransformOperator(BaseOperator):
     :type replace: bool
     :param transform_script: location of the executable transformation script
     :type transform_script: str
+    :param streaming: stream the object through the script instead of
+        going through local files
+    :type streaming: bool
     """
 
     template_fields = ('source_s3_key', 'dest_s3_key')
     template_ext = ()
     ui_color = '#f9c915'
+    # size of the reads of the source object in streaming mode
+    CHUNK_SIZE = 1024 * 1024
 
     @apply_defaults
     def __init__(
@@ -62,6 +77,7 @@ class S3FileTransformOperator(BaseOperator):
             source_s3_conn_id='s3_default',
             dest_s3_conn_id='s3_default',
             replace=False,
+            streaming=False,
             *args, **kwargs):
         super(S3FileTransformOperator, self).__init__(*args, **kwargs)
         self.source_s3_key = source_s3_key
@@ -70,22 +86,24 @@ class S3FileTransformOperator(BaseOperator):
         self.dest_s3_conn_id = dest_s3_conn_id
         self.replace = replace
         self.transform_script = transform_script
+        self.streaming = streaming
 
     def execute(self, context):
-        source_s3 = S3Hook(s3_conn_id=self.source_s3_conn_id)
-        dest_s3 = S3Hook(s3_conn_id=self.dest_s3_conn_id)
+        source_s3 = S3Hook(aws_conn_id=self.source_s3_conn_id)
+        dest_s3 = S3Hook(aws_conn_id=self.dest_s3_conn_id)
         self.log.info("Downloading source S3 file %s", self.source_s3_key)
         if not source_s3.check_for_key(self.source_s3_key):
             raise AirflowException("The source key {0} does not exist".format(self.source_s3_key))
-        source_s3_key_object = source_s3.get_key(self.source_s3_key)
-        with NamedTemporaryFile("w") as f_source, NamedTemporaryFile("w") as f_dest:
+        if self.streaming:
+            self._execute_streaming(source_s3, dest_s3)
+            return
+        with NamedTemporaryFile("wb") as f_source, NamedTemporaryFile("wb") as f_dest:
             self.log.info(
                 "Dumping S3 file %s contents to local file %s",
                 self.source_s3_key, f_source.name
             )
-            source_s3_key_object.get_contents_to_file(f_source)
+            source_s3.download_fileobj(self.source_s3_key, f_source)
             f_source.flush()
-            source_s3.connection.close()
             transform_script_process = subprocess.Popen(
                 [self.transform_script, f_source.name, f_dest.name],
                 stdout=subprocess.PIPE, stderr=subprocess.PIPE)
@@ -106,4 +124,73 @@ class S3FileTransformOperator(BaseOperator):
                 replace=self.replace
             )
             self.log.info("Upload successful")
-            dest_s3.connection.close()
+
+    def _execute_streaming(self, source_s3, dest_s3):
+        source_body = source_s3.get_key(self.source_s3_key)['Body']
+        process = subprocess.Popen(
+            [self.transform_script, '/dev/stdin', '/dev/stdout'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+        errors = []
+
+        def feed():
+            try:
+                for chunk in iter(lambda: source_body.read(self.CHUNK_SIZE), b''):
+                    process.stdin.write(chunk)
+                process.stdin.close()
+            except Exception as e:
+                # the script closing its input early breaks the pipe, its
+                # exit code tells whether that is fine; anything else must
+                # not let the script see a regular end of input
+                if getattr(e, 'errno', None) != errno.EPIPE:
+                    errors.append(e)
+                    process.kill()
+
+        def log_stderr():
+            for line in iter(process.stderr.readline, b''):
+                self.log.info("Transform script stderr %s", line.rstrip())
+
+        threads = [threading.Thread(target=feed),
+                   threading.Thread(target=log_stderr)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        self.log.info("Streaming %s through %s to %s", self.source_s3_key,
+                      self.transform_script, self.dest_s3_key)
+        try:
+            dest_s3.load_fileobj(
+                _ProcessOutput(process, errors),
+                key=self.dest_s3_key,
+                replace=self.replace
+            )
+        finally:
+            if process.poll() is None:
+                process.kill()
+            for thread in threads:
+                thread.join()
+        self.log.info("Upload successful")
+
+
+class _ProcessOutput(object):
+    """
+    Standard output of a process as a file object whose end raises unless
+    the process succeeded, which aborts the multipart upload reading it
+    before it completes.
+    """
+
+    def __init__(self, process, errors):
+        self.process = process
+        self.errors = errors
+
+    def read(self, size=-1):
+        data = self.process.stdout.read(size)
+        if not data:
+            returncode = self.process.wait()
+            if self.errors:
+                raise AirflowException(
+                    "Reading the source failed {}".format(self.errors[0]))
+            if returncode != 0:
+                raise AirflowException(
+                    "Transform script failed with exit code {}".format(returncode))
+        return data
@@ -21,15 +21,20 @@ standard_library.install_aliases()
 from builtins import str
 from past.builtins import basestring
 
+from collections import defaultdict
 from datetime import datetime
 from urllib.parse import urlparse
 from time import sleep
 import re
 import sys
 
-from airflow import settings
-from airflow.exceptions import AirflowException, AirflowSensorTimeout, AirflowSkipException
-from airflow.models import BaseOperator, TaskInstance
+from sqlalchemy import and_, or_
+
+from airflow import configuration, settings
+from airflow.exceptions import (
+    AirflowException, AirflowSensorTimeout, AirflowSkipException,
+    AirflowSmartSensorException)
+from airflow.models import BaseOperator, SensorInstance, TaskInstance
 from airflow.hooks.base_hook import BaseHook
 from airflow.hooks.hdfs_hook import HDFSHook
 from airflow.hooks.http_hook import HttpHook
@@ -45,6 +50,12 @@ class BaseSensorOperator(BaseOperator):
     Sensor operators keep executing at a time interval and succeed when
         a criteria is met and fail if and when they time out.
 
+    Sensors listing the attributes their poke depends on in
+    ``poke_context_fields`` can, when ``[smart_sensor] use_smart_sensor`` is
+    on, hand their pokes over to the sensor service (``airflow
+    sensor_service``) after a first unsuccessful poke instead of holding a
+    worker slot; the task instance then waits in the ``sensing`` state.
+
     :param soft_fail: Set to true to mark the task as SKIPPED on failure
     :type soft_fail: bool
     :param poke_interval: Time in seconds that the job should wait in
@@ -54,6 +65,12 @@ class BaseSensorOperator(BaseOperator):
     :type timeout: int
     '''
     ui_color = '#e6f1f2'
+    # attributes that, with the sensor class, fully describe a poke
+    poke_context_fields = ()
+    # whether the poke also reads context['execution_date']
+    poke_uses_execution_date = False
+    # whether poke_many answers many pokes cheaper than poking one by one
+    batch_pokes = False
 
     @apply_defaults
     def __init__(
@@ -74,8 +91,57 @@ class BaseSensorOperator(BaseOperator):
         '''
         raise AirflowException('Override me.')
 
+    @classmethod
+    def poke_many(cls, pokes):
+        '''
+        Pokes for many sensors of this class at once, used by the sensor
+        service for the classes setting ``batch_pokes``.
+
+        :param pokes: (sensor, context) pairs
+        :type pokes: list[tuple]
+        :return: whether the criteria of each poke is met
+        :rtype: list[bool]
+        '''
+        return [sensor.poke(context) for sensor, context in pokes]
+
+    def get_poke_context(self, context):
+        '''
+        Keyword arguments the sensor service builds a sensor with to poke on
+        behalf of this task instance, values must be picklable.
+        '''
+        return {field: getattr(self, field)
+                for field in self.poke_context_fields}
+
+    def is_smart_sensor_compatible(self):
+        '''
+        Whether the pokes of this sensor can be handed over to the sensor
+        service. The service does not load the DAG, so sensors with callbacks
+        or failure emails keep poking from their worker.
+        '''
+        if not self.poke_context_fields:
+            return False
+        if not configuration.getboolean('smart_sensor', 'use_smart_sensor'):
+            return False
+        enabled = [name.strip() for name in configuration.get(
+            'smart_sensor', 'sensors_enabled').split(',')]
+        if self.__class__.__name__ not in enabled:
+            return False
+        if (self.on_failure_callback or self.on_retry_callback or
+                self.on_success_callback):
+            return False
+        return not (self.email and (self.email_on_failure or self.email_on_retry))
+
     def execute(self, context):
         started_at = datetime.utcnow()
+        if self.is_smart_sensor_compatible() and not context['ti'].test_mode:
+            if self.poke(context):
+                self.log.info("Success criteria met. Exiting.")
+                return
+            SensorInstance.register(
+                context['ti'], self, self.get_poke_context(context))
+            raise AirflowSmartSensorException(
+                'Handed over to the sensor service.')
+
         while not self.poke(context):
             if (datetime.utcnow() - started_at).total_seconds() > self.timeout:
                 if self.soft_fail:
@@ -203,6 +269,11 @@ class ExternalTaskSensor(BaseSensorOperator):
     :type execution_date_fn: callable
     """
     ui_color = '#19647e'
+    poke_context_fields = (
+        'external_dag_id', 'external_task_id', 'allowed_states',
+        'execution_delta')
+    poke_uses_execution_date = True
+    batch_pokes = True
 
     @apply_defaults
     def __init__(
@@ -225,8 +296,15 @@ class ExternalTaskSensor(BaseSensorOperator):
         self.external_dag_id = external_dag_id
         self.external_task_id = external_task_id
 
-    @provide_session
-    def poke(self, context, session=None):
+    def is_smart_sensor_compatible(self):
+        # the sensor service cannot call back into the DAG file
+        return (self.execution_date_fn is None and
+                super(ExternalTaskSensor, self).is_smart_sensor_compatible())
+
+    def get_dttm_filter(self, context):
+        """
+        Execution dates of the external task instances the criteria is about.
+        """
         if self.execution_delta:
             dttm = context['execution_date'] - self.execution_delta
         elif self.execution_date_fn:
@@ -234,7 +312,11 @@ class ExternalTaskSensor(BaseSensorOperator):
         else:
             dttm = context['execution_date']
 
-        dttm_filter = dttm if isinstance(dttm, list) else [dttm]
+        return dttm if isinstance(dttm, list) else [dttm]
+
+    @provide_session
+    def poke(self, context, session=None):
+        dttm_filter = self.get_dttm_filter(context)
         serialized_dttm_filter = ','.join(
             [datetime.isoformat() for datetime in dttm_filter])
 
@@ -254,6 +336,43 @@ class ExternalTaskSensor(BaseSensorOperator):
         session.commit()
         return count == len(dttm_filter)
 
+    @classmethod
+    @provide_session
+    def poke_many(cls, pokes, session=None):
+        """
+        Answers the pokes of many external task sensors with one query on
+        the task instances they wait for, instead of one count per sensor.
+        """
+        checks = [(sensor, sensor.get_dttm_filter(context))
+                  for sensor, context in pokes]
+        if not checks:
+            return []
+
+        task_ids = defaultdict(set)
+        dates = set()
+        for sensor, dttm_filter in checks:
+            task_ids[sensor.external_dag_id].add(sensor.external_task_id)
+            dates.update(dttm_filter)
+
+        TI = TaskInstance
+        states = {}
+        rows = session.query(
+            TI.dag_id, TI.task_id, TI.execution_date, TI.state,
+        ).filter(
+            or_(*[and_(TI.dag_id == dag_id, TI.task_id.in_(dag_task_ids))
+                  for dag_id, dag_task_ids in task_ids.items()]),
+            TI.execution_date.in_(dates),
+        )
+        for dag_id, task_id, execution_date, state in rows:
+            states[(dag_id, task_id, execution_date)] = state
+        session.commit()
+
+        return [
+            all(states.get((sensor.external_dag_id, sensor.external_task_id,
+                            dttm)) in sensor.allowed_states
+                for dttm in dttm_filter)
+            for sensor, dttm_filter in checks]
+
 
 class NamedHivePartitionSensor(BaseSensorOperator):
     """
@@ -505,6 +624,8 @@ class S3KeySensor(BaseSensorOperator):
     :type s3_conn_id: str
     """
     template_fields = ('bucket_key', 'bucket_name')
+    poke_context_fields = (
+        'bucket_key', 'bucket_name', 'wildcard_match', 's3_conn_id')
 
     @apply_defaults
     def __init__(
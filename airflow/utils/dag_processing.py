@@ -54,6 +54,9 @@ class SimpleDag(BaseDag):
                     task.task_id, task.__class__.__name__
                 ) for task in dag.tasks
             ]}
+        self._resumable_operators = set(
+            task.__class__.__name__ for task in dag.tasks
+            if task.resumable_after_deploy)
         self._full_filepath = dag.full_filepath
         self._is_paused = dag.is_paused
         self._concurrency = dag.concurrency
@@ -114,6 +117,15 @@ class SimpleDag(BaseDag):
         """
         return self._pickle_id
 
+    @property
+    def resumable_operators(self):
+        """
+        :return: names of the operator classes of this DAG that are resumable
+        after a deploy
+        :rtype: set[unicode]
+        """
+        return self._resumable_operators
+
     @property
     def task_special_args(self):
         return self._task_special_args
@@ -17,9 +17,11 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta  # for doctest
 import six
+import threading
 
 from croniter import croniter
 
@@ -33,6 +35,115 @@ cron_presets = {
 }
 
 
+class CronSchedule(object):
+    """
+    Answers next/previous fire time queries on a cron expression by
+    bisection over a window of precomputed fire times, instead of building
+    a croniter for every query. The window is extended forward in chunks as
+    callers walk the schedule (the scheduler and the SLA checks mostly walk
+    forward one interval at a time) and is recomputed around the queried
+    date when it falls outside of it. Walking backward, like the tree view
+    does, extends it backward.
+
+    Use ``cron_schedule`` to get the instance shared by every DAG with the
+    same expression.
+
+    :param expression: a cron expression
+    :type expression: str
+    """
+    CHUNK = 256
+    MAX_FIRES = 4 * CHUNK
+
+    def __init__(self, expression):
+        self.expression = expression
+        # (first, last, fires): every fire time between first and last,
+        # replaced as a whole so concurrent readers see a consistent window
+        self._window = None
+
+    def _load(self, dttm):
+        cron = croniter(self.expression, dttm)
+        first = cron.get_prev(datetime)
+        cron = croniter(self.expression, first)
+        fires = [first] + [cron.get_next(datetime) for _ in range(self.CHUNK)]
+        self._window = window = (fires[0], fires[-1], fires)
+        return window
+
+    def _extend(self, window, backward=False):
+        first, last, fires = window
+        keep = self.MAX_FIRES - self.CHUNK
+        if backward:
+            cron = croniter(self.expression, first)
+            fires = [cron.get_prev(datetime)
+                     for _ in range(self.CHUNK)][::-1] + fires[:keep]
+        else:
+            cron = croniter(self.expression, last)
+            fires = fires[-keep:] + [
+                cron.get_next(datetime) for _ in range(self.CHUNK)]
+        self._window = window = (fires[0], fires[-1], fires)
+        return window
+
+    def _window_after(self, dttm):
+        window = self._window
+        if window is None or dttm < window[0]:
+            window = self._load(dttm)
+        elif dttm >= window[1]:
+            window = self._extend(window)
+            if dttm >= window[1]:
+                window = self._load(dttm)
+        return window
+
+    def following(self, dttm):
+        """
+        The first fire time strictly after dttm.
+        """
+        fires = self._window_after(dttm)[2]
+        return fires[bisect_right(fires, dttm)]
+
+    def between(self, start, end):
+        """
+        The fire times strictly after start and strictly before end.
+        """
+        dates = []
+        while True:
+            fires = self._window_after(start)[2]
+            lo = bisect_right(fires, start)
+            hi = bisect_left(fires, end)
+            dates.extend(fires[lo:hi])
+            if hi < len(fires):
+                return dates
+            start = fires[-1]
+
+    def previous(self, dttm):
+        """
+        The last fire time strictly before dttm.
+        """
+        window = self._window
+        if window is None or dttm > window[1]:
+            window = self._load(dttm)
+        elif dttm <= window[0]:
+            window = self._extend(window, backward=True)
+            if dttm <= window[0]:
+                window = self._load(dttm)
+        fires = window[2]
+        return fires[bisect_left(fires, dttm) - 1]
+
+
+_cron_schedules = {}
+_cron_schedules_lock = threading.Lock()
+
+
+def cron_schedule(expression):
+    """
+    The CronSchedule of a cron expression, shared by all its callers.
+    """
+    schedule = _cron_schedules.get(expression)
+    if schedule is None:
+        with _cron_schedules_lock:
+            schedule = _cron_schedules.setdefault(
+                expression, CronSchedule(expression))
+    return schedule
+
+
 def date_range(
         start_date,
         end_date=None,
@@ -71,7 +182,7 @@ def date_range(
     delta_iscron = False
     if isinstance(delta, six.string_types):
         delta_iscron = True
-        cron = croniter(delta, start_date)
+        cron = cron_schedule(delta)
     elif isinstance(delta, timedelta):
         delta = abs(delta)
     l = []
@@ -79,7 +190,7 @@ def date_range(
         while start_date <= end_date:
             l.append(start_date)
             if delta_iscron:
-                start_date = cron.get_next(datetime)
+                start_date = cron.following(start_date)
             else:
                 start_date += delta
     else:
@@ -87,9 +198,9 @@ def date_range(
             l.append(start_date)
             if delta_iscron:
                 if num > 0:
-                    start_date = cron.get_next(datetime)
+                    start_date = cron.following(start_date)
                 else:
-                    start_date = cron.get_prev(datetime)
+                    start_date = cron.previous(start_date)
             else:
                 if num > 0:
                     start_date += delta
@@ -104,12 +104,7 @@ class FileTaskHandler(logging.Handler):
             except Exception as e:
                 log = "*** Failed to load local log file: {}. {}\n".format(location, str(e))
         else:
-            url = os.path.join(
-                "http://{hostname}:{worker_log_server_port}/log", log_relative_path
-            ).format(
-                hostname=self.get_hostname(ti),
-                worker_log_server_port=conf.get('celery', 'WORKER_LOG_SERVER_PORT')
-            )
+            url = self._log_server_url(ti, log_relative_path)
             log += "*** Log file isn't local.\n"
             log += "*** Fetching here: {url}\n".format(**locals())
             try:
@@ -130,6 +125,124 @@ class FileTaskHandler(logging.Handler):
 
         return log
 
+    def _log_server_url(self, ti, log_relative_path):
+        return os.path.join(
+            "http://{hostname}:{worker_log_server_port}/log", log_relative_path
+        ).format(
+            hostname=self.get_hostname(ti),
+            worker_log_server_port=conf.get('celery', 'WORKER_LOG_SERVER_PORT')
+        )
+
+    def _read_range(self, ti, try_number, offset, max_bytes):
+        """
+        Template method that reads part of the raw log of a try, see
+        read_range.
+        :param ti: task instance record
+        :param try_number: try_number to read log from
+        :param offset: byte offset to read from, from the end if negative
+        :param max_bytes: maximum number of bytes to read, None for all
+        :return: the bytes read, the offset they start at, the size of the
+            log so far and a header describing where it is read from
+        """
+        log_relative_path = self._render_filename(ti, try_number + 1)
+        location = os.path.join(self.local_base, log_relative_path)
+
+        if os.path.exists(location):
+            with open(location, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                start = max(0, size + offset) if offset < 0 else offset
+                f.seek(start)
+                data = f.read(-1 if max_bytes is None else max_bytes)
+            return data, start, size, "*** Reading local log.\n"
+
+        url = self._log_server_url(ti, log_relative_path)
+        header = ("*** Log file isn't local.\n"
+                  "*** Fetching here: {url}\n".format(url=url))
+        timeout = None  # No timeout
+        try:
+            timeout = conf.getint('webserver', 'log_fetch_timeout_sec')
+        except (AirflowConfigException, ValueError):
+            pass
+
+        if offset < 0:
+            byte_range = 'bytes={}'.format(offset)
+        elif max_bytes is None:
+            byte_range = 'bytes={}-'.format(offset)
+        else:
+            byte_range = 'bytes={}-{}'.format(offset, offset + max_bytes - 1)
+        response = requests.get(url, timeout=timeout,
+                                headers={'Range': byte_range})
+        if response.status_code == 416:
+            # nothing past the offset yet
+            return b'', max(offset, 0), max(offset, 0), header
+        response.raise_for_status()
+        data = response.content
+        if response.status_code == 206:
+            content_range = response.headers['Content-Range']
+            start = int(content_range.split(' ')[1].split('-')[0])
+            size = content_range.rsplit('/', 1)[1]
+            size = int(size) if size != '*' else start + len(data)
+            return data, start, size, header
+
+        # the log server ignored the range
+        size = len(data)
+        start = max(0, size + offset) if offset < 0 else offset
+        end = size if max_bytes is None else start + max_bytes
+        return data[start:end], start, size, header
+
+    def read_range(self, task_instance, try_number, offset=0, max_bytes=None,
+                   follow=False):
+        """
+        Read part of the log of a try, from a byte offset, so that it can be
+        read incrementally while it grows: the metadata returned has the
+        offset to read from next.
+        :param task_instance: task instance object
+        :param try_number: task instance try_number to read logs from
+        :param offset: byte offset to read from, or the number of bytes to
+            read from the end of the log if negative
+        :param max_bytes: maximum number of bytes to read, None for all
+        :param follow: whether the read follows a previous one, in which case
+            the log is neither prefixed by where it is read from nor replaced
+            by an error message, which goes to the ``error`` metadata instead
+        :type follow: bool
+        :return: the log read, prefixed by where it is read from when read
+            from its beginning or its end, and its metadata: ``offset`` to
+            read from next, ``size`` of the log so far (None if it could not
+            be read) and ``end_of_log`` whether all of it was read
+        :rtype: tuple(unicode, dict)
+        """
+        try:
+            data, start, size, header = self._read_range(
+                task_instance, try_number, offset, max_bytes)
+        except Exception as e:
+            error = "*** Failed to read the log: {}\n".format(e)
+            metadata = {'offset': max(offset, 0), 'size': None,
+                        'end_of_log': True}
+            if follow:
+                metadata['error'] = error
+                return '', metadata
+            return error, metadata
+
+        if offset < 0 and start > 0:
+            # the end of the log starts after the first full line
+            skipped = data.find(b'\n') + 1 or len(data)
+            data = data[skipped:]
+            start += skipped
+        if start + len(data) < size:
+            # stop after the last full line, which never ends in the middle
+            # of a multi-byte character
+            last_newline = data.rfind(b'\n')
+            if last_newline >= 0:
+                data = data[:last_newline + 1]
+
+        next_offset = start + len(data)
+        log = data.decode('utf-8', 'replace')
+        if offset <= 0 and not follow:
+            log = header + log
+        return log, {'offset': next_offset, 'size': size,
+                     'end_of_log': next_offset >= size}
+
     def read(self, task_instance, try_number=None):
         """
         Read logs of given task instance from local machine.
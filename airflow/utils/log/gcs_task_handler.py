@@ -109,6 +109,24 @@ class GCSTaskHandler(FileTaskHandler, LoggingMixin):
 
         return log
 
+    def _read_range(self, ti, try_number, offset, max_bytes):
+        """
+        Read part of the log of given task instance and try_number from GCS
+        with a ranged download, from the task instance host machine if it is
+        not there yet.
+        """
+        log_relative_path = self._render_filename(ti, try_number + 1)
+        remote_loc = os.path.join(self.remote_base, log_relative_path)
+
+        if self.gcs_log_exists(remote_loc):
+            bkt, blob = self.parse_gcs_url(remote_loc)
+            data, start, size = self.hook.download_range(
+                bkt, blob, offset=offset, length=max_bytes)
+            return (data, start, size,
+                    '*** Reading remote log from {}.\n'.format(remote_loc))
+        return super(GCSTaskHandler, self)._read_range(
+            ti, try_number, offset, max_bytes)
+
     def gcs_log_exists(self, remote_log_location):
         """
         Check if remote_log_location exists in remote storage
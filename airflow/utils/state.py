@@ -45,6 +45,8 @@ class State(object):
     UP_FOR_RETRY = "up_for_retry"
     UPSTREAM_FAILED = "upstream_failed"
     SKIPPED = "skipped"
+    # waiting on the sensor service, see airflow.jobs.SensorServiceJob
+    SENSING = "sensing"
 
     task_states = (
         SUCCESS,
@@ -53,6 +55,7 @@ class State(object):
         UPSTREAM_FAILED,
         UP_FOR_RETRY,
         QUEUED,
+        SENSING,
     )
 
     dag_states = (
@@ -73,6 +76,7 @@ class State(object):
         SKIPPED: 'pink',
         REMOVED: 'lightgrey',
         SCHEDULED: 'white',
+        SENSING: 'lightseagreen',
     }
 
     @classmethod
@@ -115,5 +119,6 @@ class State(object):
             cls.SCHEDULED,
             cls.QUEUED,
             cls.RUNNING,
+            cls.SENSING,
             cls.UP_FOR_RETRY
         ]
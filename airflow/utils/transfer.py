@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import unicode_literals
+
+import base64
+import hashlib
+from multiprocessing.pool import ThreadPool
+
+from airflow import configuration as conf
+from airflow.exceptions import AirflowException
+from airflow.utils.log.logging_mixin import LoggingMixin
+
+MB = 1024 * 1024
+# S3 multipart limits, see boto3's s3transfer.utils.ChunksizeAdjuster
+S3_MIN_PART_SIZE = 5 * MB
+S3_MAX_PART_SIZE = 5 * 1024 * MB
+S3_MAX_PARTS = 10000
+# resumable uploads to Google Cloud Storage go in multiples of 256 KB
+GCS_CHUNK_MULTIPLE = 256 * 1024
+
+
+def file_md5(fileobj, start=0, size=None, block_size=MB):
+    """
+    MD5 of ``size`` bytes (all of them if None) of a seekable file object,
+    starting at ``start``.
+    """
+    md5 = hashlib.md5()
+    fileobj.seek(start)
+    remaining = size
+    while remaining is None or remaining > 0:
+        block = fileobj.read(block_size if remaining is None
+                             else min(block_size, remaining))
+        if not block:
+            break
+        md5.update(block)
+        if remaining is not None:
+            remaining -= len(block)
+    return md5
+
+
+def s3_part_size(part_size, file_size):
+    """
+    The part size boto3 actually uses for a multipart transfer of
+    ``file_size`` bytes: within the S3 limits and with at most 10000 parts.
+    """
+    part_size = min(max(part_size, S3_MIN_PART_SIZE), S3_MAX_PART_SIZE)
+    while -(-file_size // part_size) > S3_MAX_PARTS:
+        part_size *= 2
+    return part_size
+
+
+def s3_etag(fileobj, file_size, part_size):
+    """
+    The ETag S3 gives to an object uploaded from ``fileobj`` by boto3 with
+    ``part_size`` as multipart threshold and part size: the MD5 of the
+    content for single part uploads, the MD5 of the parts' MD5s followed by
+    the number of parts otherwise. Not valid for SSE-KMS/SSE-C objects.
+    """
+    if file_size < part_size:
+        return file_md5(fileobj).hexdigest()
+    part_size = s3_part_size(part_size, file_size)
+    digests = [file_md5(fileobj, start, part_size).digest()
+               for start in range(0, file_size, part_size)]
+    return '{}-{}'.format(hashlib.md5(b''.join(digests)).hexdigest(),
+                          len(digests))
+
+
+class HashingWriter(object):
+    """
+    Write-only file object computing the MD5 of what goes through it.
+
+    :param fileobj: the file object written to
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.md5 = hashlib.md5()
+
+    def write(self, data):
+        self.md5.update(data)
+        return self.fileobj.write(data)
+
+    def b64digest(self):
+        return base64.b64encode(self.md5.digest()).decode('ascii')
+
+
+class TransferManager(LoggingMixin):
+    """
+    Shared by the S3 and Google Cloud Storage hooks to size the parts of
+    multipart (S3) and chunked resumable (GCS) transfers, to run many
+    transfers concurrently and to verify the checksums of transferred
+    files. Defaults come from the [transfer] section of the configuration.
+
+    :param part_size: size in bytes of the parts or chunks transferred
+    :type part_size: int
+    :param concurrency: number of parts of an S3 object, or of objects in
+        ``run_many``, transferred at the same time
+    :type concurrency: int
+    :param verify_checksums: whether to compare the MD5 of transferred files
+        with the one stored with the object
+    :type verify_checksums: bool
+    :param num_retries: times a failed chunk of a resumable transfer is
+        retried
+    :type num_retries: int
+    """
+
+    def __init__(self, part_size=None, concurrency=None,
+                 verify_checksums=None, num_retries=None):
+        self.part_size = part_size or conf.getint('transfer', 'part_size_mb') * MB
+        self.concurrency = concurrency or conf.getint('transfer', 'concurrency')
+        if verify_checksums is None:
+            verify_checksums = conf.getboolean('transfer', 'verify_checksums')
+        self.verify_checksums = verify_checksums
+        if num_retries is None:
+            num_retries = conf.getint('transfer', 'num_retries')
+        self.num_retries = num_retries
+
+    @property
+    def gcs_chunk_size(self):
+        return -(-self.part_size // GCS_CHUNK_MULTIPLE) * GCS_CHUNK_MULTIPLE
+
+    def s3_config(self):
+        """
+        boto3 TransferConfig running multipart transfers with the part size
+        and concurrency of this manager.
+        """
+        from boto3.s3.transfer import TransferConfig
+        return TransferConfig(multipart_threshold=self.part_size,
+                              multipart_chunksize=self.part_size,
+                              max_concurrency=self.concurrency)
+
+    def run_many(self, transfer, transfers):
+        """
+        Calls ``transfer(*args)`` for every tuple of arguments of
+        ``transfers``, ``concurrency`` of them at a time, and returns their
+        results in order. The first error is raised once the transfers
+        already started are over.
+        """
+        transfers = list(transfers)
+        if not transfers:
+            return []
+        pool = ThreadPool(min(self.concurrency, len(transfers)))
+        try:
+            return pool.map(lambda args: transfer(*args), transfers)
+        finally:
+            pool.close()
+            pool.join()
+
+    def check(self, name, expected, actual):
+        """
+        Raises if the checksum of a transferred file does not match the one
+        of the object.
+        """
+        if expected != actual:
+            raise AirflowException(
+                'Checksum mismatch for {}: expected {}, got {}'.format(
+                    name, expected, actual))
+        self.log.info('Verified checksum of %s', name)
@@ -12,20 +12,27 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import airflow.api
+from airflow import configuration as conf
 
+from airflow.api.common.experimental import drain as drain_api
+from airflow.api.common.experimental import mark_tasks
 from airflow.api.common.experimental import pool as pool_api
+from airflow.api.common.experimental import states as states_api
 from airflow.api.common.experimental import trigger_dag as trigger
 from airflow.api.common.experimental.get_task import get_task
 from airflow.api.common.experimental.get_task_instance import get_task_instance
 from airflow.exceptions import AirflowException
 from airflow.utils.log.logging_mixin import LoggingMixin
+from airflow.utils.state import State
 from airflow.www.app import csrf
 
 from flask import (
     g, Markup, Blueprint, redirect, jsonify, abort,
-    request, current_app, send_file, url_for
+    request, current_app, send_file, url_for, Response
 )
 from datetime import datetime
+import json
+import time
 
 _log = LoggingMixin().log
 
@@ -151,6 +158,79 @@ def task_instance_info(dag_id, execution_date, task_id):
     return jsonify(fields)
 
 
+@csrf.exempt
+@api_experimental.route('/dags/<string:dag_id>/dag_runs/<string:execution_date>/tasks/<string:task_id>/state', methods=['POST'])
+@requires_authentication
+def set_task_instance_state(dag_id, execution_date, task_id):
+    """
+    Sets the state of a task instance, "success" unless specified in the
+    data, and of its relatives if "upstream", "downstream", "future" or
+    "past" are set. With "async", the task instances are marked in the
+    background and the response has the id of the job marking them, see
+    set_task_instance_state_progress.
+    """
+    data = request.get_json(force=True)
+
+    try:
+        execution_date = datetime.strptime(execution_date,
+                                           '%Y-%m-%dT%H:%M:%S')
+    except ValueError:
+        error_message = (
+            'Given execution date, {}, could not be identified '
+            'as a date. Example date format: 2015-11-16T14:34:15'
+            .format(execution_date))
+        _log.info(error_message)
+        response = jsonify({'error': error_message})
+        response.status_code = 400
+
+        return response
+
+    state = data.get('state', State.SUCCESS)
+    if state not in State.task_states:
+        response = jsonify(error="Invalid state {}".format(state))
+        response.status_code = 400
+        return response
+    relatives = {key: bool(data.get(key))
+                 for key in ('upstream', 'downstream', 'future', 'past')}
+
+    try:
+        task = get_task(dag_id, task_id)
+        if data.get('async'):
+            job_id = mark_tasks.set_state_async(
+                task, execution_date, state=state, **relatives)
+        else:
+            altered = mark_tasks.set_state(
+                task, execution_date, state=state, commit=True, **relatives)
+    except AirflowException as err:
+        _log.info(err)
+        response = jsonify(error="{}".format(err))
+        response.status_code = 404
+        return response
+
+    if data.get('async'):
+        return jsonify(job_id=job_id)
+    return jsonify(message="Set {} task instances to {}".format(
+        len(altered), state))
+
+
+@api_experimental.route('/mark_tasks/<int:job_id>', methods=['GET'])
+@requires_authentication
+def set_task_instance_state_progress(job_id):
+    """
+    Returns the state of a job marking task instances in the background and,
+    when it runs in this webserver process, the number of task instances it
+    has to alter and has altered so far.
+    """
+    try:
+        progress = mark_tasks.get_set_state_progress(job_id)
+    except AirflowException as err:
+        _log.info(err)
+        response = jsonify(error="{}".format(err))
+        response.status_code = 404
+        return response
+    return jsonify(progress)
+
+
 @api_experimental.route('/latest_runs', methods=['GET'])
 @requires_authentication
 def latest_dag_runs():
@@ -232,3 +312,223 @@ def delete_pool(name):
         return response
     else:
         return jsonify(pool.to_json())
+
+
+@api_experimental.route('/drain', methods=['GET'])
+@requires_authentication
+def get_drain_status():
+    """Get the scheduler state and the task instances a redeploy waits for."""
+    try:
+        status = drain_api.get_drain_status()
+    except AirflowException as e:
+        _log.error(e)
+        response = jsonify(error="{}".format(e))
+        response.status_code = getattr(e, 'status', 500)
+        return response
+    else:
+        return jsonify(status)
+
+
+@csrf.exempt
+@api_experimental.route('/drain', methods=['POST'])
+@requires_authentication
+def start_drain():
+    """Stop scheduling new task instances ahead of a redeploy."""
+    try:
+        status = drain_api.start_drain()
+    except AirflowException as e:
+        _log.error(e)
+        response = jsonify(error="{}".format(e))
+        response.status_code = getattr(e, 'status', 500)
+        return response
+    else:
+        return jsonify(status)
+
+
+@csrf.exempt
+@api_experimental.route('/drain', methods=['DELETE'])
+@requires_authentication
+def stop_drain():
+    """Resume scheduling."""
+    try:
+        status = drain_api.stop_drain()
+    except AirflowException as e:
+        _log.error(e)
+        response = jsonify(error="{}".format(e))
+        response.status_code = getattr(e, 'status', 500)
+        return response
+    else:
+        return jsonify(status)
+
+
+def _date_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S')
+    except ValueError:
+        raise ValueError(
+            'Given {}, {}, could not be identified as a date. Example date '
+            'format: 2015-11-16T14:34:15'.format(name, value))
+
+
+def _state_filters():
+    return {
+        'dag_id': request.args.get('dag_id'),
+        'states': [None if state == 'none' else state
+                   for state in request.args.getlist('state')],
+        'execution_date_gte': _date_arg('execution_date_gte'),
+        'execution_date_lte': _date_arg('execution_date_lte'),
+        'cursor': request.args.get('cursor'),
+        'limit': request.args.get('limit', type=int),
+    }
+
+
+@api_experimental.route('/task_instances', methods=['GET'])
+@requires_authentication
+def task_instance_states():
+    """
+    Returns the states of the task instances matching the query string:
+    dag_id, task_id and state (both can be repeated, "none" for the task
+    instances without a state), execution_date_gte and execution_date_lte.
+    At most "limit" of them are returned, with the "cursor" to pass to get
+    the next ones, null after the last ones.
+    """
+    try:
+        task_instances, cursor = states_api.get_task_instance_states(
+            task_ids=request.args.getlist('task_id'), **_state_filters())
+    except (ValueError, AirflowException) as err:
+        _log.info(err)
+        response = jsonify(error="{}".format(err))
+        response.status_code = 400
+        return response
+    return jsonify(task_instances=task_instances, cursor=cursor)
+
+
+@api_experimental.route('/dag_runs', methods=['GET'])
+@requires_authentication
+def dag_run_states():
+    """
+    Returns the states of the DAG runs matching the query string: dag_id,
+    state (can be repeated), execution_date_gte and execution_date_lte. At
+    most "limit" of them are returned, with the "cursor" to pass to get the
+    next ones, null after the last ones.
+    """
+    try:
+        dag_runs, cursor = states_api.get_dag_run_states(**_state_filters())
+    except (ValueError, AirflowException) as err:
+        _log.info(err)
+        response = jsonify(error="{}".format(err))
+        response.status_code = 400
+        return response
+    return jsonify(dag_runs=dag_runs, cursor=cursor)
+
+
+@csrf.exempt
+@api_experimental.route('/dag_runs', methods=['POST'])
+@requires_authentication
+def trigger_dags():
+    """
+    Trigger the DAG runs listed in "dag_runs", each with a "dag_id" and
+    optionally a "run_id", "conf" and "execution_date" as for trigger_dag.
+    Returns, in order, a "message" for each DAG run created and an "error"
+    for each one that could not be.
+    """
+    data = request.get_json(force=True)
+    runs = []
+    for run in data.get('dag_runs') or []:
+        unknown = set(run) - {'dag_id', 'run_id', 'conf', 'execution_date'}
+        if 'dag_id' not in run or unknown:
+            response = jsonify(error="Invalid DAG run {}".format(run))
+            response.status_code = 400
+            return response
+        run = dict(run)
+        if run.get('execution_date') is not None:
+            try:
+                run['execution_date'] = datetime.strptime(
+                    run['execution_date'], '%Y-%m-%dT%H:%M:%S')
+            except ValueError:
+                error_message = (
+                    'Given execution date, {}, could not be identified '
+                    'as a date. Example date format: 2015-11-16T14:34:15'
+                    .format(run['execution_date']))
+                _log.info(error_message)
+                response = jsonify({'error': error_message})
+                response.status_code = 400
+                return response
+        runs.append(run)
+
+    payload = []
+    for run, result in zip(runs, trigger.trigger_dags(runs)):
+        if isinstance(result, AirflowException):
+            _log.error(result)
+            payload.append({'dag_id': run['dag_id'],
+                            'error': "{}".format(result)})
+        else:
+            if getattr(g, 'user', None):
+                _log.info("User {} created {}".format(g.user, result))
+            payload.append({'dag_id': run['dag_id'],
+                            'message': "Created {}".format(result)})
+    return jsonify(dag_runs=payload)
+
+
+@api_experimental.route('/state_changes', methods=['GET'])
+@requires_authentication
+def state_changes():
+    """
+    Long poll for the task instances and DAG runs written since "cursor":
+    waits up to "timeout" seconds for some. Without a cursor, returns right
+    away with the cursor to follow the changes from now on.
+    """
+    try:
+        changes = states_api.wait_for_state_changes(
+            cursor=request.args.get('cursor'),
+            timeout=request.args.get('timeout', type=float),
+            limit=request.args.get('limit', type=int))
+    except AirflowException as err:
+        _log.info(err)
+        response = jsonify(error="{}".format(err))
+        response.status_code = 400
+        return response
+    return jsonify(changes)
+
+
+@api_experimental.route('/state_changes/stream', methods=['GET'])
+@requires_authentication
+def stream_state_changes():
+    """
+    Server-sent events of the task instances and DAG runs written since
+    "cursor", or the Last-Event-ID header, whose id is the cursor to resume
+    from. The stream ends after [api] state_changes_max_wait seconds,
+    clients reconnect to follow on.
+    """
+    cursor = request.args.get('cursor') or request.headers.get('Last-Event-ID')
+    limit = request.args.get('limit', type=int)
+    try:
+        changes = states_api.wait_for_state_changes(
+            cursor=cursor, timeout=0, limit=limit)
+    except AirflowException as err:
+        _log.info(err)
+        response = jsonify(error="{}".format(err))
+        response.status_code = 400
+        return response
+    deadline = time.time() + conf.getint('api', 'state_changes_max_wait')
+
+    def events(changes):
+        while True:
+            if changes['task_instances'] or changes['dag_runs']:
+                yield 'id: {}\ndata: {}\n\n'.format(changes['cursor'], json.dumps({
+                    'task_instances': changes['task_instances'],
+                    'dag_runs': changes['dag_runs'],
+                }))
+            else:
+                # keeps the connection alive and the client's cursor current
+                yield 'id: {}\n\n'.format(changes['cursor'])
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            changes = states_api.wait_for_state_changes(
+                cursor=changes['cursor'], timeout=remaining, limit=limit)
+
+    return Response(events(changes), mimetype='text/event-stream')
@@ -0,0 +1,48 @@
+/**
+ * Licensed to the Apache Software Foundation (ASF) under one
+ * or more contributor license agreements.  See the NOTICE file
+ * distributed with this work for additional information
+ * regarding copyright ownership.  The ASF licenses this file
+ * to you under the Apache License, Version 2.0 (the
+ * "License"); you may not use this file except in compliance
+ * with the License.  You may obtain a copy of the License at
+ *
+ *   http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing,
+ * software distributed under the License is distributed on an
+ * "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+ * KIND, either express or implied.  See the License for the
+ * specific language governing permissions and limitations
+ * under the License.
+ */
+
+// Draws the series returned by /admin/airflow/task_stats_series, one line
+// per task, in the element matched by selector.
+function drawTaskStatsChart(selector, url, height, callback) {
+  d3.json(url, function(error, data) {
+    if (error) {
+      d3.select(selector).text('Could not load the chart: ' + error.statusText);
+      return;
+    }
+    nv.addGraph(function() {
+      var chart = nv.models.lineChart()
+        .x(function(d) { return d[0]; })
+        .y(function(d) { return d[1]; })
+        .height(height)
+        .useInteractiveGuideline(true);
+      chart.xAxis.tickFormat(function(d) {
+        return d3.time.format('%Y-%m-%d %H:%M')(new Date(d));
+      });
+      chart.yAxis
+        .axisLabel(data.label)
+        .tickFormat(d3.format(data.unit ? '.02f' : 'd'));
+      d3.select(selector).append('svg')
+        .style('height', height + 'px')
+        .datum(data.series)
+        .call(chart);
+      nv.utils.windowResize(chart.update);
+      return chart;
+    }, callback);
+  });
+}
@@ -38,12 +38,13 @@ from sqlalchemy import or_, desc, and_, union_all
 
 from flask import (
     abort, redirect, url_for, request, Markup, Response, current_app, render_template,
-    make_response)
+    make_response, stream_with_context, g)
 from flask_admin import BaseView, expose, AdminIndexView
 from flask_admin.contrib.sqla import ModelView
+from flask_admin.contrib.sqla import filters as sqla_filters
 from flask_admin.actions import action
 from flask_admin.babel import lazy_gettext
-from flask_admin.tools import iterdecode
+from flask_admin.tools import iterdecode, iterencode
 from flask_login import flash
 from flask._compat import PY2
 
@@ -70,7 +71,6 @@ from airflow.models import XCom, DagRun
 from airflow.ti_deps.dep_context import DepContext, QUEUE_DEPS, SCHEDULER_DEPS
 
 from airflow.models import BaseOperator
-from airflow.operators.subdag_operator import SubDagOperator
 
 from airflow.utils.json import json_ser
 from airflow.utils.state import State
@@ -84,7 +84,11 @@ from airflow.www.validators import GreaterEqualThan
 QUERY_LIMIT = 100000
 CHART_LIMIT = 200000
 
-dagbag = models.DagBag(settings.DAGS_FOLDER)
+if (conf.getboolean('webserver', 'lazy_load_dags') or
+        conf.getboolean('core', 'store_serialized_dags')):
+    dagbag = models.LazyDagBag(settings.DAGS_FOLDER)
+else:
+    dagbag = models.DagBag(settings.DAGS_FOLDER)
 
 login_required = airflow.login.login_required
 current_user = airflow.login.current_user
@@ -262,7 +266,8 @@ def recurse_tasks(tasks, task_ids, dag_ids, task_id_to_dag):
         for task in tasks:
             recurse_tasks(task, task_ids, dag_ids, task_id_to_dag)
         return
-    if isinstance(tasks, SubDagOperator):
+    # the SubDagOperators of deserialized DAGs are stand-ins of another class
+    if getattr(tasks, 'subdag', None) is not None:
         subtasks = tasks.subdag.tasks
         dag_ids.append(tasks.subdag.dag_id)
         for subtask in subtasks:
@@ -284,6 +289,32 @@ def get_chart_height(dag):
     return 600 + len(dag.tasks) * 10
 
 
+def downsample(x, y, max_points):
+    """
+    Pairs up the points of a chart series, averaging consecutive points in
+    buckets of equal size when there are more than max_points of them.
+
+    :param x: the x values, in increasing order
+    :type x: list
+    :param y: the y values
+    :type y: list
+    :param max_points: maximum number of points, 0 for no limit
+    :type max_points: int
+    :return: the [x, y] points
+    :rtype: list
+    """
+    if not max_points or len(x) <= max_points:
+        return [[x_value, y_value] for x_value, y_value in zip(x, y)]
+    size = -(-len(x) // max_points)
+    points = []
+    for i in range(0, len(x), size):
+        bucket_x = x[i:i + size]
+        bucket_y = y[i:i + size]
+        points.append([bucket_x[len(bucket_x) // 2],
+                       sum(bucket_y) / float(len(bucket_y))])
+    return points
+
+
 class Airflow(BaseView):
     def is_visible(self):
         return False
@@ -488,20 +519,21 @@ class Airflow(BaseView):
             data[dag_id][state] = count
 
         payload = {}
-        for dag in dagbag.dags.values():
-            payload[dag.safe_dag_id] = []
+        for dag_id in dagbag.dag_ids:
+            safe_dag_id = dag_id.replace('.', '__dot__')
+            payload[safe_dag_id] = []
             for state in State.dag_states:
                 try:
-                    count = data[dag.dag_id][state]
+                    count = data[dag_id][state]
                 except Exception:
                     count = 0
                 d = {
                     'state': state,
                     'count': count,
-                    'dag_id': dag.dag_id,
+                    'dag_id': dag_id,
                     'color': State.color(state)
                 }
-                payload[dag.safe_dag_id].append(d)
+                payload[safe_dag_id].append(d)
         return wwwutils.json_response(payload)
 
     @expose('/task_stats')
@@ -557,20 +589,21 @@ class Airflow(BaseView):
         session.commit()
 
         payload = {}
-        for dag in dagbag.dags.values():
-            payload[dag.safe_dag_id] = []
+        for dag_id in dagbag.dag_ids:
+            safe_dag_id = dag_id.replace('.', '__dot__')
+            payload[safe_dag_id] = []
             for state in State.task_states:
                 try:
-                    count = data[dag.dag_id][state]
-                except:
+                    count = data[dag_id][state]
+                except Exception:
                     count = 0
                 d = {
                     'state': state,
                     'count': count,
-                    'dag_id': dag.dag_id,
+                    'dag_id': dag_id,
                     'color': State.color(state)
                 }
-                payload[dag.safe_dag_id].append(d)
+                payload[safe_dag_id].append(d)
         return wwwutils.json_response(payload)
 
     @expose('/code')
@@ -634,9 +667,10 @@ class Airflow(BaseView):
     def pickle_info(self):
         d = {}
         dag_id = request.args.get('dag_id')
-        dags = [dagbag.dags.get(dag_id)] if dag_id else dagbag.dags.values()
+        # without a dag_id, only the DAGs loaded so far with lazy_load_dags
+        dags = [dagbag.get_dag(dag_id)] if dag_id else dagbag.dags.values()
         for dag in dags:
-            if not dag.is_subdag:
+            if dag and not dag.is_subdag:
                 d[dag.dag_id] = dag.pickle_info()
         return wwwutils.json_response(d)
 
@@ -700,31 +734,123 @@ class Airflow(BaseView):
             models.TaskInstance.dag_id == dag_id,
             models.TaskInstance.task_id == task_id,
             models.TaskInstance.execution_date == dttm).first()
+        max_bytes = conf.getint('webserver', 'log_render_max_bytes')
+        # per try, where to read what is logged next, None if unknown
+        metadata = []
         if ti is None:
             logs = ["*** Task instance did not exist in the DB\n"]
         else:
-            logger = logging.getLogger('airflow.task')
             task_log_reader = conf.get('core', 'task_log_reader')
-            handler = next((handler for handler in logger.handlers
-                            if handler.name == task_log_reader), None)
-
-            logging.info('LOG STATEMENT FOR JESSICA. LOGGER: %s, TASK_LOG_READER: %s, HANDLER: %s' % (logger, task_log_reader, handler))
-            logging.info('LOGGER HANDLERS ARE: %s' % logger.handlers)
+            handler = self._log_handler()
             try:
                 ti.task = dag.get_task(ti.task_id)
-                logs = handler.read(ti)
+                if hasattr(handler, 'read_range'):
+                    # only the end of long logs, the rest is streamed on
+                    # demand by log_stream
+                    logs = []
+                    for try_number in range(ti.try_number):
+                        log, meta = handler.read_range(
+                            ti, try_number, offset=-max_bytes)
+                        logs.append(log)
+                        metadata.append(meta)
+                else:
+                    logs = handler.read(ti)
             except AttributeError as e:
                 logs = ["Task log handler {} does not support read logs.\n{}\n" \
-                            .format(task_log_reader, e.message)]
+                            .format(task_log_reader, e)]
 
         for i, log in enumerate(logs):
             if PY2 and not isinstance(log, unicode):
                 logs[i] = log.decode('utf-8')
+        metadata += [None] * (len(logs) - len(metadata))
 
         return self.render(
             'airflow/ti_log.html',
-            logs=logs, dag=dag, title="Log by attempts", task_id=task_id,
-            execution_date=execution_date, form=form)
+            logs=logs, metadata=metadata, dag=dag, title="Log by attempts",
+            task_id=task_id, execution_date=execution_date, form=form,
+            max_bytes=max_bytes,
+            running=ti is not None and ti.state == State.RUNNING)
+
+    @staticmethod
+    def _log_handler():
+        logger = logging.getLogger('airflow.task')
+        task_log_reader = conf.get('core', 'task_log_reader')
+        return next((handler for handler in logger.handlers
+                     if handler.name == task_log_reader), None)
+
+    def _log_ti(self, session):
+        dag_id = request.args.get('dag_id')
+        task_id = request.args.get('task_id')
+        dttm = dateutil.parser.parse(request.args.get('execution_date'))
+        dag = dagbag.get_dag(dag_id)
+        if not dag or task_id not in dag.task_ids:
+            abort(404)
+        ti = session.query(models.TaskInstance).filter(
+            models.TaskInstance.dag_id == dag_id,
+            models.TaskInstance.task_id == task_id,
+            models.TaskInstance.execution_date == dttm).first()
+        if ti is None:
+            abort(404)
+        ti.task = dag.get_task(task_id)
+        return ti
+
+    @expose('/log_range')
+    @login_required
+    @wwwutils.action_logging
+    @provide_session
+    def log_range(self, session=None):
+        """
+        Part of the log of a try from a byte offset, at most
+        [webserver] log_fetch_chunk_bytes bytes of it, with the offset to
+        read from next. Polled by the log page to follow running tasks.
+        """
+        ti = self._log_ti(session)
+        try_number = request.args.get('try_number', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        # the log page following a running task already shows the header
+        follow = request.args.get('follow') == '1'
+        handler = self._log_handler()
+        if not hasattr(handler, 'read_range'):
+            abort(400)
+        log, metadata = handler.read_range(
+            ti, try_number, offset=offset,
+            max_bytes=conf.getint('webserver', 'log_fetch_chunk_bytes'),
+            follow=follow)
+        metadata['log'] = log
+        metadata['state'] = ti.state
+        return wwwutils.json_response(metadata)
+
+    @expose('/log_stream')
+    @login_required
+    @wwwutils.action_logging
+    @provide_session
+    def log_stream(self, session=None):
+        """
+        The whole log of a try as plain text, streamed in chunks of
+        [webserver] log_fetch_chunk_bytes bytes instead of being held in
+        memory.
+        """
+        ti = self._log_ti(session)
+        try_number = request.args.get('try_number', type=int)
+        handler = self._log_handler()
+        if not hasattr(handler, 'read_range'):
+            abort(400)
+        # the request's session is closed once the view returns
+        session.expunge(ti)
+        chunk_bytes = conf.getint('webserver', 'log_fetch_chunk_bytes')
+
+        def generate():
+            offset = 0
+            while True:
+                log, metadata = handler.read_range(
+                    ti, try_number, offset=offset, max_bytes=chunk_bytes)
+                yield log
+                if metadata['end_of_log'] or metadata['offset'] == offset:
+                    break
+                offset = metadata['offset']
+
+        return Response(stream_with_context(generate()),
+                        mimetype='text/plain')
 
     @expose('/task')
     @login_required
@@ -986,7 +1112,7 @@ class Airflow(BaseView):
         past = request.args.get('past') == "true"
         recursive = request.args.get('recursive') == "true"
 
-        dag = dag.sub_dag(
+        dag = dag.sub_dag_view(
             task_regex=r"^{0}$".format(task_id),
             include_downstream=downstream,
             include_upstream=upstream)
@@ -1028,10 +1154,15 @@ class Airflow(BaseView):
                 .all()
         )
         payload = []
+        # called on every load of the DAG list, so DAGs are not parsed for
+        # it: the ones not loaded, with lazy_load_dags, get the default
+        default_max_active_runs = conf.getint('core', 'max_active_runs_per_dag')
         for dag_id, active_dag_runs in dags:
-            max_active_runs = 0
-            if dag_id in dagbag.dags:
-                max_active_runs = dagbag.dags[dag_id].max_active_runs
+            dag = dagbag.dags.get(dag_id)
+            if dag:
+                max_active_runs = dag.max_active_runs
+            else:
+                max_active_runs = default_max_active_runs
             payload.append({
                 'dag_id': dag_id,
                 'active_dag_run': active_dag_runs,
@@ -1141,7 +1272,7 @@ class Airflow(BaseView):
         dag = dagbag.get_dag(dag_id)
         root = request.args.get('root')
         if root:
-            dag = dag.sub_dag(
+            dag = dag.sub_dag_view(
                 task_regex=root,
                 include_downstream=False,
                 include_upstream=True)
@@ -1193,8 +1324,10 @@ class Airflow(BaseView):
             visited.add(task)
             node_count[0] += 1
 
+            upstream_list = dag.graph.get_direct_relatives(
+                task.task_id, upstream=True)
             children = [
-                recurse_nodes(t, visited) for t in task.upstream_list
+                recurse_nodes(t, visited) for t in upstream_list
                 if node_count[0] < node_limit or t not in visited]
 
             # D3 tree uses children vs _children to define what is
@@ -1222,7 +1355,7 @@ class Airflow(BaseView):
                     }
                     for d in dates],
                 children_key: children,
-                'num_dep': len(task.upstream_list),
+                'num_dep': len(upstream_list),
                 'operator': task.task_type,
                 'retries': task.retries,
                 'owner': task.owner,
@@ -1270,7 +1403,7 @@ class Airflow(BaseView):
 
         root = request.args.get('root')
         if root:
-            dag = dag.sub_dag(
+            dag = dag.sub_dag_view(
                 task_regex=root,
                 include_upstream=True,
                 include_downstream=False)
@@ -1290,7 +1423,7 @@ class Airflow(BaseView):
             })
 
         def get_upstream(task):
-            for t in task.upstream_list:
+            for t in dag.graph.get_direct_relatives(task.task_id, upstream=True):
                 edge = {
                     'u': t.task_id,
                     'v': task.task_id,
@@ -1368,13 +1501,11 @@ class Airflow(BaseView):
             nodes=json.dumps(nodes, indent=2),
             edges=json.dumps(edges, indent=2), )
 
-    @expose('/duration')
-    @login_required
-    @wwwutils.action_logging
-    @provide_session
-    def duration(self, session=None):
-        dag_id = request.args.get('dag_id')
-        dag = dagbag.get_dag(dag_id)
+    def _chart_window(self, dag):
+        """
+        The DAG, restricted to the root tasks if any, and the window of
+        execution dates the duration, tries and landing times charts show.
+        """
         base_date = request.args.get('base_date')
         num_runs = request.args.get('num_runs')
         num_runs = int(num_runs) if num_runs else 5
@@ -1389,229 +1520,143 @@ class Airflow(BaseView):
 
         root = request.args.get('root')
         if root:
-            dag = dag.sub_dag(
+            dag = dag.sub_dag_view(
                 task_regex=root,
                 include_upstream=True,
                 include_downstream=False)
+        return dag, base_date, num_runs, min_date, root
 
-        chart_height = get_chart_height(dag)
-        chart = nvd3.lineChart(
-            name="lineChart", x_is_date=True, height=chart_height, width="1200")
-        cum_chart = nvd3.lineChart(
-            name="cumLineChart", x_is_date=True, height=chart_height, width="1200")
-
-        y = defaultdict(list)
-        x = defaultdict(list)
-        cum_y = defaultdict(list)
-
-        tis = dag.get_task_instances(
-            session, start_date=min_date, end_date=base_date)
-        TF = models.TaskFail
-        ti_fails = (
-            session
-                .query(TF)
-                .filter(
-                TF.dag_id == dag.dag_id,
-                TF.execution_date >= min_date,
-                TF.execution_date <= base_date,
-                TF.task_id.in_([t.task_id for t in dag.tasks]))
-                .all()
-        )
-
-        fails_totals = defaultdict(int)
-        for tf in ti_fails:
-            dict_key = (tf.dag_id, tf.task_id, tf.execution_date)
-            fails_totals[dict_key] += tf.duration
-
-        for ti in tis:
-            if ti.duration:
-                dttm = wwwutils.epoch(ti.execution_date)
-                x[ti.task_id].append(dttm)
-                y[ti.task_id].append(float(ti.duration))
-                fails_dict_key = (ti.dag_id, ti.task_id, ti.execution_date)
-                fails_total = fails_totals[fails_dict_key]
-                cum_y[ti.task_id].append(float(ti.duration + fails_total))
-
-        # determine the most relevant time unit for the set of task instance
-        # durations for the DAG
-        y_unit = infer_time_unit([d for t in y.values() for d in t])
-        cum_y_unit = infer_time_unit([d for t in cum_y.values() for d in t])
-        # update the y Axis on both charts to have the correct time units
-        chart.create_y_axis('yAxis', format='.02f', custom_format=False,
-                            label='Duration ({})'.format(y_unit))
-        chart.axislist['yAxis']['axisLabelDistance'] = '40'
-        cum_chart.create_y_axis('yAxis', format='.02f', custom_format=False,
-                                label='Duration ({})'.format(cum_y_unit))
-        cum_chart.axislist['yAxis']['axisLabelDistance'] = '40'
-        for task in dag.tasks:
-            if x[task.task_id]:
-                chart.add_serie(name=task.task_id, x=x[task.task_id],
-                                y=scale_time_units(y[task.task_id], y_unit))
-                cum_chart.add_serie(name=task.task_id, x=x[task.task_id],
-                                    y=scale_time_units(cum_y[task.task_id],
-                                                       cum_y_unit))
-
-        dates = sorted(list({ti.execution_date for ti in tis}))
-        max_date = max([ti.execution_date for ti in tis]) if dates else None
+    def _task_stats_chart(self, template, kinds, session):
+        """
+        Renders a chart page, the client fetches the series of each kind
+        from task_stats_series.
+        """
+        dag_id = request.args.get('dag_id')
+        dag, base_date, num_runs, min_date, root = self._chart_window(
+            dagbag.get_dag(dag_id))
 
-        session.commit()
+        TIS = models.TaskInstanceStat
+        max_date = session.query(sqla.func.max(TIS.execution_date)).filter(
+            TIS.dag_id == dag.dag_id,
+            TIS.execution_date >= min_date,
+            TIS.execution_date <= base_date).scalar()
 
         form = DateTimeWithNumRunsForm(data={'base_date': max_date,
                                              'num_runs': num_runs})
-        chart.buildcontent()
-        cum_chart.buildcontent()
-        s_index = cum_chart.htmlcontent.rfind('});')
-        cum_chart.htmlcontent = (cum_chart.htmlcontent[:s_index] +
-                                 "$(function() {$( document ).trigger('chartload') })" +
-                                 cum_chart.htmlcontent[s_index:])
+        series_urls = {
+            kind: url_for('airflow.task_stats_series', kind=kind,
+                          dag_id=dag_id, base_date=base_date.isoformat(),
+                          num_runs=num_runs, root=root or '')
+            for kind in kinds}
 
         return self.render(
-            'airflow/duration_chart.html',
+            template,
             dag=dag,
             demo_mode=conf.getboolean('webserver', 'demo_mode'),
             root=root,
             form=form,
-            chart=chart.htmlcontent,
-            cum_chart=cum_chart.htmlcontent
+            chart_height=get_chart_height(dag),
+            series_urls=series_urls,
         )
 
+    @expose('/duration')
+    @login_required
+    @wwwutils.action_logging
+    @provide_session
+    def duration(self, session=None):
+        return self._task_stats_chart(
+            'airflow/duration_chart.html', ['duration', 'cum_duration'],
+            session)
+
     @expose('/tries')
     @login_required
     @wwwutils.action_logging
     @provide_session
     def tries(self, session=None):
-        dag_id = request.args.get('dag_id')
-        dag = dagbag.get_dag(dag_id)
-        base_date = request.args.get('base_date')
-        num_runs = request.args.get('num_runs')
-        num_runs = int(num_runs) if num_runs else 5
-
-        if base_date:
-            base_date = dateutil.parser.parse(base_date)
-        else:
-            base_date = dag.latest_execution_date or datetime.utcnow()
-
-        dates = dag.date_range(base_date, num=-abs(num_runs))
-        min_date = dates[0] if dates else datetime(2000, 1, 1)
-
-        root = request.args.get('root')
-        if root:
-            dag = dag.sub_dag(
-                task_regex=root,
-                include_upstream=True,
-                include_downstream=False)
-
-        chart_height = get_chart_height(dag)
-        chart = nvd3.lineChart(
-            name="lineChart", x_is_date=True, y_axis_format='d', height=chart_height,
-            width="1200")
-
-        for task in dag.tasks:
-            y = []
-            x = []
-            for ti in task.get_task_instances(session, start_date=min_date,
-                                              end_date=base_date):
-                dttm = wwwutils.epoch(ti.execution_date)
-                x.append(dttm)
-                y.append(ti.try_number)
-            if x:
-                chart.add_serie(name=task.task_id, x=x, y=y)
-
-        tis = dag.get_task_instances(
-            session, start_date=min_date, end_date=base_date)
-        tries = sorted(list({ti.try_number for ti in tis}))
-        max_date = max([ti.execution_date for ti in tis]) if tries else None
-
-        session.commit()
-
-        form = DateTimeWithNumRunsForm(data={'base_date': max_date,
-                                             'num_runs': num_runs})
-
-        chart.buildcontent()
-
-        return self.render(
-            'airflow/chart.html',
-            dag=dag,
-            demo_mode=conf.getboolean('webserver', 'demo_mode'),
-            root=root,
-            form=form,
-            chart=chart.htmlcontent
-        )
+        return self._task_stats_chart('airflow/chart.html', ['tries'], session)
 
     @expose('/landing_times')
     @login_required
     @wwwutils.action_logging
     @provide_session
     def landing_times(self, session=None):
-        dag_id = request.args.get('dag_id')
-        dag = dagbag.get_dag(dag_id)
-        base_date = request.args.get('base_date')
-        num_runs = request.args.get('num_runs')
-        num_runs = int(num_runs) if num_runs else 5
+        return self._task_stats_chart(
+            'airflow/chart.html', ['landing_times'], session)
 
-        if base_date:
-            base_date = dateutil.parser.parse(base_date)
+    @expose('/task_stats_series')
+    @login_required
+    @provide_session
+    def task_stats_series(self, session=None):
+        """
+        Series of the duration, tries and landing times charts, one per task,
+        read from the task instance rollups and downsampled to at most
+        [webserver] chart_max_points points.
+        """
+        dag_id = request.args.get('dag_id')
+        kind = request.args.get('kind')
+        TIS = models.TaskInstanceStat
+        columns = {
+            'duration': (TIS.duration, 'Duration'),
+            'cum_duration': (TIS.duration + TIS.fail_duration, 'Duration'),
+            'tries': (TIS.tries, 'Tries'),
+            'landing_times': (TIS.landing_time, 'Landing Time'),
+        }
+        if kind not in columns:
+            abort(400)
+        column, label = columns[kind]
+        dag, base_date, num_runs, min_date, root = self._chart_window(
+            dagbag.get_dag(dag_id))
+
+        qry = session.query(
+            TIS.task_id, TIS.execution_date, column, TIS.end_date).filter(
+            TIS.dag_id == dag.dag_id,
+            TIS.execution_date >= min_date,
+            TIS.execution_date <= base_date)
+        if kind == 'landing_times':
+            # the rollups written before the DAG was known, by the migration
+            # or the sensor service, only have the end date
+            qry = qry.filter(or_(column.isnot(None), TIS.end_date.isnot(None)))
         else:
-            base_date = dag.latest_execution_date or datetime.utcnow()
-
-        dates = dag.date_range(base_date, num=-abs(num_runs))
-        min_date = dates[0] if dates else datetime(2000, 1, 1)
-
-        root = request.args.get('root')
-        if root:
-            dag = dag.sub_dag(
-                task_regex=root,
-                include_upstream=True,
-                include_downstream=False)
+            qry = qry.filter(column.isnot(None))
+        if kind in ('duration', 'cum_duration'):
+            qry = qry.filter(TIS.duration > 0)
 
-        chart_height = get_chart_height(dag)
-        chart = nvd3.lineChart(
-            name="lineChart", x_is_date=True, height=chart_height, width="1200")
-        y = {}
-        x = {}
-        for task in dag.tasks:
-            y[task.task_id] = []
-            x[task.task_id] = []
-            for ti in task.get_task_instances(session, start_date=min_date,
-                                              end_date=base_date):
-                ts = ti.execution_date
-                if dag.schedule_interval and dag.following_schedule(ts):
-                    ts = dag.following_schedule(ts)
-                if ti.end_date:
-                    dttm = wwwutils.epoch(ti.execution_date)
-                    secs = (ti.end_date - ts).total_seconds()
-                    x[ti.task_id].append(dttm)
-                    y[ti.task_id].append(secs)
-
-        # determine the most relevant time unit for the set of landing times
-        # for the DAG
-        y_unit = infer_time_unit([d for t in y.values() for d in t])
-        # update the y Axis to have the correct time units
-        chart.create_y_axis('yAxis', format='.02f', custom_format=False,
-                            label='Landing Time ({})'.format(y_unit))
-        chart.axislist['yAxis']['axisLabelDistance'] = '40'
+        x = defaultdict(list)
+        y = defaultdict(list)
+        for task_id, execution_date, value, end_date in qry.order_by(
+                TIS.execution_date):
+            if value is None:
+                period_end = execution_date
+                if dag.schedule_interval and \
+                        dag.following_schedule(period_end):
+                    period_end = dag.following_schedule(period_end)
+                value = (end_date - period_end).total_seconds()
+            # epoch returns a 1-tuple
+            x[task_id].append(wwwutils.epoch(execution_date)[0])
+            y[task_id].append(float(value))
+
+        unit = None
+        if kind != 'tries':
+            # determine the most relevant time unit for the set of values
+            unit = infer_time_unit([v for values in y.values() for v in values])
+            label = '{} ({})'.format(label, unit)
+        max_points = conf.getint('webserver', 'chart_max_points')
+        series = []
         for task in dag.tasks:
             if x[task.task_id]:
-                chart.add_serie(name=task.task_id, x=x[task.task_id],
-                                y=scale_time_units(y[task.task_id], y_unit))
-
-        tis = dag.get_task_instances(
-            session, start_date=min_date, end_date=base_date)
-        dates = sorted(list({ti.execution_date for ti in tis}))
-        max_date = max([ti.execution_date for ti in tis]) if dates else None
-
-        form = DateTimeWithNumRunsForm(data={'base_date': max_date,
-                                             'num_runs': num_runs})
-        chart.buildcontent()
-        return self.render(
-            'airflow/chart.html',
-            dag=dag,
-            chart=chart.htmlcontent,
-            height=str(chart_height + 100) + "px",
-            demo_mode=conf.getboolean('webserver', 'demo_mode'),
-            root=root,
-            form=form,
-        )
+                values = y[task.task_id]
+                if unit:
+                    values = scale_time_units(values, unit)
+                series.append({
+                    'key': task.task_id,
+                    'values': downsample(x[task.task_id], values, max_points),
+                })
+
+        return wwwutils.json_response({
+            'label': label,
+            'unit': unit,
+            'series': series,
+        })
 
     @expose('/paused', methods=['POST'])
     @login_required
@@ -1670,7 +1715,7 @@ class Airflow(BaseView):
 
         root = request.args.get('root')
         if root:
-            dag = dag.sub_dag(
+            dag = dag.sub_dag_view(
                 task_regex=root,
                 include_upstream=True,
                 include_downstream=False)
@@ -1848,14 +1893,19 @@ class HomeView(AdminIndexView):
                 "Broken DAG: [{ie.filename}] {ie.stacktrace}".format(ie=ie),
                 "error")
 
+        # a lazy DagBag only parses the DAGs of the page, which are listed
+        # from the database
+        lazy = isinstance(dagbag, models.LazyDagBag)
+        all_webserver_dags = [] if lazy else dagbag.dags.values()
+
         # get a list of all non-subdag dags visible to everyone
         # optionally filter out "paused" dags
         if hide_paused:
-            unfiltered_webserver_dags = [dag for dag in dagbag.dags.values() if
+            unfiltered_webserver_dags = [dag for dag in all_webserver_dags if
                                          not dag.parent_dag and not dag.is_paused]
 
         else:
-            unfiltered_webserver_dags = [dag for dag in dagbag.dags.values() if
+            unfiltered_webserver_dags = [dag for dag in all_webserver_dags if
                                          not dag.parent_dag]
 
         # optionally filter to get only dags that the user should see
@@ -1906,6 +1956,12 @@ class HomeView(AdminIndexView):
         page_dag_ids = sorted_dag_ids[start:end]
         num_of_pages = int(math.ceil(num_of_all_dags / float(dags_per_page)))
 
+        if lazy:
+            for dag_id in page_dag_ids:
+                dag = dagbag.get_dag(dag_id)
+                if dag:
+                    webserver_dags_filtered[dag_id] = dag
+
         auto_complete_data = set()
         for dag in webserver_dags_filtered.values():
             auto_complete_data.add(dag.dag_id)
@@ -2007,6 +2063,173 @@ class AirflowModelView(ModelView):
     page_size = PAGE_SIZE
 
 
+class IndexFriendlyFilterConverter(sqla_filters.FilterConverter):
+    """
+    Only offers filters that are equalities, lists or ranges, which the
+    database can answer from an index, rather than ``LIKE '%...%'`` and
+    negations that need to look at every row.
+    """
+    strings = (sqla_filters.FilterEqual, sqla_filters.FilterInList,
+               sqla_filters.FilterEmpty)
+    int_filters = (sqla_filters.IntEqualFilter, sqla_filters.IntGreaterFilter,
+                   sqla_filters.IntSmallerFilter, sqla_filters.IntInListFilter)
+    datetime_filters = (sqla_filters.DateTimeEqualFilter,
+                        sqla_filters.DateTimeGreaterFilter,
+                        sqla_filters.DateTimeSmallerFilter,
+                        sqla_filters.DateTimeBetweenFilter)
+
+
+class KeysetPaginationMixin(object):
+    """
+    Lists large tables without counting their rows and without offsets.
+
+    Rows are ordered by ``keyset_columns``, newest first, and the next page
+    is read after the key of the last row shown (the ``after`` argument),
+    from an index on these columns. Filtered lists and lists sorted by
+    another column only look at [webserver] list_max_scan_rows rows, the
+    next page of a filtered list starts after them. The number of rows is
+    estimated from the statistics of the database.
+    """
+    # unique non nullable columns, leading an index in this order
+    keyset_columns = ('id',)
+    simple_list_pager = True
+    filter_converter = IndexFriendlyFilterConverter()
+
+    def _keyset(self):
+        return [getattr(self.model, name) for name in self.keyset_columns]
+
+    def keyset_active(self):
+        return not request.args.get('sort')
+
+    def _filtered(self):
+        return bool(request.args.get('search')) or any(
+            arg.startswith('flt') for arg in request.args)
+
+    def _encode_key(self, row):
+        return iterencode(
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in row)
+
+    def _decode_key(self, key):
+        values = []
+        for column, value in zip(self._keyset(), iterdecode(key)):
+            if isinstance(column.type, sqla.DateTime):
+                value = dateutil.parser.parse(value)
+            elif isinstance(column.type, sqla.Integer):
+                value = int(value)
+            values.append(value)
+        return values
+
+    def _less(self, key):
+        columns = self._keyset()
+        return or_(*[
+            and_(*([c == v for c, v in zip(columns[:i], key[:i])] +
+                   [column < key[i]]))
+            for i, column in enumerate(columns)])
+
+    def _before(self, key):
+        """
+        Rows coming after ``key`` in descending key order, written out as
+        ``c1 <= v1 AND (c1 < v1 OR (c1 = v1 AND c2 < v2) ...)`` so that the
+        first column bounds an index range scan on every database.
+        """
+        return and_(self._keyset()[0] <= key[0], self._less(key))
+
+    def _not_before(self, key):
+        return and_(self._keyset()[0] >= key[0], ~self._less(key))
+
+    def _scan_bound(self, key):
+        """
+        Key of the last of the list_max_scan_rows rows after ``key``, None if
+        there are fewer rows than that. Read from the index alone.
+        """
+        query = self.session.query(*self._keyset())
+        if key is not None:
+            query = query.filter(self._before(key))
+        return query.order_by(*[desc(c) for c in self._keyset()]) \
+            .offset(conf.getint('webserver', 'list_max_scan_rows') - 1) \
+            .limit(1).first()
+
+    def get_list(self, page, sort_column, sort_desc, search, filters,
+                 execute=True, page_size=None):
+        # prefix matches, ^ and = are the only LIKE patterns an index helps
+        if search:
+            search = ' '.join(term if term.startswith(('^', '=')) else '^' + term
+                              for term in search.split(' ') if term)
+        return super(KeysetPaginationMixin, self).get_list(
+            page, sort_column, sort_desc, search, filters,
+            execute=execute, page_size=page_size)
+
+    def _apply_sorting(self, query, joins, sort_column, sort_desc):
+        if sort_column is None and self.keyset_active():
+            return query.order_by(*[desc(c) for c in self._keyset()]), joins
+        return super(KeysetPaginationMixin, self)._apply_sorting(
+            query, joins, sort_column, sort_desc)
+
+    def _apply_pagination(self, query, page, page_size):
+        if page_size is None:
+            page_size = self.page_size
+        g.keyset_scan_bound = None
+
+        if not self.keyset_active():
+            # sorts the newest list_max_scan_rows rows only
+            bound = self._scan_bound(None)
+            if bound is not None:
+                query = query.filter(self._not_before(bound))
+            return super(KeysetPaginationMixin, self)._apply_pagination(
+                query, page, page_size)
+
+        key = None
+        if request.args.get('after'):
+            key = self._decode_key(request.args.get('after'))
+            query = query.filter(self._before(key))
+        if self._filtered():
+            # without filters the limit bounds the scan already
+            bound = self._scan_bound(key)
+            if bound is not None:
+                query = query.filter(self._not_before(bound))
+                g.keyset_scan_bound = bound
+        return query.limit(page_size)
+
+    def keyset_next_url(self, data):
+        """
+        URL of the page after ``data``, None if it is the last one.
+        """
+        if len(data) == self.page_size:
+            key = [getattr(data[-1], name) for name in self.keyset_columns]
+        elif g.get('keyset_scan_bound') is not None:
+            key = g.keyset_scan_bound
+        else:
+            return None
+        args = request.args.to_dict()
+        args['after'] = self._encode_key(key)
+        args['page'] = request.args.get('page', 0, type=int) + 1
+        return self.get_url('.index_view', **args)
+
+    def keyset_first_url(self):
+        args = request.args.to_dict()
+        args.pop('after', None)
+        args.pop('page', None)
+        return self.get_url('.index_view', **args)
+
+    def estimated_count(self):
+        """
+        Number of rows of the table according to the statistics of the
+        database, None if it does not keep any.
+        """
+        table = self.model.__table__.name
+        dialect = settings.engine.dialect.name
+        if dialect == 'postgresql':
+            sql = 'SELECT reltuples FROM pg_class WHERE relname = :table'
+        elif dialect == 'mysql':
+            sql = ('SELECT table_rows FROM information_schema.tables '
+                   'WHERE table_schema = DATABASE() AND table_name = :table')
+        else:
+            return None
+        count = self.session.execute(sql, {'table': table}).scalar()
+        return int(count) if count is not None else None
+
+
 class ModelViewOnly(wwwutils.LoginMixin, AirflowModelView):
     """
     Modifying the base ModelView class for non edit, browse only operations
@@ -2322,7 +2545,7 @@ class VariableView(wwwutils.DataProfilingMixin, AirflowModelView):
             form.val.data = '*' * 8
 
 
-class XComView(wwwutils.SuperUserMixin, AirflowModelView):
+class XComView(wwwutils.SuperUserMixin, KeysetPaginationMixin, AirflowModelView):
     verbose_name = "XCom"
     verbose_name_plural = "XComs"
 
@@ -2342,7 +2565,7 @@ class XComView(wwwutils.SuperUserMixin, AirflowModelView):
     column_searchable_list = ('key', 'timestamp', 'execution_date', 'task_id', 'dag_id')
 
 
-class JobModelView(ModelViewOnly):
+class JobModelView(KeysetPaginationMixin, ModelViewOnly):
     verbose_name_plural = "jobs"
     verbose_name = "job"
     column_display_actions = False
@@ -2358,13 +2581,14 @@ class JobModelView(ModelViewOnly):
         latest_heartbeat=datetime_f)
 
 
-class DagRunModelView(ModelViewOnly):
+class DagRunModelView(KeysetPaginationMixin, ModelViewOnly):
     verbose_name_plural = "DAG Runs"
     can_edit = True
     can_create = True
     column_editable_list = ('state',)
     verbose_name = "dag run"
     column_default_sort = ('execution_date', True)
+    keyset_columns = ('execution_date', 'id')
     form_choices = {
         'state': [
             ('success', 'success'),
@@ -2448,7 +2672,7 @@ class DagRunModelView(ModelViewOnly):
             flash('Failed to set state', 'error')
 
 
-class LogModelView(ModelViewOnly):
+class LogModelView(KeysetPaginationMixin, ModelViewOnly):
     verbose_name_plural = "logs"
     verbose_name = "log"
     column_display_actions = False
@@ -2458,7 +2682,7 @@ class LogModelView(ModelViewOnly):
         dttm=datetime_f, execution_date=datetime_f, dag_id=dag_link)
 
 
-class TaskInstanceModelView(ModelViewOnly):
+class TaskInstanceModelView(KeysetPaginationMixin, ModelViewOnly):
     verbose_name_plural = "task instances"
     verbose_name = "task instance"
     column_filters = (
@@ -2476,7 +2700,8 @@ class TaskInstanceModelView(ModelViewOnly):
         queued_dttm=datetime_f,
         dag_id=dag_link, duration=duration_f)
     column_searchable_list = ('dag_id', 'task_id', 'state')
-    column_default_sort = ('job_id', True)
+    column_default_sort = ('execution_date', True)
+    keyset_columns = ('execution_date', 'dag_id', 'task_id')
     form_choices = {
         'state': [
             ('success', 'success'),
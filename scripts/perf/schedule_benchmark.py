@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares walking a DAG schedule with a new croniter per step, the way
+``DAG.following_schedule`` used to, and with the shared ``CronSchedule``
+cache, the way ``manage_slas`` and ``get_run_dates`` walk it.
+
+To Run:
+    $ python scripts/perf/schedule_benchmark.py [steps] [repeat]
+"""
+from __future__ import print_function
+
+from datetime import datetime, timedelta
+import sys
+import timeit
+
+from croniter import croniter
+
+from airflow.utils.dates import CronSchedule
+
+STEPS = 10000
+REPEAT = 5
+EXPRESSIONS = ('* * * * *', '*/5 * * * *', '0 * * * *', '0 0 * * *')
+START = datetime(2017, 1, 1)
+
+
+def walk_croniter(expression, steps):
+    dttm = START
+    for _ in range(steps):
+        dttm = croniter(expression, dttm).get_next(datetime)
+    return dttm
+
+
+def walk_schedule(expression, steps):
+    # a new CronSchedule per walk so the cache starts cold
+    schedule = CronSchedule(expression)
+    dttm = START
+    for _ in range(steps):
+        dttm = schedule.following(dttm)
+    return dttm
+
+
+def walk_timedelta(interval, steps):
+    dttm = START
+    for _ in range(steps):
+        dttm += interval
+    return dttm
+
+
+def main():
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else STEPS
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else REPEAT
+    print('{} following_schedule steps, best of {}'.format(steps, repeat))
+    print('{:<16} {:>14} {:>14} {:>8}'.format(
+        'schedule', 'croniter', 'CronSchedule', 'speedup'))
+
+    for expression in EXPRESSIONS:
+        assert (walk_croniter(expression, 100) ==
+                walk_schedule(expression, 100)), expression
+        baseline = min(timeit.repeat(
+            lambda: walk_croniter(expression, steps), number=1, repeat=repeat))
+        cached = min(timeit.repeat(
+            lambda: walk_schedule(expression, steps), number=1, repeat=repeat))
+        print('{:<16} {:>11.1f} ms {:>11.1f} ms {:>7.1f}x'.format(
+            expression, baseline * 1000, cached * 1000, baseline / cached))
+
+    interval = timedelta(minutes=5)
+    arithmetic = min(timeit.repeat(
+        lambda: walk_timedelta(interval, steps), number=1, repeat=repeat))
+    print('{:<16} {:>14} {:>11.1f} ms'.format(
+        'timedelta(5m)', '', arithmetic * 1000))
+
+
+if __name__ == '__main__':
+    main()
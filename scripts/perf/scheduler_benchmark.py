@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Synthetic-load benchmark of the scheduler throughput.
+
+Generates DAG files with a configurable number of tasks, fan-out and fan-in,
+runs a SchedulerJob over them with an executor that completes every task
+instantly, and reports:
+
+1. Scheduling latency - time between a task instance becoming runnable (its
+   DagRun started and all its upstream tasks finished) and being queued,
+   as percentiles.
+2. Task instances scheduled per second.
+3. Database queries per scheduler loop, from the main scheduler process.
+4. DAG files processed per second by the processor manager.
+
+Results are printed and written as JSON (--output) so runs of different
+scheduler changes can be compared. The metadata database is the one of
+airflow.cfg, or --conn, e.g. SQLite or a local Postgres.
+
+To Run:
+    $ python scripts/perf/scheduler_benchmark.py --num-dags 20 \\
+        --num-tasks 50 --fan-out 3 --fan-in 2 --output results.json
+"""
+from __future__ import print_function
+
+import argparse
+from datetime import datetime, timedelta
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from scheduler_query_profiler import (
+    QueryRecorder, make_instant_executor, percentile)
+
+DAG_ID_PREFIX = 'scheduler_benchmark_'
+
+DAG_FILE_TEMPLATE = '''\
+from datetime import datetime
+
+from airflow.models import DAG
+from airflow.operators.dummy_operator import DummyOperator
+
+dag = DAG(
+    {dag_id!r},
+    start_date=datetime({start_date.year}, {start_date.month}, {start_date.day}),
+    schedule_interval='@daily',
+    max_active_runs={max_active_runs},
+    concurrency={num_tasks},
+    default_args={{'owner': 'airflow'}})
+
+tasks = [DummyOperator(task_id='task_{{}}'.format(i), dag=dag)
+         for i in range({num_tasks})]
+for upstream, downstream in {edges!r}:
+    tasks[upstream].set_downstream(tasks[downstream])
+'''
+
+
+def generate_edges(num_tasks, fan_out, fan_in):
+    """
+    Lays the tasks out in levels, each level ``fan_out`` times wider than
+    the previous one, and makes every task depend on ``fan_in`` tasks of the
+    previous level.
+    """
+    levels = []
+    task = 0
+    width = 1
+    while task < num_tasks:
+        levels.append(list(range(task, min(task + width, num_tasks))))
+        task += width
+        width *= max(fan_out, 1)
+
+    edges = []
+    for previous, level in zip(levels, levels[1:]):
+        for i, downstream in enumerate(level):
+            for j in range(min(fan_in, len(previous))):
+                upstream = previous[(i // max(fan_out, 1) + j) % len(previous)]
+                edges.append((upstream, downstream))
+    return sorted(set(edges))
+
+
+def generate_dag_files(folder, num_dags, num_tasks, fan_out, fan_in, num_runs):
+    start_date = datetime.utcnow() - timedelta(days=num_runs)
+    edges = generate_edges(num_tasks, fan_out, fan_in)
+    dag_ids = []
+    for i in range(num_dags):
+        dag_id = '{}{}'.format(DAG_ID_PREFIX, i)
+        with open(os.path.join(folder, dag_id + '.py'), 'w') as f:
+            f.write(DAG_FILE_TEMPLATE.format(
+                dag_id=dag_id, start_date=start_date, max_active_runs=num_runs,
+                num_tasks=num_tasks, edges=edges))
+        dag_ids.append(dag_id)
+    return dag_ids, edges
+
+
+def reset_benchmark_dags(dag_ids):
+    from airflow import settings
+    from airflow.models import DagModel, DagRun, TaskInstance
+
+    session = settings.Session()
+    for model in (TaskInstance, DagRun):
+        session.query(model).filter(model.dag_id.in_(dag_ids)).delete(
+            synchronize_session=False)
+    session.query(DagModel).filter(DagModel.dag_id.in_(dag_ids)).update(
+        {DagModel.is_paused: False}, synchronize_session=False)
+    session.commit()
+
+
+def make_benchmark_job():
+    from airflow.jobs import SchedulerJob
+
+    class SchedulerBenchmarkJob(SchedulerJob):
+        """
+        SchedulerJob counting its scheduling loops, which all end by
+        processing the executor events.
+        """
+        __mapper_args__ = {
+            'polymorphic_identity': 'SchedulerBenchmarkJob'
+        }
+
+        loops = 0
+
+        def _process_executor_events(self, *args, **kwargs):
+            self.loops += 1
+            return super(SchedulerBenchmarkJob, self)._process_executor_events(
+                *args, **kwargs)
+
+    return SchedulerBenchmarkJob
+
+
+def scheduling_latencies(dag_ids, edges):
+    """
+    Seconds between each task instance becoming runnable and being queued.
+    """
+    from airflow import settings
+    from airflow.models import DagRun, TaskInstance
+
+    session = settings.Session()
+    run_starts = {
+        (dr.dag_id, dr.execution_date): dr.start_date
+        for dr in session.query(DagRun).filter(DagRun.dag_id.in_(dag_ids))}
+    tis = {
+        (ti.dag_id, ti.task_id, ti.execution_date): ti
+        for ti in session.query(TaskInstance).filter(
+            TaskInstance.dag_id.in_(dag_ids),
+            TaskInstance.queued_dttm.isnot(None))}
+    upstream = {}
+    for u, d in edges:
+        upstream.setdefault('task_{}'.format(d), []).append('task_{}'.format(u))
+
+    latencies = []
+    for (dag_id, task_id, execution_date), ti in tis.items():
+        ready = [run_starts.get((dag_id, execution_date))]
+        for upstream_id in upstream.get(task_id, []):
+            upstream_ti = tis.get((dag_id, upstream_id, execution_date))
+            ready.append(upstream_ti.end_date if upstream_ti else None)
+        ready = [r for r in ready if r]
+        if ready:
+            latencies.append(
+                max(0.0, (ti.queued_dttm - max(ready)).total_seconds()))
+    session.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Synthetic-load benchmark of the scheduler throughput.')
+    parser.add_argument('--conn', help='SQLAlchemy URL of the metadata DB')
+    parser.add_argument('--num-dags', type=int, default=10)
+    parser.add_argument('--num-tasks', type=int, default=20,
+                        help='tasks per DAG')
+    parser.add_argument('--fan-out', type=int, default=2,
+                        help='width growth factor between task levels')
+    parser.add_argument('--fan-in', type=int, default=1,
+                        help='upstream tasks of every non-root task')
+    parser.add_argument('--num-dag-runs', type=int, default=2,
+                        help='daily DagRuns to catch up on per DAG')
+    parser.add_argument('--num-runs', type=int, default=10,
+                        help='times the scheduler processes each file')
+    parser.add_argument('--max-threads', type=int,
+                        help='DAG file processors, ignored on SQLite')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    if args.conn:
+        # must happen before airflow is imported, settings read it at import
+        os.environ['AIRFLOW__CORE__SQL_ALCHEMY_CONN'] = args.conn
+    if args.max_threads:
+        os.environ['AIRFLOW__SCHEDULER__MAX_THREADS'] = str(args.max_threads)
+
+    from airflow import settings
+    from airflow.jobs import DagFileProcessor
+    from airflow.utils import db
+
+    db.initdb()
+    dag_folder = tempfile.mkdtemp(prefix='airflow_scheduler_benchmark_dags_')
+    query_dir = tempfile.mkdtemp(prefix='airflow_scheduler_benchmark_queries_')
+    try:
+        dag_ids, edges = generate_dag_files(
+            dag_folder, args.num_dags, args.num_tasks, args.fan_out,
+            args.fan_in, args.num_dag_runs)
+        reset_benchmark_dags(dag_ids)
+
+        recorder = QueryRecorder(query_dir)
+        job = make_benchmark_job()(
+            subdir=dag_folder, num_runs=args.num_runs,
+            file_process_interval=0, processor_poll_interval=0.1,
+            executor=make_instant_executor()())
+        processors_before = DagFileProcessor.class_creation_counter
+        start = time.time()
+        recorder.start()
+        try:
+            job.run()
+        finally:
+            recorder.stop()
+        wall_time = time.time() - start
+        files_processed = DagFileProcessor.class_creation_counter - processors_before
+
+        main_pid = os.getpid()
+        queries_total = queries_main = 0
+        for record in recorder.records():
+            queries_total += 1
+            if record['pid'] == main_pid:
+                queries_main += 1
+
+        latencies = scheduling_latencies(dag_ids, edges)
+        reset_benchmark_dags(dag_ids)
+    finally:
+        shutil.rmtree(dag_folder)
+        shutil.rmtree(query_dir)
+
+    results = {
+        'config': {
+            'dialect': settings.engine.dialect.name,
+            'num_dags': args.num_dags,
+            'num_tasks': args.num_tasks,
+            'num_edges': len(edges),
+            'fan_out': args.fan_out,
+            'fan_in': args.fan_in,
+            'num_dag_runs': args.num_dag_runs,
+            'num_runs': args.num_runs,
+            'max_threads': job.max_threads,
+        },
+        'wall_time_sec': wall_time,
+        'task_instances_scheduled': len(latencies),
+        'task_instances_per_sec': len(latencies) / wall_time,
+        'scheduling_latency_sec': {
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies) if latencies else 0.0,
+        },
+        'scheduler_loops': job.loops,
+        'queries_total': queries_total,
+        'queries_per_loop': queries_main / float(max(job.loops, 1)),
+        'files_processed': files_processed,
+        'files_per_sec': files_processed / wall_time,
+    }
+    json.dump(results, sys.stdout, indent=2, sort_keys=True)
+    print()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Captures the SQL emitted by a SchedulerJob (main loop and DAG file
+processors) running against a workload of DAG files, then reports per
+statement the call count, latency and the database's query plan. Plans that
+scan a whole table are flagged, which is how the composite indices of
+migration 464e8fe6a533 were picked.
+
+The metadata database is the one configured in airflow.cfg, or the one passed
+with --conn, so the same workload can be profiled on SQLite, MySQL and
+Postgres. Tasks are never executed: an executor marks them successful as
+soon as they are queued.
+
+To Run:
+    $ python scripts/perf/scheduler_query_profiler.py \\
+        --conn postgresql://airflow@localhost/airflow --num-runs 5
+"""
+from __future__ import print_function
+
+import argparse
+from collections import defaultdict
+import glob
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+
+SUBDIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dags')
+TOP_N = 25
+
+# plan fragments meaning a full table scan, per dialect
+FULL_SCAN_MARKERS = {
+    'sqlite': ('SCAN TABLE',),
+    'mysql': ("'ALL'",),
+    'postgresql': ('Seq Scan',),
+}
+EXPLAIN_PREFIX = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'mysql': 'EXPLAIN ',
+    'postgresql': 'EXPLAIN ',
+}
+CALLER_FILES = (os.path.join('airflow', 'jobs.py'),
+                os.path.join('airflow', 'models.py'))
+
+
+def _caller():
+    """
+    Name of the innermost airflow jobs/models function on the stack, used to
+    attribute a statement to e.g. _find_executable_task_instances.
+    """
+    frame = sys._getframe(2)
+    while frame is not None:
+        if frame.f_code.co_filename.endswith(CALLER_FILES):
+            return frame.f_code.co_name
+        frame = frame.f_back
+    return '?'
+
+
+class QueryRecorder(object):
+    """
+    Records every statement executed by any SQLAlchemy engine of this process
+    and of the processes forked from it (the DAG file processors create their
+    own engine) into one pickle file per process.
+
+    :param out_dir: directory receiving the query.<pid>.pickle files
+    :type out_dir: str
+    """
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self._files = {}
+
+    def _file(self):
+        pid = os.getpid()
+        if pid not in self._files:
+            self._files[pid] = open(
+                os.path.join(self.out_dir, 'query.{}.pickle'.format(pid)), 'ab')
+        return self._files[pid]
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters,
+                              context, executemany):
+        conn.info.setdefault('query_start_time', []).append(time.time())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters,
+                             context, executemany):
+        duration = time.time() - conn.info['query_start_time'].pop()
+        f = self._file()
+        pickle.dump({
+            'statement': statement,
+            'parameters': parameters,
+            'executemany': executemany,
+            'duration': duration,
+            'caller': _caller(),
+            'pid': os.getpid(),
+        }, f, pickle.HIGHEST_PROTOCOL)
+        f.flush()
+
+    def start(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        event.listen(Engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self.after_cursor_execute)
+
+    def stop(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        event.remove(Engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.remove(Engine, 'after_cursor_execute', self.after_cursor_execute)
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    def records(self):
+        for path in glob.glob(os.path.join(self.out_dir, 'query.*.pickle')):
+            with open(path, 'rb') as f:
+                while True:
+                    try:
+                        yield pickle.load(f)
+                    except EOFError:
+                        break
+
+
+def make_instant_executor():
+    """
+    Executor class that reports every queued task instance as successful
+    right away, and records that in the database like a worker would.
+    """
+    from datetime import datetime
+
+    from airflow import settings
+    from airflow.executors.base_executor import BaseExecutor
+    from airflow.models import TaskInstance
+    from airflow.utils.state import State
+
+    class InstantExecutor(BaseExecutor):
+
+        def execute_async(self, key, command, queue=None):
+            dag_id, task_id, execution_date = key
+            now = datetime.utcnow()
+            session = settings.Session()
+            TI = TaskInstance
+            session.query(TI).filter(
+                TI.dag_id == dag_id,
+                TI.task_id == task_id,
+                TI.execution_date == execution_date,
+            ).update({
+                TI.state: State.SUCCESS,
+                TI.start_date: now,
+                TI.end_date: now,
+                TI.duration: 0,
+            }, synchronize_session=False)
+            session.commit()
+            session.close()
+            self.success(key)
+
+        def sync(self):
+            pass
+
+        def end(self):
+            self.heartbeat()
+
+        def terminate(self):
+            pass
+
+    return InstantExecutor
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct / 100.0))]
+
+
+def summarize(records):
+    by_statement = defaultdict(list)
+    for record in records:
+        by_statement[record['statement']].append(record)
+
+    stats = []
+    for statement, group in by_statement.items():
+        durations = [r['duration'] * 1000 for r in group]
+        callers = sorted(set(r['caller'] for r in group))
+        stats.append({
+            'statement': statement,
+            'callers': callers,
+            'count': len(group),
+            'total_ms': sum(durations),
+            'mean_ms': sum(durations) / len(durations),
+            'p95_ms': percentile(durations, 95),
+            'max_ms': max(durations),
+            'sample': group[-1],
+        })
+    stats.sort(key=lambda s: s['total_ms'], reverse=True)
+    return stats
+
+
+def explain(engine, stat):
+    statement = stat['statement']
+    dialect = engine.dialect.name
+    if (dialect not in EXPLAIN_PREFIX or stat['sample']['executemany'] or
+            not statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE'))):
+        return None
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(EXPLAIN_PREFIX[dialect] + statement,
+                       stat['sample']['parameters'])
+        plan = [' | '.join(str(c) for c in row) for row in cursor.fetchall()]
+        connection.rollback()
+        return plan
+    except Exception as e:
+        return ['EXPLAIN failed: {}'.format(e)]
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--conn', help='SQLAlchemy URL of the metadata DB')
+    parser.add_argument('--subdir', default=SUBDIR,
+                        help='DAG files of the workload')
+    parser.add_argument('--num-runs', type=int, default=3,
+                        help='scheduling loops over the DAG files')
+    parser.add_argument('--top', type=int, default=TOP_N,
+                        help='number of statements to explain')
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    if args.conn:
+        # must happen before airflow is imported, settings read it at import
+        os.environ['AIRFLOW__CORE__SQL_ALCHEMY_CONN'] = args.conn
+
+    from airflow import settings
+    from airflow.jobs import SchedulerJob
+    from airflow.models import DagBag, DagModel
+    from airflow.utils import db
+
+    db.initdb()
+    session = settings.Session()
+    dag_ids = list(DagBag(args.subdir).dags.keys())
+    session.query(DagModel).filter(DagModel.dag_id.in_(dag_ids)).update(
+        {DagModel.is_paused: False}, synchronize_session=False)
+    session.commit()
+
+    out_dir = tempfile.mkdtemp(prefix='airflow_query_profile_')
+    recorder = QueryRecorder(out_dir)
+    recorder.start()
+    try:
+        job = SchedulerJob(subdir=args.subdir, num_runs=args.num_runs,
+                           executor=make_instant_executor()())
+        job.run()
+    finally:
+        recorder.stop()
+
+    stats = summarize(recorder.records())
+    shutil.rmtree(out_dir)
+    dialect = settings.engine.dialect.name
+    markers = FULL_SCAN_MARKERS.get(dialect, ())
+
+    print('{} distinct statements on {}, {} executions, {:.1f} ms total'.format(
+        len(stats), dialect, sum(s['count'] for s in stats),
+        sum(s['total_ms'] for s in stats)))
+    for stat in stats[:args.top]:
+        stat['plan'] = explain(settings.engine, stat)
+        stat['full_scan'] = any(
+            marker in line for line in stat['plan'] or [] for marker in markers)
+        print('=' * 79)
+        print('{callers} count={count} total={total_ms:.1f}ms mean={mean_ms:.2f}ms '
+              'p95={p95_ms:.2f}ms max={max_ms:.2f}ms'.format(
+                  callers=','.join(stat['callers']), **stat))
+        if stat['full_scan']:
+            print('!! full table scan')
+        print(' '.join(stat['statement'].split()))
+        for line in stat['plan'] or []:
+            print('    ' + line)
+
+    if args.json:
+        for stat in stats:
+            del stat['sample']
+        with open(args.json, 'w') as f:
+            json.dump({'dialect': dialect, 'statements': stats}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares the latency and memory cost of ``DAG.sub_dag`` (deep copy of the
+selected tasks) and ``DAG.sub_dag_view`` (shared tasks) on a large DAG, the
+way the webserver uses them for tree/graph requests carrying a ``root``.
+
+To Run:
+    $ python scripts/perf/sub_dag_benchmark.py [num_tasks] [repeat]
+"""
+from __future__ import print_function
+
+from datetime import datetime
+import gc
+import sys
+import timeit
+
+from airflow.models import DAG
+from airflow.operators.dummy_operator import DummyOperator
+
+try:
+    import tracemalloc
+except ImportError:  # python 2
+    tracemalloc = None
+
+NUM_TASKS = 5000
+REPEAT = 5
+FAN_OUT = 4
+
+
+def build_dag(num_tasks):
+    """
+    Builds a DAG shaped like a tree with FAN_OUT children per task, plus a
+    final join task downstream of all the leaves.
+    """
+    dag = DAG(
+        'sub_dag_benchmark',
+        start_date=datetime(2017, 1, 1),
+        default_args={'owner': 'airflow'})
+    tasks = [DummyOperator(task_id='task_{}'.format(i), dag=dag)
+             for i in range(num_tasks - 1)]
+    for i, task in enumerate(tasks[1:], 1):
+        tasks[(i - 1) // FAN_OUT].set_downstream(task)
+    join = DummyOperator(task_id='join', dag=dag)
+    join.set_upstream([t for t in tasks if not t.downstream_task_ids])
+    return dag
+
+
+def measure(label, fn, repeat):
+    gc.collect()
+    latency = min(timeit.repeat(fn, number=1, repeat=repeat))
+
+    peak = None
+    if tracemalloc:
+        tracemalloc.start()
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del result
+
+    print('{:<28} {:>10.1f} ms {:>14}'.format(
+        label, latency * 1000,
+        '{:.1f} MiB'.format(peak / 1024.0 / 1024) if peak is not None else 'n/a'))
+
+
+def main():
+    num_tasks = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_TASKS
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else REPEAT
+    dag = build_dag(num_tasks)
+    print('DAG with {} tasks'.format(len(dag.tasks)))
+    print('{:<28} {:>13} {:>14}'.format('', 'latency', 'peak memory'))
+
+    # the tree view roots on the join task and walks everything upstream
+    for label, regex in (('root=join', '^join$'), ('root=task_1', '^task_1$')):
+        measure('sub_dag ' + label, lambda: dag.sub_dag(
+            task_regex=regex, include_upstream=True), repeat)
+        measure('sub_dag_view ' + label, lambda: dag.sub_dag_view(
+            task_regex=regex, include_upstream=True), repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -142,6 +142,7 @@ hive = [
     'hive-thrift-py>=0.0.1',
     'pyhive>=0.1.3',
     'impyla>=0.13.3',
+    'pyarrow>=0.8.0',
     'unicodecsv>=0.14.1'
 ]
 jdbc = ['jaydebeapi>=1.1.1']
@@ -22,6 +22,7 @@ from airflow import AirflowException
 from airflow.api.client.local_client import Client
 from airflow import models
 from airflow import settings
+from airflow.operators.dummy_operator import DummyOperator
 from airflow.utils.state import State
 
 EXECDATE = datetime.datetime.now()
@@ -69,6 +70,8 @@ class TestLocalClient(unittest.TestCase):
 
     def tearDown(self):
         self.session.query(models.Pool).delete()
+        self.session.query(models.TaskInstance).filter(
+            models.TaskInstance.dag_id == 'test_task_instance_states').delete()
         self.session.commit()
         self.session.close()
         super(TestLocalClient, self).tearDown()
@@ -121,6 +124,41 @@ class TestLocalClient(unittest.TestCase):
                                          external_trigger=True)
             mock.reset_mock()
 
+    @patch.object(models.DAG, 'create_dagrun')
+    def test_trigger_dags(self, mock):
+        results = self.client.trigger_dags([
+            {'dag_id': 'test_start_date_scheduling', 'run_id': 'my_run_id'},
+            {'dag_id': 'blablabla'},
+        ])
+        self.assertEqual(1, mock.call_count)
+        self.assertEqual('test_start_date_scheduling', results[0]['dag_id'])
+        self.assertIn('message', results[0])
+        self.assertEqual('blablabla', results[1]['dag_id'])
+        self.assertIn('error', results[1])
+
+    def test_get_task_instance_states(self):
+        dag = models.DAG('test_task_instance_states',
+                         start_date=EXECDATE_NOFRACTIONS)
+        for i in range(3):
+            ti = models.TaskInstance(
+                DummyOperator(task_id='task_{}'.format(i), dag=dag),
+                EXECDATE_NOFRACTIONS)
+            ti.state = State.SUCCESS if i else None
+            self.session.merge(ti)
+        self.session.commit()
+
+        tis, cursor = self.client.get_task_instance_states(
+            dag_id=dag.dag_id, limit=2)
+        self.assertEqual(['task_0', 'task_1'], [ti['task_id'] for ti in tis])
+        tis, cursor = self.client.get_task_instance_states(
+            dag_id=dag.dag_id, limit=2, cursor=cursor)
+        self.assertEqual(['task_2'], [ti['task_id'] for ti in tis])
+        self.assertIsNone(cursor)
+
+        tis, cursor = self.client.get_task_instance_states(
+            dag_id=dag.dag_id, states=[None])
+        self.assertEqual(['task_0'], [ti['task_id'] for ti in tis])
+
     def test_get_pool(self):
         self.client.create_pool(name='foo', slots=1, description='')
         pool = self.client.get_pool(name='foo')
@@ -152,6 +152,25 @@ class TestMarkTasks(unittest.TestCase):
         self.verify_state(self.dag1, task_ids, [self.execution_dates[0]],
                           State.SUCCESS, snapshot)
 
+    def test_mark_downstream_in_batches(self):
+        snapshot = self.snapshot_state(self.dag1, self.execution_dates)
+        task = self.dag1.get_task("runme_1")
+        task_ids = [t.task_id for t in task.get_flat_relatives(upstream=False)]
+        task_ids.append(task.task_id)
+
+        steps = []
+        altered = set_state(task=task, execution_date=self.execution_dates[0],
+                            upstream=False, downstream=True, future=True,
+                            past=False, state=State.SUCCESS, commit=True,
+                            batch_size=1,
+                            progress_callback=lambda *step: steps.append(step))
+        self.assertEqual(len(altered), 6)
+        self.assertEqual(6, steps[0][1])
+        # one UPDATE per task and date
+        self.assertEqual([1] * 6, [count for _, count in steps[1:]])
+        self.verify_state(self.dag1, task_ids, self.execution_dates,
+                          State.SUCCESS, snapshot)
+
     def test_mark_upstream(self):
         # test upstream
         snapshot = self.snapshot_state(self.dag1, self.execution_dates)
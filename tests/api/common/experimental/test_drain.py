@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import unittest
+
+from airflow.api.common.experimental import drain as drain_api
+from airflow import models
+from airflow import settings
+from airflow.operators.dummy_operator import DummyOperator
+from airflow.utils.state import State, SchedulerStates
+
+DEFAULT_DATE = datetime.datetime(2016, 1, 1)
+DAG_ID = 'test_drain'
+
+
+class ResumableOperator(DummyOperator):
+    resumable_after_deploy = True
+
+
+class TestDrain(unittest.TestCase):
+
+    def setUp(self):
+        super(TestDrain, self).setUp()
+        self.session = settings.Session()
+        dag = models.DAG(DAG_ID, start_date=DEFAULT_DATE)
+        tasks = [DummyOperator(task_id='blocking', dag=dag),
+                 ResumableOperator(task_id='resumable', dag=dag)]
+        for task in tasks:
+            ti = models.TaskInstance(task, DEFAULT_DATE, state=State.RUNNING)
+            ti.operator = task.__class__.__name__
+            self.session.merge(ti)
+        self.session.commit()
+
+    def tearDown(self):
+        models.SchedulerState().set_state(SchedulerStates.RUNNING,
+                                          session=self.session)
+        models.SchedulerState().set_resumable_operators(set(),
+                                                        session=self.session)
+        self.session.query(models.TaskInstance).filter(
+            models.TaskInstance.dag_id == DAG_ID).delete()
+        self.session.commit()
+        self.session.close()
+        super(TestDrain, self).tearDown()
+
+    def test_drain(self):
+        status = drain_api.start_drain(session=self.session)
+        self.assertEqual(SchedulerStates.PAUSING, status['state'])
+        self.assertEqual(1, status['blocking'][DAG_ID])
+
+        status = drain_api.stop_drain(session=self.session)
+        self.assertEqual(SchedulerStates.RUNNING, status['state'])
+
+    def test_drain_status_recorded_operators(self):
+        # an operator class only imported by the scheduler
+        ti = models.TaskInstance(DummyOperator(task_id='remote'), DEFAULT_DATE,
+                                 state=State.RUNNING)
+        ti.dag_id = DAG_ID
+        ti.operator = 'RemoteResumableOperator'
+        self.session.merge(ti)
+        self.session.commit()
+        self.assertEqual(
+            2, drain_api.get_drain_status(session=self.session)['blocking'][DAG_ID])
+
+        models.SchedulerState().set_resumable_operators(
+            {'RemoteResumableOperator'}, session=self.session)
+        self.assertEqual(
+            {'RemoteResumableOperator'},
+            models.SchedulerState.get_resumable_operators(session=self.session))
+        self.assertEqual(
+            1, drain_api.get_drain_status(session=self.session)['blocking'][DAG_ID])
@@ -55,6 +55,7 @@ from airflow.hooks.base_hook import BaseHook
 from airflow.hooks.sqlite_hook import SqliteHook
 from airflow.bin import cli
 from airflow.www import app as application
+from airflow.www import utils as wwwutils
 from airflow.settings import Session
 from airflow.utils.state import State
 from airflow.utils.dates import infer_time_unit, round_time, scale_time_units
@@ -1697,6 +1698,52 @@ class WebUiTests(unittest.TestCase):
         response = self.app.get('/admin/airflow/pickle_info')
         self.assertIn('{', response.data.decode('utf-8'))
 
+    def test_task_stats_series(self):
+        session = Session()
+        TIS = models.TaskInstanceStat
+        session.query(TIS).filter(
+            TIS.dag_id == 'example_bash_operator').delete()
+        session.add(TIS(
+            dag_id='example_bash_operator', task_id='runme_0',
+            execution_date=DEFAULT_DATE, tries=1, landing_time=None,
+            end_date=DEFAULT_DATE + timedelta(days=1, hours=1)))
+        session.commit()
+        session.close()
+
+        # without landing_time, it is computed from end_date and the schedule
+        response = self.app.get(
+            '/admin/airflow/task_stats_series?kind=landing_times&'
+            'dag_id=example_bash_operator&base_date={}'.format(DEFAULT_DATE_ISO))
+        series = json.loads(response.data.decode('utf-8'))
+        self.assertEqual('minutes', series['unit'])
+        self.assertEqual(
+            [{'key': 'runme_0',
+              'values': [[wwwutils.epoch(DEFAULT_DATE)[0], 60.0]]}],
+            series['series'])
+
+        response = self.app.get(
+            '/admin/airflow/task_stats_series?kind=size&'
+            'dag_id=example_bash_operator')
+        self.assertEqual(400, response.status_code)
+
+    def test_blocked_and_pickle_info_unparsed_dags(self):
+        # a LazyDagBag only has the DAGs asked for so far, the others are
+        # not parsed for these views
+        lazy_dagbag = mock.Mock(dags={}, dag_ids=list(self.dagbag.dags))
+        lazy_dagbag.get_dag.side_effect = self.dagbag.dags.get
+        with mock.patch('airflow.www.views.dagbag', lazy_dagbag):
+            response = self.app.get('/admin/airflow/blocked')
+            blocked = {
+                row['dag_id']: row['max_active_runs']
+                for row in json.loads(response.data.decode('utf-8'))}
+            response = self.app.get('/admin/airflow/pickle_info')
+            pickle_info = json.loads(response.data.decode('utf-8'))
+        lazy_dagbag.get_dag.assert_not_called()
+        self.assertEqual(
+            configuration.getint('core', 'max_active_runs_per_dag'),
+            blocked['test_example_bash_operator'])
+        self.assertEqual({}, pickle_info)
+
     def test_dag_views(self):
         response = self.app.get(
             '/admin/airflow/graph?dag_id=example_bash_operator')
@@ -1718,6 +1765,10 @@ class WebUiTests(unittest.TestCase):
             '/admin/airflow/landing_times?'
             'days=30&dag_id=example_xcom')
         self.assertIn("example_xcom", response.data.decode('utf-8'))
+        response = self.app.get(
+            '/admin/airflow/task_stats_series?'
+            'kind=cum_duration&dag_id=example_bash_operator')
+        self.assertIn("series", json.loads(response.data.decode('utf-8')))
         response = self.app.get(
             '/admin/airflow/gantt?dag_id=example_bash_operator')
         self.assertIn("example_bash_operator", response.data.decode('utf-8'))
@@ -2322,7 +2373,7 @@ class HDFSHookTest(unittest.TestCase):
 
 
 try:
-    from airflow.hooks.http_hook import HttpHook
+    from airflow.hooks.http_hook import HttpHook, LocalHttpAdapter
 except ImportError:
     HttpHook = None
 
@@ -2369,6 +2420,34 @@ class HttpHookTest(unittest.TestCase):
         hook.get_conn({})
         self.assertEqual(hook.base_url, 'https://localhost')
 
+    @mock.patch('airflow.hooks.http_hook.HttpHook.get_connection')
+    def test_pooled_connections(self, mock_get_connection):
+        c = models.Connection(conn_id='http_default', conn_type='http',
+                              host='localhost', schema='http')
+        mock_get_connection.return_value = c
+        self.assertIs(HttpHook().get_conn({}).get_adapter('http://localhost'),
+                      HttpHook().get_conn({}).get_adapter('http://localhost'))
+
+    @mock.patch('airflow.hooks.http_hook.HttpHook.get_connection')
+    def test_run_many(self, mock_get_connection):
+        c = models.Connection(conn_id='http_local', conn_type='http',
+                              host='localhost', schema='http')
+        mock_get_connection.return_value = c
+        adapter = LocalHttpAdapter()
+        adapter.register('GET', 'http://localhost/a', text='A')
+        adapter.register('GET', 'http://localhost/b', text='B')
+        HttpHook.mount('http_local', adapter)
+        self.addCleanup(HttpHook.unmount, 'http_local')
+
+        hook = HttpHook(method='GET', http_conn_id='http_local')
+        responses = hook.run_many([{'endpoint': '/a'},
+                                   {'endpoint': '/b', 'data': {'q': 1}}])
+        self.assertEqual(['A', 'B'], [r.text for r in responses])
+        self.assertEqual(['http://localhost/a', 'http://localhost/b?q=1'],
+                         sorted(r.url for r in adapter.requests))
+        with self.assertRaises(AirflowException):
+            hook.run('/missing')
+
 
 send_email_test = mock.Mock()
 
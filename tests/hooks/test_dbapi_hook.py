@@ -13,7 +13,11 @@
 # limitations under the License.
 #
 
+import gzip
 import mock
+import os
+import shutil
+import tempfile
 import unittest
 
 from airflow.hooks.dbapi_hook import DbApiHook
@@ -73,3 +77,63 @@ class TestDbApiHook(unittest.TestCase):
         self.conn.close.assert_called_once()
         self.cur.close.assert_called_once()
         self.cur.execute.assert_called_once_with(statement)
+
+    def test_get_split_queries(self):
+        self.cur.fetchone.return_value = (1, 10)
+
+        queries = self.db_hook.get_split_queries("SELECT id FROM t", "id", 3)
+
+        self.cur.execute.assert_called_once_with(
+            "SELECT MIN(id), MAX(id) FROM (SELECT * FROM (SELECT id FROM t) "
+            "split_query WHERE 1 = 1) split_bounds")
+        self.assertEqual([
+            "SELECT * FROM (SELECT id FROM t) split_query "
+            "WHERE (id >= 1 AND id < 5 OR id IS NULL)",
+            "SELECT * FROM (SELECT id FROM t) split_query "
+            "WHERE id >= 5 AND id < 9",
+            "SELECT * FROM (SELECT id FROM t) split_query "
+            "WHERE id >= 9 AND id < 13",
+        ], queries)
+
+    def test_get_split_queries_conditions(self):
+        self.cur.fetchone.return_value = (None, None)
+
+        self.assertEqual(
+            ["SELECT id FROM t WHERE 1 = 1"],
+            self.db_hook.get_split_queries(
+                "SELECT id FROM t WHERE $CONDITIONS", "id", 3))
+
+    def test_dump_queries(self):
+        self.cur.__iter__.return_value = [(1, 'a'), (2, 'b')]
+        self.cur.description = (('id', 3), ('name', 253))
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            description = self.db_hook.dump_queries(
+                ["SQL1", "SQL2"], tmp_dir, delimiter='\t')
+
+            self.assertEqual(self.cur.description, description)
+            self.assertEqual(['part-00000.csv.gz', 'part-00001.csv.gz'],
+                             sorted(os.listdir(tmp_dir)))
+            with gzip.open(os.path.join(tmp_dir, 'part-00001.csv.gz')) as f:
+                self.assertEqual(b'1\ta\r\n2\tb\r\n', f.read())
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_dump_queries_write_rows(self):
+        self.cur.__iter__.return_value = [(1, 'a'), (2, 'b')]
+        self.cur.description = (('id', 3), ('name', 253))
+        written = {}
+
+        def write_rows(description, rows, filename):
+            written[os.path.basename(filename)] = (description, list(rows))
+
+        self.db_hook.dump_queries(
+            ["SQL1"], '/tmp', write_rows=write_rows, suffix='.parquet')
+
+        self.assertEqual(
+            {'part-00000.parquet': (self.cur.description, [(1, 'a'), (2, 'b')])},
+            written)
+
+    def test_dump_queries_none(self):
+        self.assertIsNone(self.db_hook.dump_queries([], '/tmp'))
+        self.assertFalse(self.conn.cursor.called)
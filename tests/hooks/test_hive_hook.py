@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import unittest
+from collections import OrderedDict
+
+import mock
+
+from airflow import configuration
+from airflow.utils.file import TemporaryDirectory
+
+try:
+    from airflow.hooks.hive_hooks import HiveCliHook
+except ImportError:
+    HiveCliHook = None
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+@unittest.skipIf(HiveCliHook is None,
+                 "Skipping test because HiveCliHook is not available")
+class TestHiveCliHook(unittest.TestCase):
+    def setUp(self):
+        configuration.load_test_config()
+        self.field_dict = OrderedDict(
+            [('id', 'INT'), ('big', 'BIGINT'), ('name', 'STRING')])
+
+    @mock.patch.object(HiveCliHook, 'run_cli')
+    def test_load_file_columnar(self, run_cli):
+        HiveCliHook().load_file(
+            '/tmp/parts', 'db.table', field_dict=self.field_dict,
+            partition={'ds': '2015-01-01'}, file_format='parquet')
+
+        create, load = [args[0] for args, _ in run_cli.call_args_list]
+        self.assertEqual(
+            "CREATE TABLE IF NOT EXISTS db.table (\n"
+            "id INT,\n    big BIGINT,\n    name STRING)\n"
+            "PARTITIONED BY (ds STRING)\n"
+            "STORED AS parquet\n;", create)
+        self.assertEqual(
+            "LOAD DATA LOCAL INPATH '/tmp/parts' OVERWRITE INTO TABLE db.table "
+            "PARTITION (ds='2015-01-01');", load)
+
+    @mock.patch.object(HiveCliHook, 'run_cli')
+    def test_load_file_unknown_format(self, run_cli):
+        with self.assertRaises(ValueError):
+            HiveCliHook().load_file(
+                '/tmp/parts', 'db.table', field_dict=self.field_dict,
+                file_format='avro')
+        self.assertFalse(run_cli.called)
+
+    @unittest.skipIf(pq is None,
+                     "Skipping test because pyarrow is not available")
+    def test_write_columnar_file(self):
+        rows = [(1, 2 ** 31 + 1, b'a'), (None, None, None), ('3', 4, 5)]
+        with TemporaryDirectory() as tmp_dir:
+            filepath = os.path.join(tmp_dir, 'part.parquet')
+            HiveCliHook.write_columnar_file(
+                iter(rows), self.field_dict, filepath, batch_size=2)
+            table = pq.read_table(filepath)
+
+        self.assertEqual(['int32', 'int64', 'string'],
+                         [str(field.type) for field in table.schema])
+        self.assertEqual(
+            {'id': [1, None, 3], 'big': [2 ** 31 + 1, None, 4],
+             'name': [u'a', None, u'5']},
+            table.to_pydict())
+
+    @unittest.skipIf(pq is None,
+                     "Skipping test because pyarrow is not available")
+    def test_write_columnar_file_full_batches(self):
+        rows = [(1, 2, 'a'), (3, 4, 'b')]
+        with TemporaryDirectory() as tmp_dir:
+            filepath = os.path.join(tmp_dir, 'part.parquet')
+            HiveCliHook.write_columnar_file(
+                iter(rows), self.field_dict, filepath, batch_size=1)
+            metadata = pq.ParquetFile(filepath).metadata
+
+        self.assertEqual(2, metadata.num_row_groups)
+        self.assertEqual(2, metadata.num_rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,9 +13,15 @@
 # limitations under the License.
 #
 
+import os
 import unittest
 
+import mock
+
 from airflow import configuration
+from airflow.exceptions import AirflowException
+from airflow.utils.file import TemporaryDirectory
+from airflow.utils.transfer import MB, TransferManager
 
 try:
     from airflow.hooks.S3_hook import S3Hook
@@ -69,6 +75,88 @@ class TestS3Hook(unittest.TestCase):
 
         self.assertEqual(hook.read_key('my_key', 'mybucket'), u'Contént')
 
+    @mock_s3
+    def test_list_keys_and_prefixes(self):
+        hook = S3Hook(aws_conn_id=None)
+        conn = hook.get_conn()
+        conn.create_bucket(Bucket='mybucket')
+        for key in ['a/1', 'a/2', 'a/b/3', 'c/4', 'a/d/5']:
+            conn.put_object(Bucket='mybucket', Key=key, Body=b'x')
+
+        self.assertEqual(
+            ['a/1', 'a/2', 'a/b/3', 'a/d/5'],
+            list(hook.iter_keys('mybucket', prefix='a/', page_size=2)))
+        self.assertEqual(['a/1', 'a/2'],
+                         hook.list_keys('mybucket', prefix='a/', delimiter='/'))
+        self.assertEqual(['a/b/', 'a/d/'],
+                         hook.list_prefixes('mybucket', prefix='a/', delimiter='/'))
+        self.assertIsNone(hook.list_keys('mybucket', prefix='e/'))
+        self.assertEqual(['a/1', 'a/2', 'a/b/3', 'a/d/5'],
+                         hook.list_keys_sharded('mybucket', prefix='a/',
+                                                max_workers=2, page_size=1))
+
+    @mock_s3
+    def test_check_for_prefix_and_wildcard_key(self):
+        hook = S3Hook(aws_conn_id=None)
+        conn = hook.get_conn()
+        conn.create_bucket(Bucket='mybucket')
+        conn.put_object(Bucket='mybucket', Key='dt=2017-01-01/part-1.gz', Body=b'x')
+        conn.put_object(Bucket='mybucket', Key='dt=2017-01-01/part-2.csv', Body=b'x')
+
+        self.assertTrue(hook.check_for_prefix('mybucket', 'dt=2017-01-01', '/'))
+        self.assertFalse(hook.check_for_prefix('mybucket', 'dt=2017-01-02', '/'))
+        self.assertTrue(hook.check_for_wildcard_key(
+            'dt=2017-01-01/part-*.csv', 'mybucket'))
+        self.assertFalse(hook.check_for_wildcard_key(
+            'dt=2017-01-0?/part-*.json', 'mybucket'))
+
+    @mock_s3
+    def test_upload_and_download_many(self):
+        hook = S3Hook(aws_conn_id=None,
+                      transfer_manager=TransferManager(
+                          part_size=5 * MB, concurrency=2,
+                          verify_checksums=True, num_retries=0))
+        hook.get_conn().create_bucket(Bucket='mybucket')
+        with TemporaryDirectory() as tmp_dir:
+            sources = []
+            for i, size in enumerate([10, 6 * MB, 11 * MB]):
+                filename = os.path.join(tmp_dir, 'src{}'.format(i))
+                with open(filename, 'wb') as f:
+                    f.write(os.urandom(size))
+                sources.append(filename)
+
+            hook.upload_many([(filename, os.path.basename(filename), 'mybucket')
+                              for filename in sources])
+            with self.assertRaises(ValueError):
+                hook.upload_many([(sources[0], 'src0', 'mybucket')])
+            hook.download_many([(os.path.basename(filename), filename + '.out',
+                                 'mybucket') for filename in sources])
+
+            for filename in sources:
+                with open(filename, 'rb') as src, \
+                        open(filename + '.out', 'rb') as dst:
+                    self.assertEqual(src.read(), dst.read())
+
+    def test_upload_checksum_with_kms(self):
+        hook = S3Hook(aws_conn_id=None,
+                      transfer_manager=TransferManager(verify_checksums=True))
+        client = mock.MagicMock()
+        client.head_object.return_value = {'ETag': '"not-an-md5"'}
+        with TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'src')
+            with open(filename, 'wb') as f:
+                f.write(b'content')
+
+            with self.assertRaises(AirflowException):
+                hook._upload_file(client, filename, 'key', 'mybucket', False)
+            # encrypted by the bucket default KMS key, the ETag is no MD5
+            client.head_object.return_value = {
+                'ETag': '"not-an-md5"', 'ServerSideEncryption': 'aws:kms'}
+            hook._upload_file(client, filename, 'key', 'mybucket', False)
+            client.head_object.return_value = {
+                'ETag': '"not-an-md5"', 'SSECustomerAlgorithm': 'AES256'}
+            hook._upload_file(client, filename, 'key', 'mybucket', False)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -752,6 +752,64 @@ class BackfillJobTest(unittest.TestCase):
 
         session.close()
 
+    def test_refresh_task_instances_and_upstream_pending(self):
+        dag = DAG(
+            dag_id='test_refresh_task_instances',
+            start_date=DEFAULT_DATE)
+        upstream = DummyOperator(task_id='upstream', dag=dag, owner='airflow')
+        other = DummyOperator(task_id='other', dag=dag, owner='airflow')
+        downstream = DummyOperator(task_id='downstream', dag=dag, owner='airflow')
+        downstream.set_upstream([upstream, other])
+        all_done = DummyOperator(task_id='all_done', dag=dag, owner='airflow',
+                                 trigger_rule='all_done')
+        all_done.set_upstream(upstream)
+
+        job = BackfillJob(dag=dag)
+        session = settings.Session()
+        dr = dag.create_dagrun(run_id=DagRun.ID_PREFIX,
+                               state=State.RUNNING,
+                               execution_date=DEFAULT_DATE,
+                               start_date=DEFAULT_DATE,
+                               session=session)
+        tis = {ti.task_id: ti for ti in dr.get_task_instances(session=session)}
+        session.expunge_all()
+        for ti in tis.values():
+            ti.task = dag.get_task(ti.task_id)
+        tis['upstream'].set_state(State.SUCCESS, session)
+        tis['other'].set_state(State.RUNNING, session)
+        tis['upstream'].state = tis['other'].state = None
+
+        run_states = job._refresh_task_instances(list(tis.values()),
+                                                 session=session)
+        self.assertEqual(tis['upstream'].state, State.SUCCESS)
+        self.assertEqual(tis['other'].state, State.RUNNING)
+        self.assertEqual(run_states[('other', DEFAULT_DATE)], State.RUNNING)
+
+        self.assertTrue(job._upstream_pending(tis['downstream'], run_states))
+        # only all_success trigger rules are told without the dependency check
+        self.assertFalse(job._upstream_pending(tis['all_done'], run_states))
+        # a failed upstream is flagged by the dependency check
+        run_states[('upstream', DEFAULT_DATE)] = State.FAILED
+        self.assertFalse(job._upstream_pending(tis['downstream'], run_states))
+        run_states[('upstream', DEFAULT_DATE)] = State.SUCCESS
+        run_states[('other', DEFAULT_DATE)] = State.SUCCESS
+        self.assertFalse(job._upstream_pending(tis['downstream'], run_states))
+
+        session.close()
+
+    def test_queue_task_instances_none_ready(self):
+        dag = DAG(
+            dag_id='test_queue_task_instances_none_ready',
+            start_date=DEFAULT_DATE)
+        DummyOperator(task_id='dummy', dag=dag, owner='airflow')
+
+        job = BackfillJob(dag=dag)
+        job.max_tis_per_query = 0
+        executor = TestExecutor(do_update=True)
+        self.assertEqual(
+            job._queue_task_instances([], None, executor, None), 0)
+        self.assertFalse(executor.queued_tasks)
+
     def test_dag_get_run_dates(self):
 
         def get_test_dag_for_backfill(schedule_interval=None):
@@ -2345,6 +2403,179 @@ class SchedulerJobTest(unittest.TestCase):
 
         sla_callback.assert_not_called()
 
+    def test_scheduler_manage_slas_records_misses(self):
+        """
+        Test that manage_slas records one SlaMiss per missed schedule, once
+        """
+        session = settings.Session()
+        sla_callback = mock.MagicMock()
+        test_start_date = days_ago(5)
+        dag = DAG(dag_id='test_sla_miss_records',
+                  sla_miss_callback=sla_callback,
+                  default_args={'start_date': test_start_date,
+                                'sla': datetime.timedelta(seconds=1)})
+        task = DummyOperator(task_id='dummy', dag=dag, owner='airflow')
+        session.query(models.SlaMiss).filter(
+            models.SlaMiss.dag_id == dag.dag_id).delete()
+        session.merge(models.TaskInstance(task=task,
+                                          execution_date=test_start_date,
+                                          state='success'))
+        session.merge(models.SlaMiss(task_id='dummy',
+                                     dag_id=dag.dag_id,
+                                     execution_date=days_ago(3),
+                                     email_sent=False,
+                                     notification_sent=True))
+        session.commit()
+
+        scheduler = SchedulerJob(dag_id=dag.dag_id,
+                                 num_runs=1,
+                                 **self.default_scheduler_args)
+        scheduler.manage_slas(dag=dag, session=session)
+        scheduler.manage_slas(dag=dag, session=session)
+
+        misses = session.query(models.SlaMiss).filter(
+            models.SlaMiss.dag_id == dag.dag_id).order_by(
+            models.SlaMiss.execution_date).all()
+        self.assertEqual([days_ago(n) for n in (4, 3, 2, 1)],
+                         [miss.execution_date for miss in misses])
+        self.assertTrue(all(miss.notification_sent for miss in misses))
+        self.assertEqual(1, sla_callback.call_count)
+
+    def test_scheduler_kill_zombies(self):
+        """
+        Test that the scheduler retries zombie task instances, fails the ones
+        out of retries and takes them off its executor
+        """
+        dag = DAG(dag_id='test_scheduler_kill_zombies',
+                  start_date=DEFAULT_DATE)
+        retried = DummyOperator(task_id='retried', dag=dag, owner='airflow',
+                                retries=1)
+        failed = DummyOperator(task_id='failed', dag=dag, owner='airflow')
+        alive = DummyOperator(task_id='alive', dag=dag, owner='airflow')
+
+        session = settings.Session()
+        executor = TestExecutor()
+        scheduler = SchedulerJob(executor=executor,
+                                 **self.default_scheduler_args)
+        tis = {}
+        for task in (retried, failed, alive):
+            ti = TI(task=task, execution_date=DEFAULT_DATE)
+            job = LocalTaskJob(task_instance=ti)
+            job.state = State.RUNNING
+            job.latest_heartbeat = datetime.datetime.utcnow()
+            if task is not alive:
+                job.latest_heartbeat -= datetime.timedelta(
+                    seconds=scheduler.zombie_task_threshold + 1)
+            session.add(job)
+            session.commit()
+            ti.job_id = job.id
+            ti.state = State.RUNNING
+            ti.try_number = 1
+            ti.start_date = job.latest_heartbeat
+            session.merge(ti)
+            executor.running[ti.key] = ti.key
+            tis[task.task_id] = ti
+        session.commit()
+
+        scheduler._kill_zombies(session=session)
+
+        for ti in tis.values():
+            ti.refresh_from_db(session=session)
+        self.assertEqual(State.UP_FOR_RETRY, tis['retried'].state)
+        self.assertEqual(State.FAILED, tis['failed'].state)
+        self.assertEqual(State.RUNNING, tis['alive'].state)
+        self.assertEqual([tis['alive'].key], list(executor.running))
+        session.close()
+
+    def test_scheduler_kill_zombies_callbacks(self):
+        """
+        Test that the scheduler sends the emails, runs the callbacks and
+        counts the failed tries of zombie task instances
+        """
+        dag = DAG(dag_id='test_scheduler_kill_zombies_callbacks',
+                  start_date=DEFAULT_DATE)
+        on_retry = Mock()
+        on_failure = Mock()
+        retried = DummyOperator(task_id='retried', dag=dag, owner='airflow',
+                                retries=1, email='test@airflow',
+                                on_retry_callback=on_retry)
+        failed = DummyOperator(task_id='failed', dag=dag, owner='airflow',
+                               email='test@airflow',
+                               on_failure_callback=on_failure)
+        dagbag = DagBag(executor=TestExecutor())
+        dagbag.dags.clear()
+        dagbag.bag_dag(dag=dag, root_dag=dag, parent_dag=dag)
+
+        session = settings.Session()
+        session.query(models.TaskInstanceStat).filter(
+            models.TaskInstanceStat.dag_id == dag.dag_id).delete()
+        scheduler = SchedulerJob(executor=TestExecutor(),
+                                 **self.default_scheduler_args)
+        for task in (retried, failed):
+            ti = TI(task=task, execution_date=DEFAULT_DATE)
+            job = LocalTaskJob(task_instance=ti)
+            job.state = State.SHUTDOWN
+            job.latest_heartbeat = datetime.datetime.utcnow()
+            session.add(job)
+            session.commit()
+            ti.job_id = job.id
+            ti.state = State.RUNNING
+            ti.try_number = 1
+            ti.start_date = job.latest_heartbeat
+            session.merge(ti)
+        session.commit()
+
+        with patch.object(TI, 'email_alert') as email_alert, \
+                patch('airflow.jobs.Stats') as stats:
+            scheduler._kill_zombies(dagbag=dagbag, session=session)
+
+        self.assertEqual(1, on_retry.call_count)
+        self.assertEqual(1, on_failure.call_count)
+        self.assertEqual(
+            'failed', on_failure.call_args[0][0]['task_instance'].task_id)
+        self.assertEqual(
+            [False, True],
+            sorted(kwargs['is_retry']
+                   for _, kwargs in email_alert.call_args_list))
+        stats.incr.assert_any_call(
+            'ti_failures', tags=['task_id:failed', 'dag_id:' + dag.dag_id,
+                                 'operator:DummyOperator'])
+        stats.incr.assert_any_call(
+            'operator_failures_DummyOperator',
+            tags=['task_id:retried', 'dag_id:' + dag.dag_id])
+        self.assertEqual(2, session.query(models.TaskInstanceStat).filter(
+            models.TaskInstanceStat.dag_id == dag.dag_id).count())
+        session.close()
+
+    def test_scheduler_kill_zombies_kubernetes_job(self):
+        """
+        Test that the scheduler deletes the Kubernetes job of a zombie
+        KubernetesJobOperator task instance
+        """
+        dag = DAG(dag_id='test_scheduler_kill_zombies_kubernetes_job',
+                  start_date=DEFAULT_DATE)
+        task = DummyOperator(task_id='job', dag=dag, owner='airflow')
+        dagbag = DagBag(executor=TestExecutor())
+        dagbag.dags.clear()
+        dagbag.bag_dag(dag=dag, root_dag=dag, parent_dag=dag)
+        ti = TI(task=task, execution_date=DEFAULT_DATE)
+        ti.operator = 'KubernetesJobOperator'
+
+        session = settings.Session()
+        scheduler = SchedulerJob(executor=TestExecutor(),
+                                 **self.default_scheduler_args)
+        with patch.object(DummyOperator, 'clean_up', create=True) as clean_up, \
+                patch('airflow.contrib.utils.kubernetes_utils.uniquify_job_name',
+                      return_value='job-name') as uniquify_job_name, \
+                patch.object(TI, 'alert_failure'):
+            scheduler._handle_zombie_failure(ti, dagbag, session=session)
+
+        clean_up.assert_called_once_with('job-name')
+        self.assertEqual(
+            DEFAULT_DATE, uniquify_job_name.call_args[0][1]['execution_date'])
+        session.rollback()
+        session.close()
+
     def test_retry_still_in_executor(self):
         """
         Checks if the scheduler does not put a task in limbo, when a task is retried
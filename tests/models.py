@@ -31,7 +31,7 @@ from airflow.jobs import BackfillJob
 from airflow.models import DAG, TaskInstance as TI
 from airflow.models import State as ST
 from airflow.models import DagModel, DagStat
-from airflow.models import clear_task_instances
+from airflow.models import clear_task_instances, bulk_clear_task_instances
 from airflow.models import XCom
 from airflow.operators.dummy_operator import DummyOperator
 from airflow.operators.bash_operator import BashOperator
@@ -202,6 +202,108 @@ class DagTest(unittest.TestCase):
 
         self.assertEquals(tuple(), dag.topological_sort())
 
+    def test_dag_topological_sort_cycle(self):
+        dag = DAG(
+            'dag',
+            start_date=DEFAULT_DATE,
+            default_args={'owner': 'owner1'})
+
+        with dag:
+            op1 = DummyOperator(task_id='A')
+            op2 = DummyOperator(task_id='B')
+            op1.set_downstream(op2)
+            op2.set_downstream(op1)
+
+        with self.assertRaises(AirflowException):
+            dag.topological_sort()
+
+    def test_dag_graph(self):
+        dag = DAG(
+            'dag',
+            start_date=DEFAULT_DATE,
+            default_args={'owner': 'owner1'})
+
+        # A -> B -> D
+        # A -> C -> D
+        with dag:
+            op1 = DummyOperator(task_id='A')
+            op2 = DummyOperator(task_id='B')
+            op3 = DummyOperator(task_id='C')
+            op4 = DummyOperator(task_id='D')
+            op1.set_downstream([op2, op3])
+            op4.set_upstream([op2, op3])
+
+        self.assertEqual([op4], dag.roots)
+        self.assertEqual([op1], dag.leaves)
+        self.assertEqual([op2, op3], op1.downstream_list)
+        self.assertEqual([op2, op3], op4.upstream_list)
+        self.assertEqual(
+            {op2, op3, op4}, set(op1.get_flat_relatives(upstream=False)))
+        self.assertEqual(
+            {op1, op2, op3}, set(op4.get_flat_relatives(upstream=True)))
+        self.assertTrue(dag.has_task('A'))
+        self.assertFalse(dag.has_task('E'))
+
+        # adding tasks and relationships invalidates the index
+        graph = dag.graph
+        op5 = DummyOperator(task_id='E', dag=dag)
+        self.assertIsNot(graph, dag.graph)
+        self.assertEqual([op4, op5], dag.roots)
+
+        graph = dag.graph
+        op4.set_downstream(op5)
+        self.assertIsNot(graph, dag.graph)
+        self.assertEqual([op5], dag.roots)
+        self.assertEqual(op5, dag.topological_sort()[-1])
+
+    def test_relatives_without_dag(self):
+        op = DummyOperator(task_id='no_dag', owner='owner1')
+        self.assertEqual([], op.upstream_list)
+        self.assertEqual([], op.downstream_list)
+        self.assertEqual([], op.get_flat_relatives(upstream=False))
+        self.assertEqual(op.priority_weight, op.priority_weight_total)
+        ti = TI(op, DEFAULT_DATE)
+        self.assertEqual(op.priority_weight, ti.priority_weight)
+
+    def test_sub_dag_view(self):
+        dag = DAG(
+            'dag',
+            start_date=DEFAULT_DATE,
+            default_args={'owner': 'owner1'})
+
+        # A -> B -> C
+        # A -> D
+        with dag:
+            op1 = DummyOperator(task_id='A')
+            op2 = DummyOperator(task_id='B')
+            op3 = DummyOperator(task_id='C')
+            op4 = DummyOperator(task_id='D')
+            op1.set_downstream([op2, op4])
+            op2.set_downstream(op3)
+
+        view = dag.sub_dag_view('^B$', include_upstream=True)
+        self.assertEqual({'A', 'B'}, set(view.task_ids))
+        self.assertTrue(view.partial)
+        self.assertFalse(dag.partial)
+        self.assertIs(op2, view.get_task('B'))
+        self.assertEqual([op2], view.roots)
+        self.assertEqual((op1, op2), view.topological_sort())
+        self.assertEqual(dag.dag_id, view.dag_id)
+
+        sub_dag = dag.sub_dag('^B$', include_upstream=True)
+        self.assertEqual(set(view.task_ids), set(sub_dag.task_ids))
+        self.assertIsNot(op2, sub_dag.get_task('B'))
+        self.assertEqual({'A'}, sub_dag.get_task('B').upstream_task_ids)
+        self.assertEqual({'B'}, sub_dag.get_task('A').downstream_task_ids)
+
+        # mutating the view copies its tasks and leaves the parent untouched
+        view.set_dependency('B', 'A')
+        self.assertTrue(view.materialized)
+        self.assertIsNot(op2, view.get_task('B'))
+        self.assertEqual({'B'}, view.get_task('A').upstream_task_ids)
+        self.assertEqual(set(), op1.upstream_task_ids)
+        self.assertEqual({'B', 'D'}, op1.downstream_task_ids)
+
     def test_get_num_task_instances(self):
         test_dag_id = 'test_get_num_task_instances_dag'
         test_task_id = 'task_1'
@@ -811,6 +913,77 @@ class DagBagTest(unittest.TestCase):
         self.assertIsNotNone(dagbag.get_dag(dag_id))
         self.assertEqual(1, dagbag.process_file_calls)
 
+    @patch.object(DagModel, 'get_current')
+    def test_lazy_dagbag(self, mock_dagmodel):
+        """
+        Test that a LazyDagBag parses the file of a DAG when the DAG is asked
+        for, once, and drops the least recently used files
+        """
+        example_dags = os.path.join(os.path.dirname(models.__file__),
+                                    'example_dags')
+
+        def get_current(dag_id):
+            orm_dag = DagModel(dag_id=dag_id)
+            orm_dag.fileloc = os.path.join(example_dags, dag_id + '.py')
+            return orm_dag
+        mock_dagmodel.side_effect = get_current
+
+        class TestDagBag(models.LazyDagBag):
+            process_file_calls = 0
+
+            def process_file(self, filepath, only_if_updated=True, safe_mode=True):
+                TestDagBag.process_file_calls += 1
+                return super(TestDagBag, self).process_file(
+                    filepath, only_if_updated, safe_mode)
+
+        dagbag = TestDagBag(max_files=1)
+        self.assertEqual({}, dagbag.dags)
+
+        self.assertEqual('example_bash_operator',
+                         dagbag.get_dag('example_bash_operator').dag_id)
+        self.assertIsNotNone(dagbag.get_dag('example_bash_operator'))
+        self.assertEqual(1, dagbag.process_file_calls)
+
+        self.assertIsNotNone(dagbag.get_dag('example_branch_operator'))
+        self.assertEqual(['example_branch_operator'], list(dagbag.dags))
+        self.assertEqual(2, dagbag.process_file_calls)
+
+    def test_serialized_dag(self):
+        """
+        Test that the DAGs stored by the scheduler are read back with their
+        tasks and edges, and only stored again when they change
+        """
+        dagbag = models.DagBag(include_examples=True)
+        dags = [dagbag.get_dag('example_subdag_operator'),
+                dagbag.get_dag('example_subdag_operator.section-1')]
+
+        session = settings.Session()
+        session.query(models.SerializedDagModel).delete()
+        session.commit()
+        self.assertEqual(['example_subdag_operator'],
+                         models.SerializedDagModel.write_dags(dags))
+        self.assertEqual([], models.SerializedDagModel.write_dags(dags))
+
+        lazy_dagbag = models.LazyDagBag(read_serialized=True)
+        for dag in dags:
+            serialized_dag = lazy_dagbag.get_dag(dag.dag_id)
+            self.assertEqual(dag.schedule_interval,
+                             serialized_dag.schedule_interval)
+            self.assertEqual(dag.is_subdag, serialized_dag.is_subdag)
+            for task in dag.tasks:
+                serialized_task = serialized_dag.get_task(task.task_id)
+                self.assertEqual(task.task_type, serialized_task.task_type)
+                self.assertEqual(task.downstream_task_ids,
+                                 serialized_task.downstream_task_ids)
+        self.assertEqual(
+            ['example_subdag_operator.section-1',
+             'example_subdag_operator.section-2'],
+            sorted(subdag.dag_id for subdag in
+                   lazy_dagbag.get_dag('example_subdag_operator').subdags))
+        session.query(models.SerializedDagModel).delete()
+        session.commit()
+        session.close()
+
     def test_get_dag_fileloc(self):
         """
         Test that fileloc is correctly set when we load example DAGs,
@@ -1305,6 +1478,31 @@ class TaskInstanceTest(unittest.TestCase):
         ti.run()
         self.assertEqual(ti.state, models.State.SUCCESS)
 
+    def test_run_records_task_instance_stat(self):
+        """
+        test that a task instance finishing updates its rollup for the charts
+        """
+        dag = models.DAG(dag_id='test_run_records_task_instance_stat',
+                         schedule_interval='@daily')
+        task = DummyOperator(task_id='op', dag=dag, owner='airflow',
+                             start_date=datetime.datetime(2016, 2, 1))
+        ti = TI(task=task, execution_date=datetime.datetime(2016, 2, 1))
+        ti.run()
+
+        session = settings.Session()
+        TIS = models.TaskInstanceStat
+        stat = session.query(TIS).filter(TIS.dag_id == dag.dag_id).one()
+        self.assertEqual(ti.duration, stat.duration)
+        self.assertEqual(0, stat.fail_duration)
+        self.assertEqual(ti.try_number, stat.tries)
+        # landing times count from the end of the schedule period
+        self.assertEqual(
+            (ti.end_date - datetime.datetime(2016, 2, 2)).total_seconds(),
+            stat.landing_time)
+        session.delete(stat)
+        session.commit()
+        session.close()
+
     @patch.object(TI, 'pool_full')
     def test_run_pooling_task_with_mark_success(self, mock_pool_full):
         """
@@ -1780,6 +1978,77 @@ class ClearTasksTest(unittest.TestCase):
         self.assertEqual(ti1.try_number, 1)
         self.assertEqual(ti1.max_tries, 2)
 
+    def test_bulk_clear_task_instances(self):
+        dag = DAG('test_bulk_clear_task_instances', start_date=DEFAULT_DATE,
+                  end_date=DEFAULT_DATE + datetime.timedelta(days=10))
+        task0 = DummyOperator(task_id='0', owner='test', dag=dag)
+        task1 = DummyOperator(task_id='1', owner='test', dag=dag, retries=2)
+        task2 = DummyOperator(task_id='2', owner='test', dag=dag)
+        ti0 = TI(task=task0, execution_date=DEFAULT_DATE)
+        ti1 = TI(task=task1, execution_date=DEFAULT_DATE)
+        ti2 = TI(task=task2, execution_date=DEFAULT_DATE)
+        ti0.run()
+        ti1.run()
+
+        session = settings.Session()
+        ti2.state = State.RUNNING
+        ti2.job_id = 1
+        session.merge(ti2)
+        session.commit()
+
+        steps = []
+        qry = session.query(TI).filter(TI.dag_id == dag.dag_id)
+        count = bulk_clear_task_instances(
+            qry, session, dag=dag,
+            progress_callback=lambda step, count: steps.append(step))
+        session.commit()
+        self.assertEqual(count, 3)
+        self.assertTrue(steps)
+
+        ti0.refresh_from_db()
+        ti1.refresh_from_db()
+        ti2.refresh_from_db()
+        self.assertEqual(ti0.state, State.NONE)
+        self.assertEqual(ti0.max_tries, 1)
+        self.assertEqual(ti1.state, State.NONE)
+        self.assertEqual(ti1.max_tries, 3)
+        self.assertEqual(ti2.state, State.SHUTDOWN)
+
+    def test_bulk_clear_task_instances_without_dag(self):
+        dag = DAG('test_bulk_clear_task_instances_without_dag',
+                  start_date=DEFAULT_DATE,
+                  end_date=DEFAULT_DATE + datetime.timedelta(days=10))
+        task0 = DummyOperator(task_id='task_0', owner='test', dag=dag)
+        task1 = DummyOperator(task_id='task_1', owner='test', dag=dag, retries=2)
+        ti0 = TI(task=task0, execution_date=DEFAULT_DATE)
+        ti1 = TI(task=task1, execution_date=DEFAULT_DATE)
+        ti0.run()
+        ti1.run()
+
+        session = settings.Session()
+        qry = session.query(TI).filter(TI.dag_id == dag.dag_id)
+        bulk_clear_task_instances(qry, session)
+        session.commit()
+        # When dag is None, max_tries will be maximum of original max_tries or try_number.
+        ti0.refresh_from_db()
+        ti1.refresh_from_db()
+        self.assertEqual(ti0.try_number, 1)
+        self.assertEqual(ti0.max_tries, 1)
+        self.assertEqual(ti1.try_number, 1)
+        self.assertEqual(ti1.max_tries, 2)
+
+    def test_dag_clear_counts(self):
+        dag = DAG('test_dag_clear_counts', start_date=DEFAULT_DATE,
+                  end_date=DEFAULT_DATE + datetime.timedelta(days=10))
+        task0 = DummyOperator(task_id='task_0', owner='test', dag=dag)
+        task1 = DummyOperator(task_id='task_1', owner='test', dag=dag)
+        TI(task=task0, execution_date=DEFAULT_DATE).run()
+        TI(task=task1, execution_date=DEFAULT_DATE).run()
+
+        self.assertEqual(
+            [(dag.dag_id, State.SUCCESS, 2)], dag.clear_counts())
+        self.assertEqual([], dag.clear_counts(only_failed=True))
+
     def test_dag_clear(self):
         dag = DAG('test_dag_clear', start_date=DEFAULT_DATE,
                   end_date=DEFAULT_DATE + datetime.timedelta(days=10))
@@ -18,6 +18,7 @@ from .operators import *
 from .sensors import *
 from .hive_operator import *
 from .s3_to_hive_operator import *
+from .s3_file_transform_operator import *
 from .python_operator import *
 from .latest_only_operator import *
 
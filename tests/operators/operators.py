@@ -237,6 +237,20 @@ class PostgresTest(unittest.TestCase):
             assert 'database "foobar" does not exist' in str(e)
 
 
+@skipUnlessImported('airflow.operators.mysql_to_hive', 'MySqlToHiveTransfer')
+class MySqlToHiveTest(unittest.TestCase):
+    def test_decode_bits(self):
+        from airflow.operators.mysql_to_hive import MySqlToHiveTransfer
+        from MySQLdb.constants import FIELD_TYPE
+        description = (('flag', FIELD_TYPE.BIT), ('name', FIELD_TYPE.STRING))
+        rows = [(b'\x01', 'a'), (b'\x01\x00', 'b'), (None, 'c')]
+        self.assertEqual(
+            [[1, 'a'], [256, 'b'], [None, 'c']],
+            list(MySqlToHiveTransfer.decode_bits(description, rows)))
+        self.assertEqual(
+            'BIGINT', MySqlToHiveTransfer.type_map(FIELD_TYPE.LONG))
+
+
 @skipUnlessImported('airflow.operators.hive_operator', 'HiveOperator')
 @skipUnlessImported('airflow.operators.postgres_operator', 'PostgresOperator')
 class TransferTests(unittest.TestCase):
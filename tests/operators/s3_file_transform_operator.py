@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from airflow import configuration
+from airflow.exceptions import AirflowException
+from airflow.operators.s3_file_transform_operator import S3FileTransformOperator
+
+try:
+    import boto3
+    from moto import mock_s3
+except ImportError:
+    mock_s3 = None
+
+
+@unittest.skipIf(mock_s3 is None,
+                 "Skipping test because moto.mock_s3 is not available")
+class S3FileTransformOperatorTest(unittest.TestCase):
+
+    def setUp(self):
+        configuration.load_test_config()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def make_script(self, body):
+        script = os.path.join(self.tmp_dir, 'transform.sh')
+        with open(script, 'w') as f:
+            f.write('#!/bin/sh\n' + body + '\n')
+        os.chmod(script, os.stat(script).st_mode | stat.S_IEXEC)
+        return script
+
+    def transform(self, script, streaming):
+        conn = boto3.client('s3')
+        conn.create_bucket(Bucket='bucket')
+        conn.put_object(Bucket='bucket', Key='source', Body=b'abc\n' * 1000)
+        S3FileTransformOperator(
+            task_id='s3_file_transform',
+            source_s3_key='s3://bucket/source',
+            dest_s3_key='s3://bucket/dest',
+            transform_script=script,
+            source_s3_conn_id=None,
+            dest_s3_conn_id=None,
+            streaming=streaming).execute(None)
+        return conn.get_object(Bucket='bucket', Key='dest')['Body'].read()
+
+    @mock_s3
+    def test_execute(self):
+        script = self.make_script('tr a-z A-Z < "$1" > "$2"')
+        self.assertEqual(b'ABC\n' * 1000, self.transform(script, False))
+
+    @mock_s3
+    def test_execute_streaming(self):
+        script = self.make_script('tr a-z A-Z < "$1" > "$2"')
+        self.assertEqual(b'ABC\n' * 1000, self.transform(script, True))
+
+    @mock_s3
+    def test_execute_streaming_script_failure(self):
+        script = self.make_script('head -c 10 "$1" > "$2"; exit 1')
+        with self.assertRaises(AirflowException):
+            self.transform(script, True)
+        self.assertNotIn('Contents', boto3.client('s3').list_objects_v2(
+            Bucket='bucket', Prefix='dest'))
+
+
+if __name__ == '__main__':
+    unittest.main()
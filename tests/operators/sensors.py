@@ -17,12 +17,14 @@ import time
 import unittest
 from datetime import datetime, timedelta
 from mock import patch
+from multiprocessing.pool import ThreadPool
 
 from airflow import DAG, configuration, settings
 from airflow.exceptions import (AirflowException,
                                 AirflowSensorTimeout,
                                 AirflowSkipException)
-from airflow.models import TaskInstance
+from airflow.jobs import SensorServiceJob
+from airflow.models import SensorInstance, TaskInstance
 from airflow.operators.bash_operator import BashOperator
 from airflow.operators.dummy_operator import DummyOperator
 from airflow.operators.sensors import HttpSensor, BaseSensorOperator, HdfsSensor, ExternalTaskSensor
@@ -78,6 +80,22 @@ class TimeoutTestSensor(BaseSensorOperator):
         self.log.info("Success criteria met. Exiting.")
 
 
+class SmartTestSensor(BaseSensorOperator):
+    """
+    Sensor handing its pokes over to the sensor service, its poke returns
+    the return_value provided
+    """
+    poke_context_fields = ('return_value',)
+
+    @apply_defaults
+    def __init__(self, return_value=False, *args, **kwargs):
+        self.return_value = return_value
+        super(SmartTestSensor, self).__init__(*args, **kwargs)
+
+    def poke(self, context):
+        return self.return_value
+
+
 class SensorTimeoutTest(unittest.TestCase):
     def setUp(self):
         configuration.load_test_config()
@@ -103,6 +121,79 @@ class SensorTimeoutTest(unittest.TestCase):
             start_date=DEFAULT_DATE, end_date=DEFAULT_DATE, ignore_ti_state=True)
 
 
+class SmartSensorTest(unittest.TestCase):
+    def setUp(self):
+        configuration.load_test_config()
+        configuration.set('smart_sensor', 'use_smart_sensor', 'True')
+        configuration.set('smart_sensor', 'sensors_enabled', 'SmartTestSensor')
+        self.dag = DAG(TEST_DAG_ID, default_args={
+            'owner': 'airflow',
+            'start_date': DEFAULT_DATE})
+        self.session = settings.Session()
+        for model in (TaskInstance, SensorInstance):
+            self.session.query(model).filter(
+                model.dag_id == TEST_DAG_ID).delete()
+        self.session.commit()
+
+    def tearDown(self):
+        configuration.set('smart_sensor', 'use_smart_sensor', 'False')
+        self.session.close()
+
+    def run_sensor(self, task_id, **kwargs):
+        sensor = SmartTestSensor(task_id=task_id, poke_interval=0,
+                                 dag=self.dag, **kwargs)
+        sensor.run(start_date=DEFAULT_DATE, end_date=DEFAULT_DATE,
+                   ignore_ti_state=True)
+        ti = TaskInstance(sensor, DEFAULT_DATE)
+        ti.refresh_from_db()
+        return ti
+
+    def test_criteria_met_on_first_poke(self):
+        ti = self.run_sensor('smart_met', return_value=True)
+        self.assertEqual(ti.state, State.SUCCESS)
+        self.assertEqual(self.session.query(SensorInstance).filter(
+            SensorInstance.dag_id == TEST_DAG_ID).count(), 0)
+
+    def test_sensor_service(self):
+        waiting = self.run_sensor('smart_waiting')
+        timed_out = self.run_sensor('smart_timed_out', timeout=0, soft_fail=True)
+        self.assertEqual(waiting.state, State.SENSING)
+        self.assertEqual(timed_out.state, State.SENSING)
+
+        job = SensorServiceJob(num_runs=1)
+        pool = ThreadPool(2)
+        self.assertEqual(job.poke_sensors(pool), 1)
+        timed_out.refresh_from_db()
+        waiting.refresh_from_db()
+        self.assertEqual(timed_out.state, State.SKIPPED)
+        self.assertEqual(waiting.state, State.SENSING)
+
+        # the awaited criteria is now met
+        self.session.query(SensorInstance).filter(
+            SensorInstance.task_id == 'smart_waiting',
+        ).update({SensorInstance.poke_context: {'return_value': True}},
+                 synchronize_session=False)
+        self.session.commit()
+        self.assertEqual(job.poke_sensors(pool), 1)
+        pool.close()
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.state, State.SUCCESS)
+        self.assertEqual(self.session.query(SensorInstance).filter(
+            SensorInstance.dag_id == TEST_DAG_ID).count(), 0)
+
+    def test_sensor_service_no_outcome(self):
+        waiting = self.run_sensor('smart_waiting')
+        self.assertEqual(waiting.state, State.SENSING)
+
+        job = SensorServiceJob(num_runs=1)
+        job.max_tis_per_query = 0
+        pool = ThreadPool(1)
+        self.assertEqual(job.poke_sensors(pool), 0)
+        pool.close()
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.state, State.SENSING)
+
+
 class HttpSensorTests(unittest.TestCase):
     def setUp(self):
         configuration.load_test_config()
@@ -272,6 +363,48 @@ class ExternalTaskSensorTests(unittest.TestCase):
             'start_date': DEFAULT_DATE,
             'depends_on_past': False}
 
+    def test_external_task_sensor_poke_many(self):
+        dag_external_id = TEST_DAG_ID + '_poke_many'
+        dag_external = DAG(dag_external_id, default_args=self.args)
+        session = settings.Session()
+        session.query(TaskInstance).filter(
+            TaskInstance.dag_id == dag_external_id).delete()
+        for task_id, state in (('done', State.SUCCESS),
+                               ('failed', State.FAILED)):
+            ti = TaskInstance(DummyOperator(task_id=task_id, dag=dag_external),
+                              DEFAULT_DATE)
+            ti.state = state
+            session.merge(ti)
+        session.commit()
+        session.close()
+
+        dag = DAG(TEST_DAG_ID, default_args=self.args)
+
+        def sensor(task_id, external_task_id, **kwargs):
+            return ExternalTaskSensor(
+                task_id=task_id,
+                external_dag_id=dag_external_id,
+                external_task_id=external_task_id,
+                dag=dag, **kwargs)
+
+        context = {'execution_date': DEFAULT_DATE}
+        pokes = [
+            (sensor('on_done', 'done'), context),
+            (sensor('on_failed', 'failed'), context),
+            (sensor('on_failed_allowed', 'failed',
+                    allowed_states=[State.FAILED]), context),
+            (sensor('on_missing', 'missing'), context),
+            (sensor('on_next_run', 'done'),
+             {'execution_date': DEFAULT_DATE + timedelta(days=1)}),
+            (sensor('on_previous_run', 'done',
+                    execution_delta=timedelta(days=1)),
+             {'execution_date': DEFAULT_DATE + timedelta(days=1)}),
+        ]
+        self.assertEqual(ExternalTaskSensor.poke_many(pokes),
+                         [True, False, True, False, False, True])
+        self.assertEqual(ExternalTaskSensor.poke_many(pokes),
+                         [s.poke(c) for s, c in pokes])
+
     def test_external_task_sensor_fn_multiple_execution_dates(self):
         bash_command_code = """
 {% set s=execution_date.time().second %}
@@ -49,3 +49,30 @@ class Dates(unittest.TestCase):
         self.assertEqual(datetime(2017, 11, 2, 0, 0, 0), dates.parse_execution_date(execution_date_str_wo_ms))
         self.assertEqual(datetime(2017, 11, 5, 16, 18, 30, 989729), dates.parse_execution_date(execution_date_str_w_ms))
         self.assertRaises(ValueError, dates.parse_execution_date, bad_execution_date_str)
+
+    def test_cron_schedule(self):
+        from croniter import croniter
+
+        schedule = dates.CronSchedule('*/5 * * * *')
+        dttm = datetime(2017, 1, 1)
+        # walk forward past a few window extensions
+        for _ in range(3 * dates.CronSchedule.CHUNK):
+            expected = croniter('*/5 * * * *', dttm).get_next(datetime)
+            self.assertEqual(schedule.following(dttm), expected)
+            dttm = expected
+        # then backwards, past the start of the window
+        for _ in range(4 * dates.CronSchedule.CHUNK):
+            expected = croniter('*/5 * * * *', dttm).get_prev(datetime)
+            self.assertEqual(schedule.previous(dttm), expected)
+            dttm = expected
+
+        # dates in between fire times and far from the window
+        for dttm in (datetime(2017, 1, 1, 0, 2), datetime(2016, 6, 1, 13, 7),
+                     datetime(2020, 2, 29, 23, 58)):
+            self.assertEqual(schedule.following(dttm),
+                             croniter('*/5 * * * *', dttm).get_next(datetime))
+            self.assertEqual(schedule.previous(dttm),
+                             croniter('*/5 * * * *', dttm).get_prev(datetime))
+
+        self.assertIs(dates.cron_schedule('0 0 * * *'),
+                      dates.cron_schedule('0 0 * * *'))
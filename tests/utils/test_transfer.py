@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import io
+import unittest
+
+from airflow.exceptions import AirflowException
+from airflow.utils import transfer
+from airflow.utils.transfer import MB, TransferManager
+
+
+class TransferTest(unittest.TestCase):
+
+    def test_s3_etag(self):
+        data = b'x' * (12 * MB)
+        f = io.BytesIO(data)
+        self.assertEqual(hashlib.md5(data).hexdigest(),
+                         transfer.s3_etag(f, len(data), 16 * MB))
+        parts = [hashlib.md5(data[i:i + 5 * MB]).digest()
+                 for i in range(0, len(data), 5 * MB)]
+        self.assertEqual(
+            hashlib.md5(b''.join(parts)).hexdigest() + '-3',
+            transfer.s3_etag(f, len(data), 5 * MB))
+
+    def test_s3_part_size(self):
+        self.assertEqual(5 * MB, transfer.s3_part_size(MB, 100 * MB))
+        self.assertEqual(10 * MB, transfer.s3_part_size(MB, 60000 * MB))
+
+    def test_hashing_writer(self):
+        f = io.BytesIO()
+        writer = transfer.HashingWriter(f)
+        writer.write(b'abc')
+        writer.write(b'def')
+        self.assertEqual(b'abcdef', f.getvalue())
+        self.assertEqual('6AtQFwmJUPxYqtg8jBSXjg==', writer.b64digest())
+
+    def test_run_many(self):
+        manager = TransferManager(part_size=MB, concurrency=2,
+                                  verify_checksums=True, num_retries=0)
+        self.assertEqual([3, 7, 11], manager.run_many(
+            lambda a, b: a + b, [(1, 2), (3, 4), (5, 6)]))
+        self.assertEqual([], manager.run_many(lambda a: a, []))
+        self.assertEqual(MB, manager.gcs_chunk_size)
+
+    def test_check(self):
+        manager = TransferManager(part_size=MB, concurrency=1,
+                                  verify_checksums=True, num_retries=0)
+        manager.check('f', 'a', 'a')
+        with self.assertRaises(AirflowException):
+            manager.check('f', 'a', 'b')
+
+
+if __name__ == '__main__':
+    unittest.main()
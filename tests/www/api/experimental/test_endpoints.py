@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
 from datetime import datetime, timedelta
 import json
 import unittest
@@ -129,6 +130,58 @@ class TestApiExperimental(unittest.TestCase):
         )
         self.assertEqual(400, response.status_code)
 
+    def test_trigger_dags_and_dag_run_states(self):
+        response = self.app.post(
+            '/api/experimental/dag_runs',
+            data=json.dumps({'dag_runs': [
+                {'dag_id': 'example_bash_operator', 'run_id': 'my_run_1'},
+                {'dag_id': 'example_bash_operator', 'run_id': 'my_run_2'},
+                {'dag_id': 'does_not_exist_dag'},
+            ]}),
+            content_type="application/json"
+        )
+        self.assertEqual(200, response.status_code)
+        dag_runs = json.loads(response.data.decode('utf-8'))['dag_runs']
+        self.assertEqual(['message', 'message', 'error'],
+                         [sorted(set(run) - {'dag_id'})[0] for run in dag_runs])
+
+        url = '/api/experimental/dag_runs?dag_id=example_bash_operator&limit=1'
+        response = self.app.get(url)
+        self.assertEqual(200, response.status_code)
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(['my_run_1'], [r['run_id'] for r in data['dag_runs']])
+        response = self.app.get(url + '&cursor=' + data['cursor'])
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(['my_run_2'], [r['run_id'] for r in data['dag_runs']])
+        self.assertIsNone(data['cursor'])
+
+        response = self.app.get('/api/experimental/dag_runs?cursor=bad')
+        self.assertEqual(400, response.status_code)
+
+    def test_state_changes(self):
+        response = self.app.get('/api/experimental/state_changes')
+        self.assertEqual(200, response.status_code)
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual([], data['task_instances'])
+        self.assertTrue(data['cursor'])
+
+    def test_state_changes_invalid_cursor(self):
+        def cursor(value):
+            return quote_plus(base64.urlsafe_b64encode(
+                json.dumps(value).encode('utf-8')).decode('ascii'))
+
+        for value in ({'ti': {}, 'dr': []}, {'ti': [1, 2], 'dr': ['x']},
+                      {'ti': ['not a date'], 'dr': ['2017-01-01T00:00:00']},
+                      {'ti': ['2017-01-01T00:00:00'] * 5,
+                       'dr': ['2017-01-01T00:00:00']}):
+            response = self.app.get(
+                '/api/experimental/state_changes?cursor=' + cursor(value))
+            self.assertEqual(400, response.status_code)
+        for value in ({'id': 1}, [], [1, 2], [[1]]):
+            response = self.app.get(
+                '/api/experimental/dag_runs?cursor=' + cursor(value))
+            self.assertEqual(400, response.status_code)
+
     def test_task_instance_info(self):
         url_template = '/api/experimental/dags/{}/dag_runs/{}/tasks/{}'
         dag_id = 'example_bash_operator'
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import copy
+import json
 import logging.config
 import os
 import shutil
@@ -21,11 +22,14 @@ import unittest
 from datetime import datetime
 import sys
 
+import mock
+
 from airflow import models, configuration, settings
 from airflow.config_templates.airflow_local_settings import DEFAULT_LOGGING_CONFIG
 from airflow.models import DAG, TaskInstance
 from airflow.operators.dummy_operator import DummyOperator
 from airflow.settings import Session
+from airflow.utils.log.file_task_handler import FileTaskHandler
 from airflow.www import app as application
 from airflow import configuration as conf
 
@@ -298,6 +302,46 @@ class TestPoolModelView(unittest.TestCase):
         self.assertEqual(self.session.query(models.Pool).count(), 0)
 
 
+class TestTaskInstanceModelView(unittest.TestCase):
+    DAG_ID = 'dag_for_testing_ti_list'
+    DEFAULT_DATE = datetime(2017, 9, 1)
+    ENDPOINT = '/admin/taskinstance/?flt0_dag_id_equals={}'.format(DAG_ID)
+
+    def setUp(self):
+        super(TestTaskInstanceModelView, self).setUp()
+        configuration.load_test_config()
+        app = application.create_app(testing=True)
+        self.app = app.test_client()
+        self.session = Session()
+        dag = DAG(self.DAG_ID, start_date=self.DEFAULT_DATE)
+        for i in range(1, 4):
+            task = DummyOperator(task_id='ti_list_task_{}'.format(i), dag=dag)
+            self.session.merge(TaskInstance(task=task,
+                                            execution_date=self.DEFAULT_DATE))
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.query(TaskInstance).filter(
+            TaskInstance.dag_id == self.DAG_ID).delete()
+        self.session.commit()
+        self.session.close()
+        super(TestTaskInstanceModelView, self).tearDown()
+
+    def test_list_after_key(self):
+        response = self.app.get(self.ENDPOINT)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ti_list_task_3', response.data.decode('utf-8'))
+
+        # newest first, the page after task 2 only has task 1
+        response = self.app.get(
+            self.ENDPOINT + '&page=1&after={},{},ti_list_task_2'.format(
+                self.DEFAULT_DATE.isoformat(), self.DAG_ID))
+        self.assertEqual(response.status_code, 200)
+        data = response.data.decode('utf-8')
+        self.assertIn('ti_list_task_1', data)
+        self.assertNotIn('ti_list_task_3', data)
+
+
 class TestLogView(unittest.TestCase):
     DAG_ID = 'dag_for_testing_log_view'
     TASK_ID = 'task_for_testing_log_view'
@@ -377,6 +421,65 @@ class TestLogView(unittest.TestCase):
         self.assertIn('<pre id="attempt-1">*** Reading local log.\nLog for testing.\n</pre>',
                       response.data.decode('utf-8'))
 
+    def test_get_file_task_log_range(self):
+        response = self.app.get(
+            TestLogView.ENDPOINT.replace('/log?', '/log_range?') +
+            '&try_number=0&offset=4',
+            follow_redirects=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual('for testing.\n', data['log'])
+        self.assertEqual(17, data['offset'])
+        self.assertTrue(data['end_of_log'])
+
+    def test_get_file_task_log_range_follow(self):
+        url = (TestLogView.ENDPOINT.replace('/log?', '/log_range?') +
+               '&try_number=0&offset=0')
+        response = self.app.get(url)
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual('*** Reading local log.\nLog for testing.\n',
+                         data['log'])
+        # following reads have no header, however often they are polled
+        response = self.app.get(url + '&follow=1')
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual('Log for testing.\n', data['log'])
+        self.assertNotIn('error', data)
+
+        # failures go to the error, not to the log appended to the page
+        with mock.patch.object(FileTaskHandler, '_read_range',
+                               side_effect=IOError('unreachable')):
+            response = self.app.get(url + '&follow=1')
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual('', data['log'])
+        self.assertIn('unreachable', data['error'])
+        self.assertEqual(0, data['offset'])
+
+    def test_get_file_task_log_stream(self):
+        response = self.app.get(
+            TestLogView.ENDPOINT.replace('/log?', '/log_stream?') +
+            '&try_number=0',
+            follow_redirects=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual('*** Reading local log.\nLog for testing.\n',
+                         response.data.decode('utf-8'))
+
+
+class TestDownsample(unittest.TestCase):
+
+    def test_downsample(self):
+        from airflow.www.views import downsample
+        x = list(range(10))
+        y = [float(i) for i in range(10)]
+        self.assertEqual([[i, float(i)] for i in range(10)],
+                         downsample(x, y, 0))
+        self.assertEqual([[i, float(i)] for i in range(10)],
+                         downsample(x, y, 10))
+        # buckets of 3, the last one is shorter
+        self.assertEqual([[1, 1.0], [4, 4.0], [7, 7.0], [9, 9.0]],
+                         downsample(x, y, 4))
+
 
 if __name__ == '__main__':
     unittest.main()